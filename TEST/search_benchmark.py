@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""검색 성능 벤치마크
+
+합성 마크다운 코퍼스(한글/영문 혼합, 긴 표 포함)를 만들고, 검색 엔진별로 고정된
+질의 묶음을 실행하여 지연 시간(p50/p95/p99), 처리량, 최대 RSS를 JSON으로 출력한다.
+같은 --seed와 --files를 쓰면 같은 코퍼스와 질의가 만들어지므로 변경 전후를 비교할 수 있다.
+
+예:
+    python TEST/search_benchmark.py --files 1000 --output bench.json
+    python TEST/search_benchmark.py --corpus /tmp/corpus --files 100000 --engines indexed fuzzy
+"""
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import platform
+import argparse
+import tempfile
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Callable, Dict, List, Any, Optional, Tuple
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from services.search_index import SearchIndex
+from services.search_service import SearchService
+
+
+# ----------------------------------------------------------------------
+# 합성 코퍼스
+# ----------------------------------------------------------------------
+KOREAN_NOUNS = [
+    '계약', '계약서', '데이터', '분석', '보고서', '회의', '예산', '사업', '결과', '검토', '일정', '담당자',
+    '프로젝트', '시스템', '문서', '변환', '검색', '품질', '고객', '매출', '인공지능', '모델', '학습', '평가',
+    '정책', '규정', '승인', '요청', '변경', '관리', '운영', '서버', '보안', '점검', '교육', '계획',
+]
+KOREAN_PARTICLES = ['', '', '', '은', '는', '이', '가', '을', '를', '의', '에', '에서', '으로', '와', '과', '도']
+KOREAN_VERBS = ['검토했다', '진행한다', '완료되었다', '필요하다', '확인했다', '요청합니다', '변경되었습니다']
+ENGLISH_WORDS = [
+    'the', 'contract', 'data', 'analysis', 'report', 'meeting', 'budget', 'project', 'system', 'document',
+    'search', 'quality', 'customer', 'revenue', 'model', 'training', 'policy', 'server', 'security', 'review',
+    'schedule', 'manager', 'pipeline', 'index', 'latency', 'throughput', 'API', 'JSON', 'PDF', 'HWP',
+]
+TABLE_HEADERS = ['항목', '값', '단위', '비고', 'ID', 'Status', '담당', '기한']
+
+# 키워드 검색 질의 묶음 - 빈도가 높은/낮은 단어, 조사 포함, 1~2글자, 공백/기호 포함, 없는 단어
+KEYWORD_QUERIES = [
+    '계약', '계약서를', '데이터 분석', '보고서', '인공지능', '승인', '서버', '검토했다',
+    'contract', 'API', 'latency', 'the report', '| 값', '2024', '계', '없는단어zz',
+]
+# 질의 언어(mode=query) 묶음
+BOOLEAN_QUERIES = [
+    '계약 AND 승인', '데이터 OR 서버', '보고서 -예산', '"데이터 분석"', '계약 NEAR/5 검토',
+    '(contract OR 계약) AND review', 'file:doc0* 데이터', 'security NOT server',
+]
+# 오타 허용(mode=fuzzy) 묶음 - 자모 하나가 틀린 한글, 글자 순서가 바뀐 영문
+FUZZY_QUERIES = ['게약서', '데이타', '보고서', '인공지는', '프로젝트', 'contarct', 'anlaysis', '담당쟈']
+
+
+def _zipf_choice(rng: random.Random, words: List[str], cumulative: List[float]) -> str:
+    """앞쪽 단어일수록 자주 나오는(Zipf 분포) 단어 선택"""
+    return rng.choices(words, cum_weights=cumulative, k=1)[0]
+
+
+def _cumulative_weights(n: int) -> List[float]:
+    total = 0.0
+    weights = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank
+        weights.append(total)
+    return weights
+
+
+def _rare_words(rng: random.Random, count: int) -> List[str]:
+    """임의의 한글 음절로 만든 드문 단어 (어휘 크기를 현실적으로 늘리기 위함)"""
+    return [''.join(chr(0xAC00 + rng.randrange(11172)) for _ in range(rng.randint(2, 4))) for _ in range(count)]
+
+
+def _sentence(rng: random.Random, vocabulary: List[str], cumulative: List[float]) -> str:
+    words = []
+    for _ in range(rng.randint(4, 16)):
+        roll = rng.random()
+        if roll < 0.55:
+            words.append(_zipf_choice(rng, vocabulary, cumulative) + rng.choice(KOREAN_PARTICLES))
+        elif roll < 0.85:
+            words.append(rng.choice(ENGLISH_WORDS))
+        elif roll < 0.93:
+            words.append(rng.choice(KOREAN_VERBS))
+        else:
+            words.append(str(rng.randint(1990, 2030)))
+    return ' '.join(words) + rng.choice(['.', '.', '', ',', '?'])
+
+
+def _table(rng: random.Random, vocabulary: List[str], cumulative: List[float], rows: int) -> List[str]:
+    columns = rng.sample(TABLE_HEADERS, rng.randint(3, len(TABLE_HEADERS)))
+    lines = ['| ' + ' | '.join(columns) + ' |', '| ' + ' | '.join('---' for _ in columns) + ' |']
+    for _ in range(rows):
+        cells = []
+        for _ in columns:
+            cells.append(_zipf_choice(rng, vocabulary, cumulative) if rng.random() < 0.6 else str(rng.randint(0, 99999)))
+        lines.append('| ' + ' | '.join(cells) + ' |')
+    return lines
+
+
+def generate_corpus(directory: str, files: int, seed: int, table_ratio: float = 0.05) -> Dict[str, Any]:
+    """합성 마크다운 코퍼스 생성 - 이미 같은 설정으로 만든 코퍼스가 있으면 재사용"""
+    os.makedirs(directory, exist_ok=True)
+    manifest_path = os.path.join(directory, '.benchmark.json')
+    settings = {'files': files, 'seed': seed, 'table_ratio': table_ratio}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        if manifest.get('settings') == settings:
+            return manifest
+
+    rng = random.Random(seed)
+    vocabulary = KOREAN_NOUNS + _rare_words(rng, 5000)
+    cumulative = _cumulative_weights(len(vocabulary))
+    total_bytes = 0
+    started = time.perf_counter()
+    for n in range(files):
+        lines = [f'# 문서 {n} - {_zipf_choice(rng, vocabulary, cumulative)} {rng.choice(ENGLISH_WORDS)}', '']
+        for _ in range(rng.randint(2, 8)):
+            lines.append(f'## {_zipf_choice(rng, vocabulary, cumulative)}')
+            lines.extend(_sentence(rng, vocabulary, cumulative) for _ in range(rng.randint(3, 20)))
+            lines.append('')
+            if rng.random() < table_ratio:
+                # 긴 표 (변환된 엑셀/HWP 표를 흉내냄)
+                lines.extend(_table(rng, vocabulary, cumulative, rng.randint(200, 3000)))
+            elif rng.random() < 0.3:
+                lines.extend(_table(rng, vocabulary, cumulative, rng.randint(3, 20)))
+            lines.append('')
+        data = '\n'.join(lines).encode('utf-8')
+        with open(os.path.join(directory, f'doc{n:06d}.md'), 'wb') as f:
+            f.write(data)
+        total_bytes += len(data)
+
+    manifest = {
+        'settings': settings,
+        'total_bytes': total_bytes,
+        'generate_seconds': round(time.perf_counter() - started, 3),
+    }
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest
+
+
+# ----------------------------------------------------------------------
+# 검색 엔진
+# ----------------------------------------------------------------------
+# 엔진 이름 -> (질의 묶음, 준비 함수). 준비 함수는 (코퍼스 폴더, 작업 폴더, 워커 수)를 받아
+# (색인 구축 등 준비 시간, 검색 서비스, 질의 하나를 실행하는 함수)를 반환한다.
+# 새 검색 방식을 추가하면 여기에 등록하여 같은 질의 묶음으로 비교한다.
+EngineSetup = Callable[[str, str, int], Tuple[float, SearchService, Callable[[str], Any]]]
+
+
+def _build_index(corpus: str, workdir: str) -> Tuple[SearchIndex, float]:
+    index = SearchIndex(corpus, os.path.join(workdir, 'search_index.sqlite3'), refresh_interval=float('inf'))
+    started = time.perf_counter()
+    index.sync()
+    return index, time.perf_counter() - started
+
+
+def _setup_scan(corpus: str, workdir: str, workers: int):
+    service = SearchService(corpus)
+    return 0.0, service, service.search_keyword
+
+
+def _setup_parallel(corpus: str, workdir: str, workers: int):
+    service = SearchService(corpus, scan_workers=workers, parallel_min_files=1)
+    return 0.0, service, service.search_keyword
+
+
+def _setup_indexed(corpus: str, workdir: str, workers: int):
+    index, build_seconds = _build_index(corpus, workdir)
+    service = SearchService(corpus, search_index=index)
+    return build_seconds, service, service.search_keyword
+
+
+def _setup_indexed_top10(corpus: str, workdir: str, workers: int):
+    index, build_seconds = _build_index(corpus, workdir)
+    service = SearchService(corpus, search_index=index)
+    return build_seconds, service, lambda keyword: service.search_keyword(keyword, top_n=10)
+
+
+def _setup_stream_first(corpus: str, workdir: str, workers: int):
+    """스트리밍 검색에서 첫 결과 파일이 나올 때까지의 시간"""
+    index, build_seconds = _build_index(corpus, workdir)
+    service = SearchService(corpus, search_index=index)
+    return build_seconds, service, lambda keyword: list(islice(service.iter_search(keyword, ranked=True), 1))
+
+
+def _setup_query(corpus: str, workdir: str, workers: int):
+    index, build_seconds = _build_index(corpus, workdir)
+    service = SearchService(corpus, search_index=index)
+    return build_seconds, service, service.search_query
+
+
+def _setup_fuzzy(corpus: str, workdir: str, workers: int):
+    index, build_seconds = _build_index(corpus, workdir)
+    service = SearchService(corpus, search_index=index)
+    return build_seconds, service, service.search_fuzzy
+
+
+ENGINES: Dict[str, Tuple[List[str], EngineSetup]] = {
+    'scan': (KEYWORD_QUERIES, _setup_scan),
+    'parallel': (KEYWORD_QUERIES, _setup_parallel),
+    'indexed': (KEYWORD_QUERIES, _setup_indexed),
+    'indexed_top10': (KEYWORD_QUERIES, _setup_indexed_top10),
+    'stream_first': (KEYWORD_QUERIES, _setup_stream_first),
+    'query': (BOOLEAN_QUERIES, _setup_query),
+    'fuzzy': (FUZZY_QUERIES, _setup_fuzzy),
+}
+
+
+# ----------------------------------------------------------------------
+# 측정
+# ----------------------------------------------------------------------
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """nearest-rank 방식 백분위수"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * percent // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def _peak_rss_kb(who: int) -> Optional[int]:
+    """프로세스(또는 자식 프로세스 중 최대)의 최대 RSS(KB)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(who).ru_maxrss
+    # macOS는 바이트, Linux는 KB 단위
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def run_engine(name: str, corpus: str, repeat: int, warmup: int, workers: int) -> Dict[str, Any]:
+    """엔진 하나를 실행하고 측정 결과 반환 (최대 RSS를 엔진별로 재기 위해 별도 프로세스에서 호출)"""
+    queries, setup = ENGINES[name]
+    workdir = tempfile.mkdtemp(prefix=f'search_bench_{name}_')
+    try:
+        setup_seconds, service, search = setup(corpus, workdir, workers)
+
+        for _ in range(warmup):
+            for query in queries:
+                search(query)
+
+        latencies: Dict[str, List[float]] = {query: [] for query in queries}
+        result_files: Dict[str, int] = {}
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for query in queries:
+                t0 = time.perf_counter()
+                result = search(query)
+                latencies[query].append((time.perf_counter() - t0) * 1000)
+                result_files[query] = len(result)
+        elapsed = time.perf_counter() - started
+        # 병렬 스캔 워커를 종료해야 자식 프로세스의 최대 RSS가 집계됨
+        service.close()
+
+        samples = sorted(ms for values in latencies.values() for ms in values)
+        return {
+            'setup_seconds': round(setup_seconds, 3),
+            'queries': len(samples),
+            'p50_ms': round(_percentile(samples, 50), 3),
+            'p95_ms': round(_percentile(samples, 95), 3),
+            'p99_ms': round(_percentile(samples, 99), 3),
+            'max_ms': round(samples[-1], 3) if samples else 0.0,
+            'throughput_qps': round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+            'peak_rss_kb': _peak_rss_kb(resource.RUSAGE_SELF) if resource else None,
+            'peak_children_rss_kb': _peak_rss_kb(resource.RUSAGE_CHILDREN) if resource else None,
+            'per_query': {
+                query: {
+                    'p50_ms': round(_percentile(sorted(values), 50), 3),
+                    'files': result_files.get(query, 0),
+                }
+                for query, values in latencies.items()
+            },
+        }
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def _run_isolated(name: str, corpus: str, repeat: int, warmup: int, workers: int) -> Dict[str, Any]:
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_engine, name, corpus, repeat, warmup, workers).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='합성 코퍼스로 검색 엔진별 지연 시간/처리량/메모리를 측정하여 JSON으로 출력')
+    parser.add_argument('--files', type=int, default=1000,
+                        help='생성할 마크다운 파일 수 (기본: 1000)')
+    parser.add_argument('--seed', type=int, default=42,
+                        help='코퍼스 생성 시드 (기본: 42)')
+    parser.add_argument('--table-ratio', type=float, default=0.05,
+                        help='섹션마다 긴 표(200~3000행)가 들어갈 확률 (기본: 0.05)')
+    parser.add_argument('--corpus', default=None,
+                        help='코퍼스 폴더 (지정하면 유지/재사용, 기본: 임시 폴더)')
+    parser.add_argument('--engines', nargs='+', default=['scan', 'indexed', 'query', 'fuzzy'],
+                        choices=sorted(ENGINES), help='실행할 검색 엔진')
+    parser.add_argument('--repeat', type=int, default=5,
+                        help='질의 묶음 반복 횟수 (기본: 5)')
+    parser.add_argument('--warmup', type=int, default=1,
+                        help='측정 전 워밍업 횟수 (기본: 1)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='parallel 엔진의 워커 수 (기본: CPU 수)')
+    parser.add_argument('--output', default=None,
+                        help='결과 JSON 파일 경로 (기본: 표준 출력)')
+    args = parser.parse_args()
+
+    corpus = args.corpus or tempfile.mkdtemp(prefix='search_bench_corpus_')
+    try:
+        print(f"코퍼스 준비 중: {corpus} ({args.files}개 파일)", file=sys.stderr)
+        manifest = generate_corpus(corpus, args.files, args.seed, args.table_ratio)
+
+        report = {
+            'meta': {
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'files': args.files,
+                'seed': args.seed,
+                'table_ratio': args.table_ratio,
+                'corpus_bytes': manifest['total_bytes'],
+                'repeat': args.repeat,
+                'warmup': args.warmup,
+            },
+            'engines': {},
+        }
+        for name in args.engines:
+            print(f"측정 중: {name}", file=sys.stderr)
+            report['engines'][name] = _run_isolated(name, corpus, args.repeat, args.warmup, args.workers)
+    finally:
+        if args.corpus is None:
+            shutil.rmtree(corpus, ignore_errors=True)
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
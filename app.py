@@ -1,11 +1,21 @@
 import os
+import time
 import uuid
 from flask import Flask, jsonify, send_file, Response, request
 
 from models.file_handler import FileHandler
 from services.converter_service import ConverterService
 from services.search_service import SearchService
+from services.search_index import SearchIndex
+from services.content_cache import ContentCache
+from services.conversion_cache import ConversionCache
+from services.job_queue import JobQueue
+from services.admission import AdmissionController
+from services.input_manifest import InputManifest
+from services.input_watcher import InputWatcher
+from services.metrics import Metrics
 from services.hwp_converter_service import get_hwp_text
+from services.process_stats import memory_usage, format_memory_usage
 import logging # 로깅 모듈
 from logging.handlers import TimedRotatingFileHandler # 일자별 로깅 핸들러
 from controllers.document_controller import DocumentController
@@ -14,15 +24,37 @@ from controllers.view_controller import ViewController
 
 def create_app():
     """애플리케이션 팩토리 패턴을 사용하여 Flask 애플리케이션 생성"""
+    startup_started = time.time()
     app = Flask(__name__, 
                 static_folder='templates',  # templates 폴더를 static 폴더로도 사용
                 static_url_path='')
     
     # 설정
     app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'dev_key_' + str(uuid.uuid4()))
+    app.json.sort_keys = False  # 검색 결과를 관련도(BM25) 순서 그대로 응답
     app.config['INPUT_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
     app.config['OUTPUT_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'output')
     app.config['LOGS_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'logs') # 로그 폴더 설정
+    app.config['DATA_FOLDER'] = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data') # 검색 색인 등 내부 데이터 폴더
+    app.config['SEARCH_INDEX_REFRESH_SECONDS'] = float(os.environ.get('SEARCH_INDEX_REFRESH_SECONDS', 30)) # 출력 폴더 재동기화 주기
+    app.config['SEARCH_CACHE_MAX_BYTES'] = int(os.environ.get('SEARCH_CACHE_MAX_BYTES', 128 * 1024 * 1024)) # 워커별 검색 내용 캐시 예산
+    app.config['SEARCH_SCAN_WORKERS'] = int(os.environ.get('SEARCH_SCAN_WORKERS', min(2, os.cpu_count() or 1))) # 색인 없을 때 병렬 스캔 프로세스 수 (gunicorn 워커마다 따로 띄움, 1 이하이면 사용 안 함)
+    app.config['SEARCH_PARALLEL_MIN_FILES'] = int(os.environ.get('SEARCH_PARALLEL_MIN_FILES', 200)) # 병렬 스캔을 시작할 최소 파일 수
+    app.config['SEARCH_MMAP_MIN_BYTES'] = int(os.environ.get('SEARCH_MMAP_MIN_BYTES', 1024 * 1024)) # mmap 바이트 검색을 사용할 최소 파일 크기
+    app.config['CONVERSION_CACHE_MAX_BYTES'] = int(os.environ.get('CONVERSION_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024)) # 변환 결과 캐시 최대 크기
+    app.config['CONVERSION_WORKERS'] = int(os.environ.get('CONVERSION_WORKERS', min(4, os.cpu_count() or 1))) # 변환 프로세스 풀 워커 수 (1 이하이면 사용 안 함)
+    app.config['CONVERSION_MEMORY_BUDGET_MB'] = int(os.environ.get('CONVERSION_MEMORY_BUDGET_MB', 4096)) # 워커(변환 프로세스 포함) 메모리 예산 - 넘으면 작업은 대기열에서 기다림 (0이면 입장 제어 안 함)
+    app.config['JOB_AGING_SECONDS'] = float(os.environ.get('JOB_AGING_SECONDS', 60)) # 대기 작업의 우선순위를 한 단계 올리는 대기 시간
+    app.config['JOB_MAX_ATTEMPTS'] = int(os.environ.get('JOB_MAX_ATTEMPTS', 3)) # 워커가 중단된 작업을 다시 시도하는 최대 횟수 (넘으면 실패)
+    app.config['CONVERSION_TIMEOUT_SECONDS'] = float(os.environ.get('CONVERSION_TIMEOUT_SECONDS', 3600)) # 변환 작업 하나의 제한 시간 (넘으면 워커 종료 후 실패, 0이면 제한 없음)
+    app.config['CONVERSION_CPU_TIMEOUT_SECONDS'] = float(os.environ.get('CONVERSION_CPU_TIMEOUT_SECONDS', 900)) # 변환 워커 호출 하나의 CPU 시간 제한 (0이면 제한 없음)
+    app.config['PDF_CHUNK_PAGES'] = int(os.environ.get('PDF_CHUNK_PAGES', 20)) # 이보다 긴 PDF는 페이지 범위로 나누어 변환 (0이면 나누지 않음)
+    app.config['HWP_PARALLEL_MIN_MB'] = int(os.environ.get('HWP_PARALLEL_MIN_MB', 5)) # 이보다 큰 HWP는 섹션별로 나누어 병렬 변환 (0이면 나누지 않음)
+    app.config['INPUT_WATCHER'] = os.environ.get('INPUT_WATCHER', '0') == '1' # 입력 폴더를 감시하여 새 파일/바뀐 파일 자동 변환
+    app.config['INPUT_WATCHER_DEBOUNCE_SECONDS'] = float(os.environ.get('INPUT_WATCHER_DEBOUNCE_SECONDS', 2)) # 크기/mtime이 이 시간 동안 그대로여야 다 쓴 파일로 봄
+    app.config['INPUT_WATCHER_POLL_SECONDS'] = float(os.environ.get('INPUT_WATCHER_POLL_SECONDS', 2)) # inotify가 없을 때 폴더를 다시 확인하는 간격
+    app.config['PRELOAD_APP'] = os.environ.get('DOCQUERY_PRELOAD', '0') == '1' # gunicorn preload 모드 (gunicorn.conf.py에서 설정)
+    app.config['CONVERTER_PRELOAD_FORMATS'] = [name.strip() for name in os.environ.get('CONVERTER_PRELOAD_FORMATS', 'pdf,docx').split(',') if name.strip()] # preload 시 미리 초기화할 docling 형식
     app.config['ALLOWED_EXTENSIONS'] = {'txt','pdf', 'docx', 'xlsx', 'html', 'htm', 'png', 'jpg', 'jpeg', 'hwp'}
 
     # 로거 설정
@@ -88,16 +120,91 @@ def create_app():
     app.logger.info(f"Application logging initialized. Log files will be stored in: {log_directory}")
     
     # 의존성 주입을 통한 컴포넌트 초기화
+    search_index = SearchIndex(
+        app.config['OUTPUT_FOLDER'],
+        os.path.join(app.config['DATA_FOLDER'], 'search_index.sqlite3'),
+        refresh_interval=app.config['SEARCH_INDEX_REFRESH_SECONDS']
+    )
     file_handler = FileHandler(
         app.config['INPUT_FOLDER'],
         app.config['OUTPUT_FOLDER'],
-        app.config['ALLOWED_EXTENSIONS']
+        app.config['ALLOWED_EXTENSIONS'],
+        search_index=search_index
+    )
+    conversion_cache = ConversionCache(
+        os.path.join(app.config['DATA_FOLDER'], 'conversion_cache'),
+        max_bytes=app.config['CONVERSION_CACHE_MAX_BYTES']
+    )
+    admission = None
+    if app.config['CONVERSION_MEMORY_BUDGET_MB'] > 0:
+        admission = AdmissionController(app.config['CONVERSION_MEMORY_BUDGET_MB'] * 1024 * 1024)
+    metrics = Metrics(os.path.join(app.config['DATA_FOLDER'], 'metrics.sqlite3'))
+    input_manifest = InputManifest(
+        os.path.join(app.config['DATA_FOLDER'], 'input_manifest.sqlite3'),
+        app.config['INPUT_FOLDER'],
+        content_hash=conversion_cache.content_hash
+    )
+    converter_service = ConverterService(
+        search_index=search_index,
+        conversion_cache=conversion_cache,
+        conversion_workers=app.config['CONVERSION_WORKERS'],
+        job_queue=JobQueue(
+            os.path.join(app.config['DATA_FOLDER'], 'jobs.sqlite3'),
+            aging_seconds=app.config['JOB_AGING_SECONDS'],
+            max_attempts=app.config['JOB_MAX_ATTEMPTS']
+        ),
+        pdf_chunk_pages=app.config['PDF_CHUNK_PAGES'],
+        admission=admission,
+        output_folder=app.config['OUTPUT_FOLDER'],
+        input_manifest=input_manifest,
+        metrics=metrics,
+        conversion_timeout_seconds=app.config['CONVERSION_TIMEOUT_SECONDS'],
+        conversion_cpu_timeout_seconds=app.config['CONVERSION_CPU_TIMEOUT_SECONDS'],
+        hwp_parallel_min_bytes=app.config['HWP_PARALLEL_MIN_MB'] * 1024 * 1024
+    )
+    if app.config['PRELOAD_APP']:
+        # 마스터에서 모델을 한 번만 로드하고 워커는 copy-on-write로 공유
+        # (변환 프로세스 풀을 쓰면 풀 워커가 각자 로드하므로 마스터에서는 생략 - 풀은 post_fork에서 워커마다 시작)
+        if app.config['CONVERSION_WORKERS'] <= 1:
+            converter_service.warm_up(app.config['CONVERTER_PRELOAD_FORMATS'])
+        # 작업 큐 처리 스레드는 fork 후 각 워커에서 시작 (gunicorn.conf.py의 post_fork)
+    else:
+        # 이전 실행에서 남은 대기 작업도 이어서 처리
+        converter_service.start_dispatcher()
+    app.extensions['converter_service'] = converter_service
+
+    if app.config['INPUT_WATCHER']:
+        def ingest_input_files(filenames):
+            """감시에서 넘어온 파일 중 새 파일/바뀐 파일만 변환 작업 큐에 등록 (변환되면 검색 색인도 갱신됨)"""
+            plan = input_manifest.plan(filenames, update=True, check_deleted=False)
+            targets = plan['new'] + plan['changed']
+            if targets:
+                converter_service.submit_batch([os.path.join(app.config['INPUT_FOLDER'], name) for name in targets],
+                                               background=True)
+
+        input_watcher = InputWatcher(
+            app.config['INPUT_FOLDER'],
+            app.config['ALLOWED_EXTENSIONS'],
+            ingest_input_files,
+            lock_path=os.path.join(app.config['DATA_FOLDER'], 'input_watcher.lock'),
+            debounce_seconds=app.config['INPUT_WATCHER_DEBOUNCE_SECONDS'],
+            poll_seconds=app.config['INPUT_WATCHER_POLL_SECONDS']
+        )
+        # preload 모드에서는 fork 후 각 워커에서 시작 (잠금을 얻은 한 워커만 감시)
+        if not app.config['PRELOAD_APP']:
+            input_watcher.start()
+        app.extensions['input_watcher'] = input_watcher
+    search_service = SearchService(
+        app.config['OUTPUT_FOLDER'],
+        search_index=search_index,
+        content_cache=ContentCache(app.config['SEARCH_CACHE_MAX_BYTES']),
+        scan_workers=app.config['SEARCH_SCAN_WORKERS'],
+        parallel_min_files=app.config['SEARCH_PARALLEL_MIN_FILES'],
+        mmap_min_bytes=app.config['SEARCH_MMAP_MIN_BYTES']
     )
-    converter_service = ConverterService()
-    search_service = SearchService(app.config['OUTPUT_FOLDER'])
     
     # 컨트롤러 초기화
-    document_controller = DocumentController(file_handler, converter_service, search_service)
+    document_controller = DocumentController(file_handler, converter_service, search_service, input_manifest, metrics)
     view_controller = ViewController(file_handler)
     
     # 라우트 등록
@@ -120,6 +227,50 @@ def create_app():
     @app.route('/search', methods=['POST'])
     def search():
         return document_controller.search()
+
+    @app.route('/search/stream', methods=['GET', 'POST'])
+    def search_stream():
+        return document_controller.search_stream()
+
+    @app.route('/api/search/cache-stats')
+    def search_cache_stats():
+        return document_controller.search_cache_stats()
+
+    @app.route('/api/conversion-cache/stats')
+    def conversion_cache_stats():
+        return document_controller.conversion_cache_stats()
+
+    @app.route('/api/conversion-admission/stats')
+    def conversion_admission_stats():
+        return document_controller.conversion_admission_stats()
+
+    @app.route('/metrics')
+    def export_metrics():
+        return document_controller.export_metrics()
+
+    @app.route('/api/batches/<batch_id>')
+    def batch_status(batch_id):
+        return document_controller.batch_status(batch_id)
+
+    @app.route('/api/batches/<batch_id>/cancel', methods=['POST'])
+    def cancel_batch(batch_id):
+        return document_controller.cancel_batch(batch_id)
+
+    @app.route('/api/batches/<batch_id>/events')
+    def batch_events(batch_id):
+        return document_controller.batch_events(batch_id)
+
+    @app.route('/api/conversion/<task_id>')
+    def conversion_status(task_id):
+        return document_controller.conversion_status(task_id)
+
+    @app.route('/api/conversion/<task_id>/cancel', methods=['POST'])
+    def cancel_conversion(task_id):
+        return document_controller.cancel_conversion(task_id)
+
+    @app.route('/api/conversion-workers/stats')
+    def conversion_worker_stats():
+        return document_controller.conversion_worker_stats()
     
     @app.route('/api/hwp-to-markdown/<filename>')
     def convert_hwp_to_markdown(filename):
@@ -184,12 +335,18 @@ def create_app():
     os.makedirs(app.config['INPUT_FOLDER'], exist_ok=True)
     os.makedirs(app.config['OUTPUT_FOLDER'], exist_ok=True)
     os.makedirs(app.config['LOGS_FOLDER'], exist_ok=True) # 로그 폴더 생성
+    os.makedirs(app.config['DATA_FOLDER'], exist_ok=True) # 데이터 폴더 생성
     
     # node_modules 폴더를 정적 파일로 제공하는 라우트 추가
     @app.route('/node_modules/<path:filename>')
     def serve_node_modules(filename):
         node_modules_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'node_modules')
         return send_file(os.path.join(node_modules_path, filename))
+
+    app.logger.info(
+        f"Application startup completed in {time.time() - startup_started:.2f}s "
+        f"(pid={os.getpid()}, preload={app.config['PRELOAD_APP']}, {format_memory_usage(memory_usage())})"
+    )
     
     return app
 
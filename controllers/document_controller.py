@@ -1,21 +1,33 @@
-from flask import request, flash, redirect, url_for, jsonify, make_response
-from typing import List
+from flask import request, flash, redirect, url_for, jsonify, make_response, Response, stream_with_context
+from typing import List, Dict, Any, Optional
 import os
 import re
+import json
+import time
 import tempfile 
 
 from models.file_handler import FileHandler
 from services.converter_service import ConverterService
 from services.search_service import SearchService
+from services.search_query import parse_query, QuerySyntaxError
+from services.input_manifest import InputManifest
+from services.metrics import Metrics
 
 
 class DocumentController:
     """문서 변환 및 검색 처리를 담당하는 컨트롤러"""
     
-    def __init__(self, file_handler: FileHandler, converter_service: ConverterService, search_service: SearchService):
+    # 배치 진행 이벤트(SSE)를 보낼 때 작업 상태를 다시 확인하는 간격(초)과 keep-alive 간격(초)
+    BATCH_EVENTS_POLL_SECONDS = 1.0
+    BATCH_EVENTS_KEEPALIVE_SECONDS = 15.0
+
+    def __init__(self, file_handler: FileHandler, converter_service: ConverterService, search_service: SearchService,
+                 input_manifest: Optional[InputManifest] = None, metrics: Optional[Metrics] = None):
         self.file_handler = file_handler
         self.converter_service = converter_service
         self.search_service = search_service
+        self.input_manifest = input_manifest  # 있으면 convert-all이 새 파일/바뀐 파일만 변환
+        self.metrics = metrics  # 있으면 검색 응답 시간 기록 및 /metrics 제공
     
     def upload_file(self):
         """파일 업로드 처리"""
@@ -37,54 +49,238 @@ class DocumentController:
         return redirect(url_for('index'))
     
     def convert_documents(self):
-        """선택된 문서 변환 처리"""
+        """선택된 문서 변환 요청 - 작업 큐에 배치로 넣고 바로 202와 배치 ID 반환"""
         selected_files = request.form.getlist('files')
         
         if not selected_files:
-            flash('No files selected')
-            return redirect(url_for('index'))
+            return jsonify({'error': 'No files selected'}), 400
         
-        self._process_files_conversion(selected_files)
-        return redirect(url_for('index'))
+        return self._submit_conversion_batch(selected_files)
     
     def convert_all_documents(self):
-        """모든 문서 변환 처리"""
+        """모든 문서 변환 요청 - 작업 큐에 배치로 넣고 바로 202와 배치 ID 반환
+
+        입력 기록이 있으면 새 파일과 바뀐 파일만 변환하고, 지워진 입력이 만든 출력 파일은 삭제한다.
+        dry_run=1이면 아무것도 바꾸지 않고 계획만, full=1이면 모든 파일을 다시 변환한다.
+        """
         input_files = self.file_handler.get_input_files()
-        
-        if not input_files:
-            flash('No files in input folder')
-            return redirect(url_for('index'))
-        
-        self._process_files_conversion(input_files)
-        return redirect(url_for('index'))
+        dry_run = request.values.get('dry_run', '0') == '1'
+        full = request.values.get('full', '0') == '1'
+
+        if self.input_manifest is None:
+            if not input_files:
+                return jsonify({'error': 'No files in input folder'}), 400
+            return self._submit_conversion_batch(input_files, background=True)
+
+        plan = self.input_manifest.plan(input_files, update=not dry_run)
+        if dry_run:
+            return jsonify({'dry_run': True, **plan, 'summary': self._plan_summary(plan)})
+
+        removed_outputs = [path for path in plan['orphaned_outputs'] if self.file_handler.remove_output_file(path)]
+        self.input_manifest.remove(plan['deleted'])
+        extra = {'summary': self._plan_summary(plan), 'removed_outputs': removed_outputs}
+
+        targets = input_files if full else plan['new'] + plan['changed']
+        if not targets:
+            return jsonify({'batch_id': None, 'message': 'All files are up to date', **extra})
+        return self._submit_conversion_batch(targets, extra, background=True)
+
+    def _plan_summary(self, plan: Dict[str, Any]) -> Dict[str, int]:
+        return {key: len(value) for key, value in plan.items()}
     
     def search(self):
-        """키워드 검색 처리"""
+        """키워드 검색 처리
+
+        mode=query이면 AND/OR/NOT, "구문", NEAR/n 질의로, mode=fuzzy이면 오타를 허용하여 검색
+        """
         keyword = request.form.get('keyword', '')
+        top_n = request.form.get('top_n', type=int)
+        mode = request.form.get('mode', 'keyword')
+        started = time.perf_counter()
+        try:
+            return self._search(keyword, top_n, mode)
+        finally:
+            self._observe_search('search', mode, started)
+
+    def _search(self, keyword: str, top_n: Optional[int], mode: str):
+        if mode == 'query':
+            try:
+                result = self.search_service.search_query(keyword, top_n=top_n)
+            except QuerySyntaxError as e:
+                return jsonify({'error': str(e)}), 400
+            return jsonify(result)
+        if mode == 'fuzzy':
+            return jsonify(self.search_service.search_fuzzy(keyword, top_n=top_n))
         # 정규식 이스케이프는 search_service에서 처리
-        result = self.search_service.search_keyword(keyword)
+        result = self.search_service.search_keyword(keyword, top_n=top_n)
         return jsonify(result)
+
+    def search_stream(self):
+        """키워드 검색 결과를 파일 단위 NDJSON으로 스트리밍
+
+        limit(전체 스니펫 수), max_files(결과 파일 수)에 도달하면 검색을 조기 종료한다.
+        ranked=1이면 BM25 점수가 높은 문서부터 보낸다. mode=query이면 질의 언어로,
+        mode=fuzzy이면 오타를 허용하여 검색한다.
+        마지막 줄에는 {"done": true, ...} 요약을 보낸다.
+        """
+        keyword = request.values.get('keyword', '')
+        limit = request.values.get('limit', type=int)
+        max_files = request.values.get('max_files', type=int)
+        ranked = request.values.get('ranked', '0') == '1'
+        mode = request.values.get('mode', 'keyword')
+
+        if mode == 'query':
+            # 스트리밍 시작 전에 문법 오류를 확인하여 400으로 응답
+            try:
+                parse_query(keyword)
+            except QuerySyntaxError as e:
+                return jsonify({'error': str(e)}), 400
+            results = self.search_service.iter_query(keyword, limit=limit, max_files=max_files)
+        elif mode == 'fuzzy':
+            results = self.search_service.iter_fuzzy(keyword, limit=limit, max_files=max_files)
+        else:
+            results = self.search_service.iter_search(keyword, limit=limit, max_files=max_files, ranked=ranked)
+
+        started = time.perf_counter()
+
+        def generate():
+            files = 0
+            total = 0
+            try:
+                for filename, entry in results:
+                    files += 1
+                    total += entry['count']
+                    yield json.dumps({'filename': filename, **entry}, ensure_ascii=False) + '\n'
+                yield json.dumps({'done': True, 'files': files, 'total': total}) + '\n'
+            finally:
+                # 마지막 결과까지 보내는 데 걸린 시간 (클라이언트가 중간에 끊으면 그때까지)
+                self._observe_search('stream', mode, started)
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+    def _observe_search(self, endpoint: str, mode: str, started: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe('docquery_search_seconds', time.perf_counter() - started, endpoint=endpoint, mode=mode)
+
+    def export_metrics(self):
+        """Prometheus 텍스트 형식 메트릭 (모든 워커 합계)"""
+        if self.metrics is None:
+            return jsonify({'error': '메트릭이 설정되지 않았습니다'}), 404
+        return Response(self.metrics.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+    def search_cache_stats(self):
+        """검색 내용 캐시 통계 (현재 워커 기준)"""
+        return jsonify(self.search_service.get_cache_stats())
+
+    def conversion_cache_stats(self):
+        """변환 결과 캐시 통계 (모든 워커 합계)"""
+        return jsonify(self.converter_service.get_conversion_cache_stats())
+
+    def conversion_admission_stats(self):
+        """변환 입장 제어(메모리 예산) 통계 (현재 워커 기준)"""
+        return jsonify(self.converter_service.get_admission_stats())
+
+    def conversion_status(self, task_id: str):
+        """비동기 변환 작업 상태 (어느 워커에서 등록한 작업이든 조회 가능)"""
+        status = self.converter_service.get_conversion_status(task_id)
+        if status['status'] == 'not_found':
+            return jsonify(status), 404
+        return jsonify(status)
+    
+    def cancel_conversion(self, task_id: str):
+        """변환 작업 취소 - 대기 중이면 바로, 처리 중이면 워커가 변환을 중단한 뒤 'cancelled'가 됨"""
+        status = self.converter_service.cancel_conversion(task_id)
+        if status is None:
+            return jsonify({'error': f"작업 ID를 찾을 수 없습니다: {task_id}"}), 404
+        if status not in ('cancelled', 'cancelling'):
+            return jsonify({'task_id': task_id, 'status': status, 'error': '이미 끝난 작업입니다'}), 409
+        return jsonify({'task_id': task_id, 'status': status})
+
+    def cancel_batch(self, batch_id: str):
+        """변환 배치의 끝나지 않은 작업 전체 취소"""
+        result = self.converter_service.cancel_batch(batch_id)
+        if result is None:
+            return jsonify({'error': f"배치 ID를 찾을 수 없습니다: {batch_id}"}), 404
+        return jsonify({'batch_id': batch_id, **result})
+
+    def conversion_worker_stats(self):
+        """변환 프로세스 풀 워커 수와 강제 종료/비정상 종료 횟수 (현재 워커 기준)"""
+        return jsonify(self.converter_service.get_worker_pool_stats())
+
+    def batch_status(self, batch_id: str):
+        """변환 배치의 파일별 작업 상태"""
+        status = self.converter_service.get_batch_status(batch_id)
+        if status is None:
+            return jsonify({'error': f"배치 ID를 찾을 수 없습니다: {batch_id}"}), 404
+        return jsonify(status)
+
+    def batch_events(self, batch_id: str):
+        """변환 배치 진행 상황을 SSE(text/event-stream)로 전송
+
+        상태가 바뀐 작업마다 'job' 이벤트를, 모든 작업이 끝나면 요약과 함께 'done' 이벤트를 보낸다.
+        """
+        if self.converter_service.get_batch_status(batch_id) is None:
+            return jsonify({'error': f"배치 ID를 찾을 수 없습니다: {batch_id}"}), 404
+
+        def generate():
+            sent = {}
+            last_sent = time.time()
+            while True:
+                status = self.converter_service.get_batch_status(batch_id)
+                for job in status['jobs']:
+                    state = (job['status'], job['pages_done'])
+                    if sent.get(job['task_id']) != state:
+                        sent[job['task_id']] = state
+                        last_sent = time.time()
+                        yield f"event: job\ndata: {json.dumps(job, ensure_ascii=False)}\n\n"
+                if status['done']:
+                    summary = {key: value for key, value in status.items() if key != 'jobs'}
+                    yield f"event: done\ndata: {json.dumps(summary, ensure_ascii=False)}\n\n"
+                    return
+                if time.time() - last_sent >= self.BATCH_EVENTS_KEEPALIVE_SECONDS:
+                    # 프록시가 유휴 연결을 끊지 않도록 주석 줄 전송
+                    last_sent = time.time()
+                    yield ": keep-alive\n\n"
+                time.sleep(self.BATCH_EVENTS_POLL_SECONDS)
+
+        return Response(stream_with_context(generate()), mimetype='text/event-stream',
+                        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
     
-    def _process_files_conversion(self, filenames: List[str]):
-        """파일 변환 처리 공통 로직"""
+    def _submit_conversion_batch(self, filenames: List[str], extra: Optional[Dict[str, Any]] = None,
+                                 background: bool = False):
+        """파일 변환 요청 공통 로직 - 파일명을 확인하고 작업 큐에 배치로 등록 (extra는 응답에 추가)
+
+        background이면 선택한 파일 변환보다 낮은 우선순위로 처리 (convert-all)
+        """
+        input_paths = []
+        skipped = []
         for filename in filenames:
             if not self.file_handler.allowed_file(filename):
-                flash(f'File {filename} is not allowed')
+                skipped.append({'filename': filename, 'error': f'File {filename} is not allowed'})
                 continue
             
             input_path = os.path.join(self.file_handler.input_folder, filename)
             
             # 파일이 존재하는지 확인
             if not os.path.exists(input_path):
-                flash(f'File {filename} not found')
+                skipped.append({'filename': filename, 'error': f'File {filename} not found'})
                 continue
-            
-            # 문서 변환
-            markdown_content = self.converter_service.convert_document_to_markdown(input_path)
-            
-            if markdown_content:
-                # 마크다운 파일 저장
-                self.file_handler.save_markdown_content(filename, markdown_content)
-                flash(f'Successfully converted {filename} to markdown')
-            else:
-                flash(f'Failed to convert {filename}')
+
+            input_paths.append(input_path)
+
+        if not input_paths:
+            return jsonify({'error': 'No files to convert', 'skipped': skipped}), 400
+
+        batch_id, task_ids = self.converter_service.submit_batch(input_paths, background=background)
+        response = jsonify({
+            'batch_id': batch_id,
+            'status_url': url_for('batch_status', batch_id=batch_id),
+            'events_url': url_for('batch_events', batch_id=batch_id),
+            'jobs': [{'task_id': task_id, 'filename': os.path.basename(path)}
+                     for task_id, path in zip(task_ids, input_paths)],
+            'skipped': skipped,
+            **(extra or {}),
+        })
+        response.status_code = 202
+        response.headers['Location'] = url_for('batch_status', batch_id=batch_id)
+        return response
@@ -44,7 +44,7 @@ After=network.target
 User=$USER
 WorkingDirectory=$(pwd)
 Environment="PATH=$(pwd)/venv/bin:/usr/local/bin"
-ExecStart=$(pwd)/venv/bin/gunicorn --workers 4 --worker-class gevent --bind 0.0.0.0:5000 wsgi:app
+ExecStart=$(pwd)/venv/bin/gunicorn -c gunicorn.conf.py wsgi:app
 Restart=always
 
 [Install]
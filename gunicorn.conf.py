@@ -0,0 +1,55 @@
+"""gunicorn 설정 - `gunicorn -c gunicorn.conf.py wsgi:app`
+
+preload_app으로 마스터에서 앱(docling import, 변환 파이프라인)을 한 번만 초기화한 뒤
+fork하므로 워커들은 그 메모리를 copy-on-write로 공유하고 빠르게 뜬다.
+스레드/프로세스 풀/작업 큐 처리 스레드는 fork로 복사되지 않으므로 post_fork에서 워커마다 시작한다.
+"""
+import os
+import time
+
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gevent')
+if worker_class == 'gevent':
+    # gevent 워커는 fork 후에 monkey patch하므로 preload로 마스터에서 만든 잠금/스레드와 섞이면
+    # 멈출 수 있음 - 앱을 불러오기 전에 마스터에서 먼저 patch
+    from gevent import monkey
+    monkey.patch_all()
+
+from services.process_stats import memory_usage, format_memory_usage
+
+# create_app()이 preload 모드로 동작하도록 설정 (이 파일은 앱을 불러오기 전에 실행됨)
+os.environ.setdefault('DOCQUERY_PRELOAD', '1')
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', 8))  # gthread 워커에서만 사용
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+preload_app = os.environ.get('DOCQUERY_PRELOAD') == '1'
+
+_started = time.time()
+
+
+def when_ready(server):
+    """마스터 준비 완료 - 앱 초기화를 포함한 기동 시간과 마스터 메모리 보고"""
+    server.log.info(
+        f"DocQuery master ready in {time.time() - _started:.2f}s "
+        f"(preload={preload_app}, {format_memory_usage(memory_usage())})"
+    )
+
+
+def post_fork(server, worker):
+    """fork 직후 워커에서 변환 서비스의 풀/잠금을 새로 만들고 작업 큐 처리 및 입력 폴더 감시 시작"""
+    if not preload_app:
+        return
+    extensions = worker.app.wsgi().extensions
+    converter_service = extensions.get('converter_service')
+    if converter_service is not None:
+        converter_service.after_fork()
+    # 입력 폴더 감시는 잠금 파일을 얻은 워커 하나만 실행
+    input_watcher = extensions.get('input_watcher')
+    if input_watcher is not None:
+        input_watcher.start()
+
+
+def post_worker_init(server, worker):
+    """워커별 메모리 보고 - uss가 워커만 따로 쓰는 메모리 (나머지는 마스터와 공유)"""
+    server.log.info(f"Worker {worker.pid} ready ({format_memory_usage(memory_usage())})")
@@ -1,14 +1,18 @@
 import os
 from typing import List, Dict, Any, Optional
 
+from services.search_index import SearchIndex
+
 
 class FileHandler:
     """파일 처리를 담당하는 클래스"""
     
-    def __init__(self, input_folder: str, output_folder: str, allowed_extensions: set):
+    def __init__(self, input_folder: str, output_folder: str, allowed_extensions: set,
+                 search_index: Optional[SearchIndex] = None):
         self.input_folder = input_folder
         self.output_folder = output_folder
         self.allowed_extensions = allowed_extensions
+        self.search_index = search_index
         
         # 필요한 폴더 생성
         os.makedirs(self.input_folder, exist_ok=True)
@@ -66,26 +70,24 @@ class FileHandler:
         print(f"파일 업로드 완료: {file_path} (크기: {os.path.getsize(file_path)} 바이트)")
         return file_path
     
-    def save_markdown_content(self, original_filename: str, markdown_content: str) -> str:
-        """마크다운 내용을 파일로 저장하고 저장 경로 반환"""
-        base_filename = os.path.basename(original_filename)
-        output_filename = os.path.splitext(base_filename)[0] + '.md'
-        output_path = os.path.join(self.output_folder, output_filename)
-        
-        print(f"마크다운 저장 시작: {original_filename} -> {output_path}")
-        if not markdown_content:
-            print("마크다운 내용이 비어 있습니다.")
-            return ""
-            
+    def remove_output_file(self, output_path: str) -> bool:
+        """출력 폴더의 마크다운 파일을 삭제하고 검색 색인에서도 제거 (출력 폴더 밖의 경로는 무시)"""
+        abs_path = os.path.abspath(output_path)
+        if os.path.dirname(abs_path) != os.path.abspath(self.output_folder) or not abs_path.endswith('.md'):
+            print(f"출력 폴더의 마크다운 파일이 아니어서 삭제하지 않습니다: {output_path}")
+            return False
         try:
-            with open(output_path, 'wb') as f:
-                encoded_content = markdown_content.encode('utf-8', errors='ignore')
-                f.write(encoded_content)
-                print(f"마크다운 파일 저장 완료: {output_path} (크기: {len(encoded_content)} 바이트)")
+            os.remove(abs_path)
+            print(f"마크다운 파일 삭제 완료: {abs_path}")
+        except FileNotFoundError:
+            pass
         except Exception as e:
-            print(f"마크다운 파일 저장 중 오류: {str(e)}")
-            import traceback
-            traceback.print_exc()
-            return ""
-            
-        return output_path
+            print(f"마크다운 파일 삭제 중 오류: {str(e)}")
+            return False
+
+        if self.search_index is not None:
+            try:
+                self.search_index.remove_file(abs_path)
+            except Exception as e:
+                print(f"검색 색인 갱신 중 오류: {str(e)}")
+        return True
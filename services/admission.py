@@ -0,0 +1,97 @@
+import os
+import logging
+import threading
+from typing import Dict, Any
+
+from services.process_stats import current_rss_bytes
+
+logger = logging.getLogger(__name__)
+
+_MB = 1024 * 1024
+
+# 확장자별 예상 메모리 (고정 비용, 입력 크기 배수) - docling은 PDF/이미지 페이지를
+# 이미지로 렌더링하고 레이아웃/OCR 모델을 돌리므로 입력보다 훨씬 많은 메모리를 씀
+MEMORY_ESTIMATES = {
+    '.pdf': (200 * _MB, 30),
+    '.png': (200 * _MB, 50),
+    '.jpg': (200 * _MB, 50),
+    '.jpeg': (200 * _MB, 50),
+    '.docx': (50 * _MB, 10),
+    '.xlsx': (50 * _MB, 15),
+    '.html': (30 * _MB, 10),
+    '.htm': (30 * _MB, 10),
+    '.hwp': (20 * _MB, 8),
+    '.txt': (0, 2),
+}
+DEFAULT_MEMORY_ESTIMATE = (100 * _MB, 20)
+
+
+class AdmissionController:
+    """변환 작업을 메모리 예산 안에서만 시작하게 하는 입장 제어
+
+    작업마다 입력 크기와 형식으로 메모리 사용량을 추정해 예약하고, 현재 RSS(변환 워커
+    포함) + 예약량 + 새 작업 추정치가 예산을 넘으면 작업을 대기열에 남겨 다른 작업이 끝난 뒤 시작한다.
+    진행 중인 작업이 하나도 없으면 예산을 넘는 큰 작업도 하나는 시작한다 (영원히 대기 방지).
+    """
+
+    def __init__(self, memory_budget_bytes: int):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.reset()
+
+    def reset(self) -> None:
+        """예약 상태 초기화 (fork된 워커에서 부모의 잠금/예약을 버릴 때도 사용)"""
+        self._condition = threading.Condition()
+        self._reserved = 0
+        self._in_flight = 0
+        self._admitted = 0
+        self._deferred = 0
+
+    def estimate(self, file_path: str) -> int:
+        """파일 하나를 변환하는 데 필요한 메모리 추정치(바이트)"""
+        base, factor = MEMORY_ESTIMATES.get(os.path.splitext(file_path)[1].lower(), DEFAULT_MEMORY_ESTIMATE)
+        try:
+            size = os.path.getsize(file_path)
+        except OSError:
+            size = 0
+        return base + size * factor
+
+    def try_acquire(self, amount: int) -> bool:
+        """예산 안이면 amount만큼 예약하고 True (기다리지 않음)"""
+        with self._condition:
+            if not self._fits(amount):
+                self._deferred += 1
+                return False
+            self._reserved += amount
+            self._in_flight += 1
+            self._admitted += 1
+            return True
+
+    def release(self, amount: int) -> None:
+        with self._condition:
+            self._reserved = max(0, self._reserved - amount)
+            self._in_flight = max(0, self._in_flight - 1)
+            self._condition.notify_all()
+
+    def wait_for_release(self, timeout: float) -> None:
+        """다른 작업이 예약을 반환할 때까지 최대 timeout초 대기"""
+        with self._condition:
+            self._condition.wait(timeout)
+
+    def _fits(self, amount: int) -> bool:
+        if self._in_flight == 0:
+            return True
+        rss = current_rss_bytes(include_children=True) or 0
+        return rss + self._reserved + amount <= self.memory_budget_bytes
+
+    def stats(self) -> Dict[str, Any]:
+        """예산, 예약량, 진행 중 작업 수, 입장/보류 횟수 (현재 워커 기준)"""
+        with self._condition:
+            rss = current_rss_bytes(include_children=True)
+            return {
+                'memory_budget_mb': round(self.memory_budget_bytes / _MB, 1),
+                'rss_mb': round(rss / _MB, 1) if rss is not None else None,
+                'reserved_mb': round(self._reserved / _MB, 1),
+                'in_flight': self._in_flight,
+                'admitted': self._admitted,
+                'deferred': self._deferred,
+            }
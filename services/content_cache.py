@@ -0,0 +1,131 @@
+import os
+import sys
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+
+
+class CachedContent:
+    """디코딩된 파일 내용과 줄 시작 위치(문자 오프셋) 테이블"""
+
+    def __init__(self, content: str, mtime_ns: int, size: int):
+        self.content = content
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.line_starts = array('Q', [0])
+        pos = content.find('\n')
+        while pos != -1:
+            self.line_starts.append(pos + 1)
+            pos = content.find('\n', pos + 1)
+        self.line_count = len(self.line_starts)
+        # 캐시 예산 계산용 메모리 크기 추정치
+        self.nbytes = sys.getsizeof(content) + self.line_starts.itemsize * len(self.line_starts)
+
+    def get_line(self, i: int) -> str:
+        """i번째(0부터 시작) 줄 반환"""
+        start = self.line_starts[i]
+        end = self.line_starts[i + 1] - 1 if i + 1 < self.line_count else len(self.content)
+        return self.content[start:end]
+
+    def line_of(self, pos: int) -> int:
+        """문자 위치가 속한 줄 번호(0부터 시작) 반환"""
+        return bisect_right(self.line_starts, pos) - 1
+
+
+class ContentCache:
+    """검색용 파일 내용 캐시 - (mtime, size)로 유효성을 확인하고 바이트 예산 내에서 LRU로 제거"""
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedContent]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, file_path: str) -> CachedContent:
+        """캐시된 내용을 반환하고, 없거나 파일이 바뀌었으면 디스크에서 읽어 캐시에 넣음"""
+        st = os.stat(file_path)
+        entry = self._lookup(file_path, st)
+        if entry is not None:
+            return entry
+
+        with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+            content = f.read()
+        entry = CachedContent(content, st.st_mtime_ns, st.st_size)
+        self._store(file_path, entry)
+        return entry
+
+    def peek(self, file_path: str) -> Optional[CachedContent]:
+        """캐시에 유효한 항목이 있을 때만 반환 (디스크에서 새로 읽지 않음)"""
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            self.invalidate(file_path)
+            return None
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is None or (entry.mtime_ns, entry.size) != (st.st_mtime_ns, st.st_size):
+                return None
+            self._entries.move_to_end(file_path)
+            self.hits += 1
+            return entry
+
+    def _lookup(self, file_path: str, st: os.stat_result) -> Optional[CachedContent]:
+        with self._lock:
+            entry = self._entries.get(file_path)
+            if entry is not None:
+                if (entry.mtime_ns, entry.size) == (st.st_mtime_ns, st.st_size):
+                    self._entries.move_to_end(file_path)
+                    self.hits += 1
+                    return entry
+                # 파일이 변경됨 - 오래된 항목 제거
+                self._remove(file_path)
+                self.invalidations += 1
+            self.misses += 1
+            return None
+
+    def _store(self, file_path: str, entry: CachedContent) -> None:
+        # 예산보다 큰 파일은 캐시하지 않음
+        if entry.nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if file_path in self._entries:
+                self._remove(file_path)
+            self._entries[file_path] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes and self._entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, file_path: str) -> None:
+        entry = self._entries.pop(file_path)
+        self._bytes -= entry.nbytes
+
+    def invalidate(self, file_path: str) -> None:
+        """파일이 다시 저장되었거나 삭제되었을 때 캐시 항목 제거"""
+        with self._lock:
+            if file_path in self._entries:
+                self._remove(file_path)
+                self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """캐시 적중/실패/제거 횟수와 사용량 반환 (워커별 예산 산정용)"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'pid': os.getpid(),
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
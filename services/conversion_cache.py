@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 입력 파일 해시 계산 시 한 번에 읽는 크기
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(file_path: str) -> str:
+    """입력 파일 내용의 sha256 (큰 파일도 메모리에 모두 올리지 않고 나누어 읽음)"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ConversionCache:
+    """입력 내용 해시 + 변환기 식별자/버전 + 변환 옵션을 키로 하는 변환 결과(마크다운) 캐시
+
+    마크다운은 cache_dir 아래 파일로, 항목 목록과 적중 통계는 SQLite에 저장하므로
+    gunicorn 워커 간에 공유되고 재시작 후에도 유지된다. 전체 크기가 max_bytes를 넘으면
+    가장 오래 사용되지 않은 항목부터 제거한다.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = 2 * 1024 * 1024 * 1024,
+                 max_memo_entries: int = 4096):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.db_path = os.path.join(cache_dir, 'entries.sqlite3')
+        self._local = threading.local()
+        # (경로, mtime, 크기) -> 내용 해시 메모 - 바뀌지 않은 파일을 다시 해시하지 않음
+        self._hash_memo: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._memo_lock = threading.Lock()
+        self.max_memo_entries = max_memo_entries
+
+        os.makedirs(cache_dir, exist_ok=True)
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS entries ('
+                ' key TEXT PRIMARY KEY,'
+                ' source_name TEXT,'
+                ' converter TEXT NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' created_at REAL NOT NULL,'
+                ' last_access REAL NOT NULL)'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)')
+            conn.execute('CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환"""
+        conn = getattr(self._local, 'conn', None)
+        # fork로 물려받은 부모 프로세스의 연결은 쓰지 않고 새로 연결 (gunicorn preload)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    # ------------------------------------------------------------------
+    # 키
+    # ------------------------------------------------------------------
+    def content_hash(self, file_path: str) -> str:
+        """파일 내용 해시 - mtime/크기가 같으면 이전에 계산한 값을 재사용"""
+        st = os.stat(file_path)
+        abs_path = os.path.abspath(file_path)
+        with self._memo_lock:
+            memo = self._hash_memo.get(abs_path)
+            if memo is not None and memo[:2] == (st.st_mtime_ns, st.st_size):
+                self._hash_memo.move_to_end(abs_path)
+                return memo[2]
+        digest = hash_file(file_path)
+        with self._memo_lock:
+            self._hash_memo[abs_path] = (st.st_mtime_ns, st.st_size, digest)
+            self._hash_memo.move_to_end(abs_path)
+            while len(self._hash_memo) > self.max_memo_entries:
+                self._hash_memo.popitem(last=False)
+        return digest
+
+    def make_key(self, file_path: str, converter: str, options: Optional[Dict[str, Any]] = None) -> str:
+        """캐시 키 = sha256(내용 해시, 변환기 식별자/버전, 옵션)
+
+        변환기 버전이나 옵션(max_num_pages 등)이 바뀌면 다른 키가 되어 다시 변환한다.
+        """
+        payload = json.dumps(
+            {'content': self.content_hash(file_path), 'converter': converter, 'options': options or {}},
+            sort_keys=True, ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f'{key}.md')
+
+    # ------------------------------------------------------------------
+    # 조회/저장
+    # ------------------------------------------------------------------
+    def get(self, key: str) -> Optional[str]:
+        """캐시된 마크다운 반환 (없으면 None)"""
+        conn = self._connect()
+        row = conn.execute('SELECT size FROM entries WHERE key = ?', (key,)).fetchone()
+        markdown = None
+        if row is not None:
+            try:
+                with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                    markdown = f.read()
+            except FileNotFoundError:
+                # 파일이 지워진 항목은 목록에서도 제거
+                with conn:
+                    conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+        with conn:
+            if markdown is not None:
+                conn.execute('UPDATE entries SET last_access = ? WHERE key = ?', (time.time(), key))
+            self._count(conn, 'hits' if markdown is not None else 'misses')
+        return markdown
+
+    def put(self, key: str, markdown: str, converter: str, source_name: Optional[str] = None) -> None:
+        """변환 결과 저장 후 예산을 넘으면 오래된 항목 제거"""
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # 임시 파일에 쓴 뒤 교체하여 다른 워커가 쓰다 만 파일을 읽지 않게 함
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(markdown)
+        os.replace(tmp_path, path)
+
+        size = os.path.getsize(path)
+        now = time.time()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO entries (key, source_name, converter, size, created_at, last_access) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (key, source_name, converter, size, now, now)
+            )
+            self._count(conn, 'stores')
+        self._evict()
+
+    def _evict(self) -> None:
+        conn = self._connect()
+        with conn:
+            total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            evicted = 0
+            for key, size in conn.execute('SELECT key, size FROM entries ORDER BY last_access').fetchall():
+                if total <= self.max_bytes:
+                    break
+                conn.execute('DELETE FROM entries WHERE key = ?', (key,))
+                try:
+                    os.remove(self._entry_path(key))
+                except FileNotFoundError:
+                    pass
+                total -= size
+                evicted += 1
+            self._count(conn, 'evictions', evicted)
+        logger.info(f"변환 캐시 정리: {evicted}개 항목 제거 (현재 {total} 바이트)")
+
+    def _count(self, conn: sqlite3.Connection, name: str, amount: int = 1) -> None:
+        conn.execute(
+            'INSERT INTO stats (name, value) VALUES (?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET value = value + excluded.value',
+            (name, amount)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """항목 수, 사용량, 적중/실패/저장/제거 횟수와 적중률 (모든 워커 합계)"""
+        conn = self._connect()
+        entries, total = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries').fetchone()
+        counters = dict(conn.execute('SELECT name, value FROM stats'))
+        hits = counters.get('hits', 0)
+        misses = counters.get('misses', 0)
+        lookups = hits + misses
+        return {
+            'entries': entries,
+            'bytes': total,
+            'max_bytes': self.max_bytes,
+            'hits': hits,
+            'misses': misses,
+            'stores': counters.get('stores', 0),
+            'evictions': counters.get('evictions', 0),
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0,
+        }
@@ -3,13 +3,31 @@ import logging
 import asyncio
 import threading
 import time
-from typing import Optional, Dict, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor
+import uuid
+import multiprocessing
+from typing import Optional, Dict, Any, Tuple, List, Iterator
+from concurrent.futures import as_completed
+from importlib import metadata
 
-from io import BytesIO
-from docling.datamodel.base_models import DocumentStream
+from docling.datamodel.base_models import InputFormat
 from docling.document_converter import DocumentConverter # 사용자의 기존 DocumentConverter 경로
-from services.hwp_converter_service import get_hwp_text # Python 기반 HWP 프로세서
+from services.hwp_converter_service import (get_hwp_text, list_hwp_sections, get_hwp_section,
+                                            join_hwp_sections, HWP_CONVERTER_VERSION) # Python 기반 HWP 프로세서
+from services.search_index import SearchIndex
+from services.conversion_cache import ConversionCache
+from services.job_queue import JobQueue, STATUS_PENDING, STATUS_PROCESSING, FINISHED_STATUSES, worker_id
+from services.admission import AdmissionController
+from services.input_manifest import InputManifest
+from services.metrics import Metrics, stage_timer, file_type_label
+from services.scheduling import job_priority
+from services.worker_pool import (SupervisedPool, TaskControl, WorkerCrashed, ConversionTimeout,
+                                  ConversionCancelled)
+from services.process_stats import memory_usage, format_memory_usage
+
+try:
+    import pypdfium2  # docling 의존성 - PDF 페이지 수 확인용
+except ImportError:
+    pypdfium2 = None
 
 logger = logging.getLogger(__name__) # 이 모듈의 로거 ('converter_service')
 
@@ -22,318 +40,978 @@ if not logger.handlers:
     console_handler.setFormatter(formatter)
     logger.addHandler(console_handler)
 
+# docling 기본 변환 옵션 (PDF 외 형식) - 변환 캐시 키에도 포함
+DOCLING_CONVERT_OPTIONS = {'max_num_pages': 100, 'max_file_size': 20971520}
+
+try:
+    DOCLING_VERSION = metadata.version('docling')
+except metadata.PackageNotFoundError:
+    DOCLING_VERSION = 'unknown'
 
-class ConverterService:
-    """문서 변환을 담당하는 서비스 클래스"""
 
-    def __init__(self):
-        """ConverterService 초기화"""
-        self.converter = DocumentConverter()
-        self.executor = ThreadPoolExecutor(max_workers=3)  # 동시에 처리할 수 있는 비동기 작업 수 제한
-        self.conversion_tasks: Dict[str, Dict[str, Any]] = {}  # 작업 상태 추적을 위한 딕셔너리
-        self.lock = threading.Lock()  # 스레드 안전성을 위한 락
+def _convert_file(converter: DocumentConverter, file_path: str, file_ext: str,
+                  timings: Optional[Dict[str, float]] = None) -> Tuple[Optional[str], bool]:
+    """파일 하나를 현재 프로세스에서 바로 변환 - (마크다운, 캐시 가능 여부) 반환
+
+    요청 스레드와 변환 프로세스 풀 워커가 함께 사용한다. 오류 안내 문서처럼
+    변환 결과가 아닌 마크다운은 캐시 가능 여부를 False로 반환한다.
+    timings를 넘기면 단계별 소요 시간을 기록한다.
+    """
+    # HWP 파일 처리 (Python 기반)
+    if file_ext == '.hwp':
+        logger.debug("HWP 파일 감지, Python 기반 hwp_converter_service.py로 처리합니다.")
         
-        logger.info("ConverterService initialized. HWP conversion will use Python-based get_hwp_text.")
+        try:
+            markdown_content = get_hwp_text(file_path, timings)
+            if markdown_content:
+                logger.info(f"HWP 파일 변환 성공: {file_path}")
+            else:
+                logger.warning(f"HWP 파일 변환 실패 또는 내용 없음: {file_path}")
+            return markdown_content, True
+        except ValueError as ve: 
+            logger.error(f"HWP 파일 변환 중 오류 발생 (ValueError) ({file_path}): {str(ve)}", exc_info=True) 
+            return f"# HWP 변환 오류\n\nHWP 파일({os.path.basename(file_path)}) 변환 중 오류가 발생했습니다: {str(ve)}", False
+        except Exception as e: 
+            logger.error(f"HWP 파일 변환 중 예외 발생 ({file_path}): {str(e)}", exc_info=True) 
+            return None, False
+    
+    # TXT 파일 처리: 직접 파일 내용을 읽음
+    if file_ext == '.txt':
+        logger.debug(f"TXT 파일 감지, 직접 파일 내용을 읽습니다: {file_path}")
+        try:
+            with stage_timer(timings, 'read'), open(file_path, 'r', encoding='utf-8') as f:
+                content = f.read()
+            logger.info(f"TXT 파일 읽기 성공: {file_path}")
+            return content, True
+        except Exception as e:
+            logger.error(f"TXT 파일 읽기 중 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+            return None, False
 
-    def convert_document_to_markdown(self, file_path: str) -> Optional[str]:
-        """단일 문서를 마크다운으로 변환하는 함수"""
-        logger.info(f"문서 변환 요청: {file_path}")
+    # 그 외 다른 문서 형식 처리 (기존 방식 사용)
+    try:
+        logger.debug(f"기본 변환기({type(converter).__name__})를 사용하여 {file_ext} 파일 변환 시도: {file_path}")
         
-        if not os.path.exists(file_path):
-            logger.error(f"변환할 파일을 찾을 수 없습니다: {file_path}")
-            return None
+        # PDF 파일은 경로를 넘겨 docling이 디스크에서 필요한 만큼 읽게 함 (파일 전체를 메모리에 복사하지 않음)
+        with stage_timer(timings, 'docling_convert'):
+            if file_ext == '.pdf':
+                logger.debug(f"PDF 파일을 디스크에서 읽어 변환 시도: {file_path}")
+                result = converter.convert(file_path)
+            else:
+                # 다른 파일 형식은 기존 방식 사용
+                result = converter.convert(file_path, **DOCLING_CONVERT_OPTIONS)
+
+        if hasattr(result, 'document') and hasattr(result.document, 'export_to_markdown'):
+            with stage_timer(timings, 'markdown_export'):
+                markdown = result.document.export_to_markdown()
+            logger.info(f"기본 변환기를 통한 문서 변환 완료: {file_path}, 결과 크기: {len(markdown)} 바이트")
+            return markdown, True
+        elif isinstance(result, str): # convert 메서드가 바로 마크다운 문자열을 반환하는 경우
+            logger.info(f"기본 변환기를 통한 문서 변환 완료 (직접 문자열 반환): {file_path}, 결과 크기: {len(result)} 바이트")
+            return result, True
+        else:
+            logger.error(f"기본 변환기의 결과 형식이 예상과 다릅니다 ({type(result)}): {file_path}")
+            return None, False
             
-        file_ext = os.path.splitext(file_path)[1].lower()
+    except Exception as e:
+        logger.error(f"기본 변환기 사용 중 문서 변환 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+        return None, False
 
-        # PDF 파일 처리 (비동기 방식)
-        if file_ext == '.pdf':
-            logger.debug(f"PDF 파일 감지, 비동기 방식으로 처리합니다: {file_path}")
-            task_id = self._start_async_conversion(file_path)
-            return f"# PDF 변환 진행 중\n\nPDF 파일({os.path.basename(file_path)})이 백그라운드에서 변환 중입니다.\n\n작업 ID: {task_id}\n\n변환이 완료되면 결과를 확인할 수 있습니다."
 
-        # HWP 파일 처리 (Python 기반)
-        if file_ext == '.hwp':
-            logger.debug("HWP 파일 감지, Python 기반 hwp_converter_service.py로 처리합니다.")
-            
-            try:
-                markdown_content = get_hwp_text(file_path)
-                if markdown_content:
-                    logger.info(f"HWP 파일 변환 성공: {file_path}")
-                else:
-                    logger.warning(f"HWP 파일 변환 실패 또는 내용 없음: {file_path}")
-                return markdown_content
-            except ValueError as ve: 
-                logger.error(f"HWP 파일 변환 중 오류 발생 (ValueError) ({file_path}): {str(ve)}", exc_info=True) 
-                return f"# HWP 변환 오류\n\nHWP 파일({os.path.basename(file_path)}) 변환 중 오류가 발생했습니다: {str(ve)}"
-            except Exception as e: 
-                logger.error(f"HWP 파일 변환 중 예외 발생 ({file_path}): {str(e)}", exc_info=True) 
-                return None
+def _count_pdf_pages(file_path: str) -> Optional[int]:
+    """PDF 페이지 수 (pypdfium2가 없거나 읽을 수 없으면 None)"""
+    if pypdfium2 is None:
+        return None
+    try:
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+    except Exception as e:
+        logger.warning(f"PDF 페이지 수를 확인할 수 없습니다 ({file_path}): {str(e)}")
+        return None
+
+
+def _convert_pdf_pages(converter: DocumentConverter, file_path: str, start: int, end: int,
+                       timings: Optional[Dict[str, float]] = None) -> Optional[str]:
+    """PDF의 start~end 페이지(1부터, 끝 포함)만 변환한 마크다운 (실패 시 None)"""
+    try:
+        with stage_timer(timings, 'docling_convert'):
+            result = converter.convert(file_path, page_range=(start, end))
+        with stage_timer(timings, 'markdown_export'):
+            markdown = result.document.export_to_markdown()
+        logger.debug(f"PDF 페이지 {start}-{end} 변환 완료: {file_path}, 결과 크기: {len(markdown)} 바이트")
+        return markdown
+    except Exception as e:
+        logger.error(f"PDF 페이지 {start}-{end} 변환 중 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+        return None
+
+
+# 변환 프로세스 풀 워커마다 하나씩 유지하는 변환기 (모델/파이프라인을 한 번만 로드)
+_worker_converter: Optional[DocumentConverter] = None
+
+
+def _init_conversion_worker() -> None:
+    """변환 프로세스 풀 워커 초기화 - 워커가 뜰 때 DocumentConverter를 미리 생성"""
+    global _worker_converter
+    _worker_converter = DocumentConverter()
+    logger.info(f"변환 워커 초기화 완료 (pid={os.getpid()})")
+
+
+def _convert_in_worker(file_path: str) -> Tuple[Optional[str], bool, Dict[str, float]]:
+    """변환 프로세스 풀 워커에서 파일 하나를 변환 - (마크다운, 캐시 가능 여부, 단계별 시간) 반환"""
+    if _worker_converter is None:
+        _init_conversion_worker()
+    timings: Dict[str, float] = {}
+    markdown, cacheable = _convert_file(_worker_converter, file_path, os.path.splitext(file_path)[1].lower(), timings)
+    return markdown, cacheable, timings
+
+
+def _convert_pages_in_worker(file_path: str, start: int, end: int) -> Tuple[Optional[str], Dict[str, float]]:
+    """변환 프로세스 풀 워커에서 PDF 페이지 범위 하나를 변환 - (마크다운, 단계별 시간) 반환"""
+    if _worker_converter is None:
+        _init_conversion_worker()
+    timings: Dict[str, float] = {}
+    return _convert_pdf_pages(_worker_converter, file_path, start, end, timings), timings
+
+
+def _hwp_section_in_worker(file_path: str, stream: str,
+                           is_compressed: bool) -> Tuple[Tuple[List[str], List[str], List[str]], Dict[str, float]]:
+    """변환 프로세스 풀 워커에서 HWP 섹션 하나를 해석 - (get_hwp_section 결과, 단계별 시간) 반환"""
+    timings: Dict[str, float] = {}
+    return get_hwp_section(file_path, stream, is_compressed, timings), timings
+
+
+class ConverterService:
+    """문서 변환을 담당하는 서비스 클래스"""
+
+    # 프로세스마다 동시에 처리하는 비동기 변환 작업 수
+    DISPATCH_THREADS = 3
+    # 대기 작업이 없을 때 큐를 다시 확인하는 간격(초) - 다른 워커가 넣은 작업도 이 간격으로 가져감
+    DISPATCH_POLL_SECONDS = 2.0
+    # heartbeat가 이 시간(초) 이상 끊긴 처리 중 작업은 중단된 것으로 보고 다시 대기열에 넣음
+    STALE_JOB_SECONDS = 120
+    # 처리 중인 작업의 heartbeat 기록 및 진행 로그 간격(초)
+    HEARTBEAT_SECONDS = 15.0
+    # 처리 중인 작업에 취소 요청이 들어왔는지 확인하는 간격(초)
+    CANCEL_POLL_SECONDS = 1.0
+    # 메모리 예산에 들지 않는 작업을 건너뛰고 다음 작업을 찾는 최대 횟수 (넘으면 예약이 반환될 때까지 대기)
+    ADMISSION_SKIP_LIMIT = 8
+
+    def __init__(self, search_index: Optional[SearchIndex] = None,
+                 conversion_cache: Optional[ConversionCache] = None,
+                 conversion_workers: int = 0,
+                 job_queue: Optional[JobQueue] = None,
+                 pdf_chunk_pages: int = 20,
+                 admission: Optional[AdmissionController] = None,
+                 output_folder: Optional[str] = None,
+                 input_manifest: Optional[InputManifest] = None,
+                 metrics: Optional[Metrics] = None,
+                 conversion_timeout_seconds: float = 0,
+                 conversion_cpu_timeout_seconds: float = 0,
+                 hwp_parallel_min_bytes: int = 0):
+        """ConverterService 초기화 - DocumentConverter는 처음 사용할 때 생성 (warm_up으로 미리 생성 가능)"""
+        self._converter: Optional[DocumentConverter] = None
+        self._converter_lock = threading.Lock()
+        self.search_index = search_index  # 변환 결과 저장 시 갱신할 검색 색인
+        self.conversion_cache = conversion_cache  # 입력 내용이 같으면 이전 변환 결과 재사용
+        self.conversion_workers = conversion_workers  # 1 이하이면 프로세스 풀 없이 현재 프로세스에서 변환
+        self._process_pool: Optional[SupervisedPool] = None
+        self._pool_lock = threading.Lock()
+        project_root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        if job_queue is None:
+            # 프로젝트 루트의 data 폴더에 작업 큐 저장 (모든 워커가 공유)
+            job_queue = JobQueue(os.path.join(project_root_dir, 'data', 'jobs.sqlite3'))
+        # 백그라운드 변환 결과를 저장할 폴더 (기본값: 프로젝트 루트의 output 폴더)
+        self.output_folder = output_folder or os.path.join(project_root_dir, 'output')
+        self.job_queue = job_queue  # 비동기 변환 작업 상태 (워커 간 공유, 재시작 후에도 유지)
+        self._dispatch_lock = threading.Lock()
+        self._dispatcher_pid: Optional[int] = None
+        self._stop_dispatch = threading.Event()
+        self._job_available = threading.Event()
+        self._last_requeue = 0.0
+        self.admission = admission  # 메모리 예산 안에서만 변환 시작 (None이면 제한 없음)
+        self.input_manifest = input_manifest  # 변환에 성공한 입력 파일 기록 (convert-all 증분 변환용)
+        self.metrics = metrics  # 단계별 변환 시간 등 /metrics로 내보낼 측정값 (None이면 기록 안 함)
+        self.conversion_timeout_seconds = conversion_timeout_seconds  # 작업 하나의 벽시계 제한 시간 (0이면 제한 없음)
+        self.conversion_cpu_timeout_seconds = conversion_cpu_timeout_seconds  # 변환 워커 호출 하나의 CPU 시간 제한 (0이면 제한 없음)
+        # 이 프로세스에서 처리 중인 작업 ID -> (시작 시각, 마감/취소 신호)
+        self._running_jobs: Dict[str, Tuple[float, TaskControl]] = {}
+        self._running_lock = threading.Lock()
+        self.pdf_chunk_pages = pdf_chunk_pages  # 이보다 긴 PDF는 페이지 범위로 나누어 병렬 변환 (0이면 나누지 않음)
+        self.hwp_parallel_min_bytes = hwp_parallel_min_bytes  # 이보다 큰 HWP는 섹션별로 나누어 병렬 변환 (0이면 나누지 않음)
+        if metrics is not None:
+            metrics.add_gauge('docquery_job_queue_depth', '작업 큐에서 기다리는 변환 작업 수',
+                              lambda: self._job_count_gauge(STATUS_PENDING))
+            metrics.add_gauge('docquery_jobs_in_flight', '처리 중인 변환 작업 수 (모든 워커)',
+                              lambda: self._job_count_gauge(STATUS_PROCESSING))
         
-        # TXT 파일 처리: 직접 파일 내용을 읽음
-        if file_ext == '.txt':
-            logger.debug(f"TXT 파일 감지, 직접 파일 내용을 읽습니다: {file_path}")
+        logger.info("ConverterService initialized. HWP conversion will use Python-based get_hwp_text.")
+
+    @property
+    def converter(self) -> DocumentConverter:
+        """현재 프로세스의 DocumentConverter (최초 사용 시 생성)
+
+        변환 프로세스 풀을 쓰는 워커는 PDF/DOCX 변환에 이 변환기를 쓰지 않으므로
+        docling 모델을 불필요하게 메모리에 올리지 않는다.
+        """
+        if self._converter is None:
+            with self._converter_lock:
+                if self._converter is None:
+                    self._converter = DocumentConverter()
+        return self._converter
+
+    def warm_up(self, formats: List[str]) -> None:
+        """지정한 형식(예: ['pdf', 'docx'])의 docling 파이프라인을 미리 초기화
+
+        gunicorn preload 모드에서 마스터가 fork 전에 호출하면 워커들이 모델 메모리를
+        copy-on-write로 공유한다. 지정하지 않은 형식은 처음 변환할 때 초기화된다.
+        """
+        converter = self.converter
+        for name in formats:
             try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                logger.info(f"TXT 파일 읽기 성공: {file_path}")
-                return content
+                started = time.time()
+                converter.initialize_pipeline(InputFormat(name))
+                logger.info(f"docling 파이프라인 초기화 완료: {name} ({time.time() - started:.2f}초)")
+            except ValueError:
+                logger.warning(f"알 수 없는 문서 형식이라 파이프라인을 미리 초기화하지 않습니다: {name}")
             except Exception as e:
-                logger.error(f"TXT 파일 읽기 중 오류 발생 ({file_path}): {str(e)}", exc_info=True)
-                return None
+                logger.error(f"docling 파이프라인 초기화 중 오류 발생 ({name}): {str(e)}", exc_info=True)
 
-        # 그 외 다른 문서 형식 처리 (기존 방식 사용)
+    def after_fork(self) -> None:
+        """fork된 워커에서 호출 - 부모에게서 물려받은 풀/잠금을 버리고 작업 큐 처리와 변환 프로세스 풀 시작
+
+        프로세스 풀과 스레드는 fork로 복사되지 않으므로 워커마다 새로 만든다.
+        (부모의 풀은 부모 소유이므로 종료하지 않고 참조만 버림)
+        """
+        self._process_pool = None
+        self._pool_lock = threading.Lock()
+        self._converter_lock = threading.Lock()
+        self._dispatch_lock = threading.Lock()
+        self._dispatcher_pid = None
+        self._job_available = threading.Event()
+        self._running_jobs = {}
+        self._running_lock = threading.Lock()
+        if self.admission is not None:
+            self.admission.reset()
+        self.start_dispatcher()
+        if self.conversion_workers > 1:
+            # 풀은 spawn으로 띄우므로 fork된 워커에서 만들어도 안전 - 풀 워커의 모델 로드를 기동 중에 미리 함
+            thread = threading.Thread(target=self._prestart_process_pool, name='conversion-pool-prestart')
+            thread.daemon = True
+            thread.start()
+
+    def _prestart_process_pool(self) -> None:
         try:
-            logger.debug(f"기본 변환기({type(self.converter).__name__})를 사용하여 {file_ext} 파일 변환 시도: {file_path}")
-            
-            # PDF 파일은 스트리밍 방식으로 처리
-            if file_ext == '.pdf':
-                logger.debug(f"PDF 파일 스트리밍 방식으로 변환 시도: {file_path}")
-                with open(file_path, 'rb') as f:
-                    buf = BytesIO(f.read())
-                    source = DocumentStream(name=os.path.basename(file_path), stream=buf)
-                    result = self.converter.convert(source)
-            else:
-                # 다른 파일 형식은 기존 방식 사용
-                result = self.converter.convert(file_path, max_num_pages=100, max_file_size=20971520)
+            self._get_process_pool().prestart()
+            logger.info(f"변환 프로세스 풀 준비 완료 (pid={os.getpid()}, 워커 {self.conversion_workers}개)")
+        except Exception as e:
+            logger.error(f"변환 프로세스 풀을 미리 띄우는 중 오류 발생: {str(e)}", exc_info=True)
 
-            if hasattr(result, 'document') and hasattr(result.document, 'export_to_markdown'):
-                markdown = result.document.export_to_markdown()
-                logger.info(f"기본 변환기를 통한 문서 변환 완료: {file_path}, 결과 크기: {len(markdown)} 바이트")
-                return markdown
-            elif isinstance(result, str): # convert 메서드가 바로 마크다운 문자열을 반환하는 경우
-                logger.info(f"기본 변환기를 통한 문서 변환 완료 (직접 문자열 반환): {file_path}, 결과 크기: {len(result)} 바이트")
-                return result
-            else:
-                logger.error(f"기본 변환기의 결과 형식이 예상과 다릅니다 ({type(result)}): {file_path}")
+    def _release_admission(self, estimate: int) -> None:
+        if self.admission is not None:
+            self.admission.release(estimate)
+
+    def get_admission_stats(self) -> Dict[str, Any]:
+        """변환 입장 제어 통계 (현재 워커 기준)"""
+        if self.admission is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.admission.stats()}
+
+    def _run_conversion(self, file_path: str, file_ext: str,
+                        control: Optional[TaskControl] = None) -> Tuple[Optional[str], bool]:
+        """파일 하나 변환 - 프로세스 풀이 설정되어 있으면 워커에서, 아니면 현재 프로세스에서
+
+        control의 마감이 지나거나 취소되면 ConversionTimeout/ConversionCancelled 발생.
+        워커에서 변환하면 그 워커를 바로 종료하지만, 현재 프로세스에서 변환하면 스레드를
+        멈출 수 없으므로 변환 전후에만 확인한다. 큰 HWP는 섹션별로 나누어 여러 워커에서 해석한다.
+        """
+        if control is None:
+            control = self._new_control()
+        hwp_layout = self._hwp_layout_to_split(file_path) if file_ext == '.hwp' else None
+        if hwp_layout is not None:
+            markdown, cacheable, timings = self._convert_hwp_in_sections(file_path, *hwp_layout, control)
+        elif self.conversion_workers > 1 and file_ext != '.txt':
+            pool = self._get_process_pool()
+            try:
+                markdown, cacheable, timings = pool.run(_convert_in_worker, file_path, control=control)
+            except WorkerCrashed as e:
+                logger.error(f"변환 워커가 비정상 종료되었습니다 ({file_path}): {str(e)}")
+                return None, False
+        else:
+            control.check()
+            timings = {}
+            markdown, cacheable = _convert_file(self.converter, file_path, file_ext, timings)
+            control.check()
+        self._record_stage_timings(file_ext, timings)
+        return markdown, cacheable
+
+    def _hwp_layout_to_split(self, file_path: str) -> Optional[Tuple[bool, List[str]]]:
+        """섹션별로 나누어 변환할 HWP면 (본문 압축 여부, 섹션 스트림 목록), 아니면 None
+
+        섹션마다 파일을 다시 열고 결과를 프로세스 사이에 주고받는 비용이 있으므로
+        hwp_parallel_min_bytes 이상이고 섹션이 둘 이상일 때만 나눈다.
+        """
+        if self.conversion_workers <= 1 or self.hwp_parallel_min_bytes <= 0:
+            return None
+        try:
+            if os.path.getsize(file_path) < self.hwp_parallel_min_bytes:
                 return None
-                
+            is_compressed, sections = list_hwp_sections(file_path)
         except Exception as e:
-            logger.error(f"기본 변환기 사용 중 문서 변환 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+            # 유효하지 않은 파일은 나누지 않고 기존 경로에서 오류 안내 문서로 처리
+            logger.debug(f"HWP 섹션 목록을 읽을 수 없어 나누지 않고 변환합니다 ({file_path}): {str(e)}")
             return None
+        return (is_compressed, sections) if len(sections) > 1 else None
 
-    def _start_async_conversion(self, file_path: str) -> str:
-        """비동기 변환 작업을 시작하는 함수"""
-        task_id = f"task_{int(time.time())}_{os.path.basename(file_path)}"
-        
-        with self.lock:
-            self.conversion_tasks[task_id] = {
-                'file_path': file_path,
-                'status': 'pending',
-                'result': None,
-                'error': None,
-                'start_time': time.time()
-            }
-        
-        # 비동기 작업 시작
-        self.executor.submit(self._process_pdf_in_background, task_id, file_path)
-        logger.info(f"비동기 PDF 변환 작업 시작: {task_id} - {file_path}")
+    def _convert_hwp_in_sections(self, file_path: str, is_compressed: bool, sections: List[str],
+                                 control: TaskControl) -> Tuple[Optional[str], bool, Dict[str, float]]:
+        """HWP 본문 섹션들을 변환 프로세스 풀 워커에 나누어 해석하고 섹션 순서대로 이어 붙임
+
+        섹션 경계를 넘는 빈 줄 정리와 표 변환은 이어 붙일 때 하므로 결과는 get_hwp_text와 같다.
+        (마크다운, 캐시 가능 여부, 단계별 시간) 반환 - 섹션 하나라도 실패하면 마크다운은 None.
+        """
+        logger.info(f"HWP 섹션별 병렬 변환 시작: {file_path}, {len(sections)}개 섹션")
+        pool = self._get_process_pool()
+        futures = [pool.submit(_hwp_section_in_worker, file_path, stream, is_compressed, control=control)
+                   for stream in sections]
+        timings: Dict[str, float] = {}
+        section_results = []
+        try:
+            for future in futures:
+                section, section_timings = future.result()
+                for stage, seconds in section_timings.items():
+                    timings[stage] = timings.get(stage, 0.0) + seconds
+                section_results.append(section)
+        except WorkerCrashed as e:
+            logger.error(f"변환 워커가 비정상 종료되었습니다 ({file_path}): {str(e)}")
+            return None, False, timings
+        except (ConversionCancelled, ConversionTimeout):
+            raise
+        except Exception as e:
+            logger.error(f"HWP 섹션 변환 중 예외 발생 ({file_path}): {str(e)}", exc_info=True)
+            return None, False, timings
+        finally:
+            # 실패하거나 중단된 경우 아직 시작하지 않은 섹션 취소
+            for future in futures:
+                future.cancel()
+
+        with stage_timer(timings, 'parse'):
+            markdown = join_hwp_sections(section_results)
+        logger.info(f"HWP 파일 변환 성공: {file_path}")
+        return markdown, True, timings
+
+    def _new_control(self) -> TaskControl:
+        """conversion_timeout_seconds 뒤를 마감으로 하는 작업 제어 (0이면 마감 없음)"""
+        if self.conversion_timeout_seconds > 0:
+            return TaskControl(time.time() + self.conversion_timeout_seconds)
+        return TaskControl()
+
+    def _record_stage_timings(self, file_ext: str, timings: Dict[str, float]) -> None:
+        """변환 단계별 소요 시간을 메트릭에 기록"""
+        if self.metrics is not None:
+            file_type = file_type_label(file_ext)
+            self.metrics.observe_many([
+                ('docquery_conversion_stage_seconds', {'stage': stage, 'file_type': file_type}, seconds)
+                for stage, seconds in timings.items()
+            ])
+
+    def _job_count_gauge(self, status: str) -> List[Tuple[Dict[str, str], float]]:
+        """작업 큐에서 status 상태인 작업 수 (모든 워커 합계)"""
+        return [({}, self.job_queue.counts().get(status, 0))]
+
+    def _get_process_pool(self) -> SupervisedPool:
+        """변환 프로세스 풀 (최초 사용 시 생성)
+
+        docling 파싱은 CPU 작업이라 스레드로는 GIL 때문에 한 코어만 쓰므로 프로세스로 나눈다.
+        워커마다 DocumentConverter를 한 번만 만들어 재사용하며, 제한 시간을 넘기거나
+        취소된 변환의 워커는 종료하고 새 워커로 대체한다.
+        """
+        with self._pool_lock:
+            if self._process_pool is None:
+                self._process_pool = SupervisedPool(
+                    max_workers=self.conversion_workers,
+                    initializer=_init_conversion_worker,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    cpu_timeout_seconds=self.conversion_cpu_timeout_seconds
+                )
+            return self._process_pool
+
+    def get_worker_pool_stats(self) -> Dict[str, Any]:
+        """변환 프로세스 풀 워커 수와 강제 종료/비정상 종료 횟수 (현재 워커 기준)"""
+        with self._pool_lock:
+            pool = self._process_pool
+        if pool is None:
+            return {'enabled': self.conversion_workers > 1, 'started': False}
+        return {'enabled': True, 'started': True, **pool.stats()}
+
+    def close(self) -> None:
+        """변환 프로세스 풀과 작업 큐 처리 스레드 종료"""
+        with self._pool_lock:
+            pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            pool.shutdown()
+        self._stop_dispatch.set()
+        self._job_available.set()
+
+    def _conversion_cache_key(self, file_path: str, file_ext: str) -> Optional[str]:
+        """변환 캐시 키 - 캐시가 없거나 캐시하지 않는 형식(TXT)이면 None"""
+        if self.conversion_cache is None or file_ext == '.txt':
+            return None
+        try:
+            # PDF는 DocumentStream으로 옵션 없이, 그 외 형식은 기본 옵션으로 변환
+            options = {} if file_ext == '.pdf' else DOCLING_CONVERT_OPTIONS
+            return self.conversion_cache.make_key(file_path, self._converter_identity(file_ext), options)
+        except Exception as e:
+            logger.error(f"변환 캐시 키 계산 중 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+            return None
+
+    def _converter_identity(self, file_ext: str) -> str:
+        """변환기 이름/버전 - 버전이 바뀌면 캐시된 결과를 다시 쓰지 않음"""
+        if file_ext == '.hwp':
+            return f"hwp_text/{HWP_CONVERTER_VERSION}"
+        return f"docling/{DOCLING_VERSION}"
+
+    def _get_cached_markdown(self, cache_key: str) -> Optional[str]:
+        try:
+            return self.conversion_cache.get(cache_key)
+        except Exception as e:
+            logger.error(f"변환 캐시 조회 중 오류 발생: {str(e)}", exc_info=True)
+            return None
+
+    def _store_cached_markdown(self, cache_key: Optional[str], file_ext: str, file_path: str, markdown: str) -> None:
+        """변환에 성공한 결과만 캐시에 저장 (실패해도 변환 결과에는 영향 없음)"""
+        if cache_key is None:
+            return
+        try:
+            self.conversion_cache.put(cache_key, markdown, self._converter_identity(file_ext),
+                                      source_name=os.path.basename(file_path))
+        except Exception as e:
+            logger.error(f"변환 캐시 저장 중 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+
+    def get_conversion_cache_stats(self) -> Dict[str, Any]:
+        """변환 캐시 적중/실패/제거 통계"""
+        if self.conversion_cache is None:
+            return {'enabled': False}
+        return {'enabled': True, **self.conversion_cache.stats()}
+
+    def _start_async_conversion(self, file_path: str, cache_key: Optional[str] = None) -> str:
+        """비동기 변환 작업을 작업 큐에 넣는 함수 - 어느 워커의 처리 스레드든 가져가서 변환"""
+        task_id = self.job_queue.enqueue(file_path, cache_key, priority=job_priority(file_path))
+        self.start_dispatcher()
+        self._job_available.set()
+        logger.info(f"비동기 변환 작업 등록: {task_id} - {file_path}")
         
         return task_id
+
+    def submit_batch(self, file_paths: List[str], background: bool = False) -> Tuple[str, List[str]]:
+        """여러 문서의 변환 작업을 한 배치로 작업 큐에 넣고 바로 (배치 ID, 작업 ID 목록) 반환
+
+        캐시 확인과 변환은 작업 큐 처리 스레드(어느 워커든)에서 하므로 요청은 기다리지 않는다.
+        작업마다 형식/크기로 우선순위를 매기며, background이면(convert-all, 입력 폴더 감시)
+        사용자가 직접 요청한 변환보다 뒤로 미룬다.
+        """
+        batch_id = f"batch_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        priorities = [job_priority(file_path, background) for file_path in file_paths]
+        task_ids = self.job_queue.enqueue_batch(file_paths, batch_id, priorities)
+        self.start_dispatcher()
+        self._job_available.set()
+        logger.info(f"변환 배치 등록: {batch_id} - {len(task_ids)}개 문서")
+        return batch_id, task_ids
+
+    def start_dispatcher(self) -> None:
+        """작업 큐를 처리하는 스레드 시작 (프로세스마다 한 번, fork 이후 호출되면 새로 시작)"""
+        with self._dispatch_lock:
+            if self._dispatcher_pid == os.getpid():
+                return
+            self._dispatcher_pid = os.getpid()
+            self._stop_dispatch = threading.Event()
+            for i in range(self.DISPATCH_THREADS):
+                thread = threading.Thread(target=self._dispatch_loop, name=f"conversion-dispatch-{i}")
+                thread.daemon = True
+                thread.start()
+            self._start_heartbeat()
+        logger.info(f"변환 작업 큐 처리 스레드 시작 (pid={os.getpid()}, 스레드 {self.DISPATCH_THREADS}개)")
+
+    def run_dispatcher(self) -> None:
+        """현재 스레드에서 작업 큐를 계속 처리 (웹 워커와 별도로 띄우는 변환 프로세스용)"""
+        self._start_heartbeat()
+        self._dispatch_loop()
+
+    def _start_heartbeat(self) -> None:
+        thread = threading.Thread(target=self._heartbeat_loop, args=(self._stop_dispatch,), name='conversion-heartbeat')
+        thread.daemon = True
+        thread.start()
+
+    def _dispatch_loop(self) -> None:
+        stop_event = self._stop_dispatch
+        skipped: List[str] = []  # 메모리 예산에 들지 않아 되돌린 작업 - 다음 claim에서 건너뜀
+        while not stop_event.is_set():
+            try:
+                job = self.job_queue.claim(self._claim_worker(), exclude=skipped)
+            except Exception as e:
+                logger.error(f"변환 작업을 가져오는 중 오류 발생: {str(e)}", exc_info=True)
+                job = None
+
+            if job is None and skipped:
+                # 예산에 드는 대기 작업이 없음 - 예약이 반환되면 건너뛴 작업부터 다시 시도
+                skipped = []
+                self.admission.wait_for_release(self.DISPATCH_POLL_SECONDS)
+                continue
+            if job is None:
+                self._requeue_stale_jobs()
+                self._job_available.wait(self.DISPATCH_POLL_SECONDS)
+                self._job_available.clear()
+                continue
+
+            # 메모리 예산이 부족하면 작업을 대기열에 되돌리고(다른 워커나 나중에 처리) 예산에 드는 다음 작업을 찾음
+            estimate = self.admission.estimate(job['file_path']) if self.admission is not None else 0
+            if self.admission is not None and not self.admission.try_acquire(estimate):
+                self.job_queue.release(job['id'])
+                skipped.append(job['id'])
+                if len(skipped) >= self.ADMISSION_SKIP_LIMIT:
+                    skipped = []
+                    self.admission.wait_for_release(self.DISPATCH_POLL_SECONDS)
+                continue
+            skipped = []
+            try:
+                self._process_job(job)
+            finally:
+                self._release_admission(estimate)
+
+    def _claim_worker(self) -> str:
+        """현재 작업 큐 처리 스레드가 작업을 가져갈 때 기록하는 식별자 (호스트:pid:스레드 이름)
+
+        처리 스레드는 한 번에 작업 하나만 처리하므로 완료/실패 기록 때도 같은 스레드에서 다시 만들어 쓴다.
+        """
+        return f"{worker_id()}:{threading.current_thread().name}"
+
+    def _complete_job(self, task_id: str, output_file_path: str) -> None:
+        if not self.job_queue.complete(task_id, self._claim_worker(), output_file_path):
+            self._log_lost_claim(task_id)
+
+    def _fail_job(self, task_id: str, error: str) -> None:
+        if not self.job_queue.fail(task_id, self._claim_worker(), error):
+            self._log_lost_claim(task_id)
+
+    def _log_lost_claim(self, task_id: str) -> None:
+        logger.warning(f"작업이 다시 대기열에 들어가 다른 워커가 가져갔거나 취소되어 결과를 기록하지 않습니다: {task_id}")
+
+    def _requeue_stale_jobs(self) -> None:
+        """중단된 작업(워커 종료/재시작)을 주기적으로 다시 대기열에 넣음"""
+        if time.time() - self._last_requeue < self.STALE_JOB_SECONDS:
+            return
+        self._last_requeue = time.time()
+        try:
+            self.job_queue.requeue_stale(self.STALE_JOB_SECONDS)
+        except Exception as e:
+            logger.error(f"중단된 변환 작업 확인 중 오류 발생: {str(e)}", exc_info=True)
     
-    def _process_pdf_in_background(self, task_id: str, file_path: str) -> None:
-        """백그라운드에서 PDF 파일을 처리하는 함수"""
+    def _process_job(self, job: Dict[str, Any]) -> None:
+        """작업 큐에서 가져온 변환 작업 하나 처리 - 결과를 출력 폴더에 저장하고 완료/실패 기록"""
+        task_id, file_path = job['id'], job['file_path']
+        file_ext = os.path.splitext(file_path)[1].lower()
+        logger.debug(f"백그라운드 변환 시작: {task_id} - {file_path}")
+
+        # heartbeat, 진행 로그, 취소 요청 확인은 프로세스마다 하나인 heartbeat 스레드가 처리 중인 작업 전체에 대해 함
+        started = time.time()
+        control = self._new_control()
+        with self._running_lock:
+            self._running_jobs[task_id] = (started, control)
+
         try:
-            logger.debug(f"백그라운드 PDF 처리 시작: {task_id} - {file_path}")
-            
-            # 상태 업데이트
-            with self.lock:
-                self.conversion_tasks[task_id]['status'] = 'processing'
-                self.conversion_tasks[task_id]['progress_log_time'] = time.time()
-                self.conversion_tasks[task_id]['progress_count'] = 0
-            
-            # 로깅 스레드 시작
-            stop_logging = threading.Event()
-            logging_thread = threading.Thread(
-                target=self._log_conversion_progress, 
-                args=(task_id, stop_logging)
-            )
-            logging_thread.daemon = True
-            logging_thread.start()
-            
+            if not os.path.exists(file_path):
+                logger.error(f"변환할 파일을 찾을 수 없습니다: {file_path}")
+                self._fail_job(task_id, f"파일을 찾을 수 없습니다: {os.path.basename(file_path)}")
+                return
+
+            # 입력 기록에는 변환을 시작할 때의 크기/mtime/해시를 남김
+            input_stat = os.stat(file_path)
+            input_hash = None
+            if self.input_manifest is not None and self.input_manifest.filename_of(file_path) is not None:
+                input_hash = self.input_manifest.content_hash(file_path)
+
+            self._convert_job(task_id, file_path, file_ext, job['cache_key'], control)
+
+            if input_hash is not None:
+                finished = self.job_queue.get(task_id)
+                if finished is not None and finished['status'] == 'completed':
+                    self.input_manifest.record(file_path, finished['result_path'], input_stat, input_hash)
+
+        except ConversionCancelled as e:
+            logger.info(f"변환 작업 취소됨 ({task_id}): {str(e)}")
+            if not self.job_queue.mark_cancelled(task_id, self._claim_worker()):
+                self._log_lost_claim(task_id)
+        except ConversionTimeout as e:
+            logger.error(f"변환 작업 시간 초과 ({task_id}): {str(e)}")
+            self._fail_job(task_id, str(e))
+        except Exception as e:
+            logger.error(f"백그라운드 변환 중 오류 발생 ({task_id}): {str(e)}", exc_info=True)
             try:
-                # PDF 변환 작업 수행
-                logger.info(f"PDF 변환 시작 ({task_id}): {file_path}, 최대 100페이지, 최대 20MB")
-                with open(file_path, 'rb') as f:
-                    buf = BytesIO(f.read())
-                    source = DocumentStream(name=os.path.basename(file_path), stream=buf)
-                    result = self.converter.convert(source)
-                
-                if hasattr(result, 'document') and hasattr(result.document, 'export_to_markdown'):
-                    markdown = result.document.export_to_markdown()
-                    logger.info(f"백그라운드 PDF 변환 완료: {task_id}, 결과 크기: {len(markdown)} 바이트")
-                    
-                    # 파일 저장 로직 추가
-                    try:
-                        # 현재 파일(converter_service.py)의 디렉토리 (services)
-                        current_file_dir = os.path.dirname(os.path.abspath(__file__))
-                        # 프로젝트 루트 디렉토리 (services 폴더의 부모)
-                        project_root_dir = os.path.dirname(current_file_dir)
-                        output_dir_name = "output"
-                        output_dir = os.path.join(project_root_dir, output_dir_name)
-
-                        if not os.path.exists(output_dir):
-                            os.makedirs(output_dir)
-                        
-                        base_name = os.path.basename(file_path)
-                        file_name_without_ext, _ = os.path.splitext(base_name)
-                        output_file_name = f"{file_name_without_ext}.md"
-                        output_file_path = os.path.join(output_dir, output_file_name)
-                        
-                        with open(output_file_path, 'w', encoding='utf-8') as f_out:
-                            f_out.write(markdown) # 'markdown' 변수 사용
-                        logger.info(f"변환된 마크다운 파일 저장 완료: {output_file_path}")
-                        
-                    except Exception as e_save:
-                        logger.error(f"백그라운드 PDF 변환 후 파일 저장 중 오류 발생 ({task_id}): {str(e_save)}", exc_info=True)
-                        with self.lock:
-                            _current_error = self.conversion_tasks[task_id].get('error', '')
-                            _save_error_msg = f"File save error: {str(e_save)}"
-                            self.conversion_tasks[task_id]['error'] = f"{_current_error}; {_save_error_msg}".strip('; ') if _current_error else _save_error_msg
-
-                    # 결과 저장 (메모리 내)
-                    with self.lock:
-                        self.conversion_tasks[task_id]['status'] = 'completed'
-                        self.conversion_tasks[task_id]['result'] = markdown
-                        self.conversion_tasks[task_id]['end_time'] = time.time()
-                        
-                elif isinstance(result, str):
-                    logger.info(f"백그라운드 PDF 변환 완료 (직접 문자열 반환): {task_id}, 결과 크기: {len(result)} 바이트")
-                    
-                    # 파일 저장 로직 추가
-                    try:
-                        # 현재 파일(converter_service.py)의 디렉토리 (services)
-                        current_file_dir = os.path.dirname(os.path.abspath(__file__))
-                        # 프로젝트 루트 디렉토리 (services 폴더의 부모)
-                        project_root_dir = os.path.dirname(current_file_dir)
-                        output_dir_name = "output"
-                        output_dir = os.path.join(project_root_dir, output_dir_name)
-
-                        if not os.path.exists(output_dir):
-                            os.makedirs(output_dir)
-                        
-                        base_name = os.path.basename(file_path)
-                        file_name_without_ext, _ = os.path.splitext(base_name)
-                        output_file_name = f"{file_name_without_ext}.md"
-                        output_file_path = os.path.join(output_dir, output_file_name)
-                        
-                        with open(output_file_path, 'w', encoding='utf-8') as f_out:
-                            f_out.write(result) # 'result' 변수 사용 (직접 문자열인 경우)
-                        logger.info(f"변환된 마크다운 파일 저장 완료: {output_file_path}")
-                        
-                    except Exception as e_save:
-                        logger.error(f"백그라운드 PDF 변환 후 파일 저장 중 오류 발생 ({task_id}): {str(e_save)}", exc_info=True)
-                        with self.lock:
-                            _current_error = self.conversion_tasks[task_id].get('error', '')
-                            _save_error_msg = f"File save error: {str(e_save)}"
-                            self.conversion_tasks[task_id]['error'] = f"{_current_error}; {_save_error_msg}".strip('; ') if _current_error else _save_error_msg
-
-                    # 결과 저장 (메모리 내)
-                    with self.lock:
-                        self.conversion_tasks[task_id]['status'] = 'completed'
-                        self.conversion_tasks[task_id]['result'] = result
-                        self.conversion_tasks[task_id]['end_time'] = time.time()
-                else:
-                    logger.error(f"백그라운드 PDF 변환 결과 형식이 예상과 다릅니다 ({type(result)}): {task_id}")
-                    
-                    # 오류 저장
-                    with self.lock:
-                        self.conversion_tasks[task_id]['status'] = 'failed'
-                        self.conversion_tasks[task_id]['error'] = f"결과 형식이 예상과 다릅니다: {type(result)}"
-                        self.conversion_tasks[task_id]['end_time'] = time.time()
-            finally:
-                # 로깅 스레드 종료 신호
-                stop_logging.set()
-                logging_thread.join(timeout=1.0)  # 최대 1초 대기
-                
+                self._fail_job(task_id, str(e))
+            except Exception as e_queue:
+                logger.error(f"변환 작업 실패 기록 중 오류 발생 ({task_id}): {str(e_queue)}", exc_info=True)
+        finally:
+            with self._running_lock:
+                self._running_jobs.pop(task_id, None)
+            self._record_job_metrics(job, file_ext, started)
+
+    def _record_job_metrics(self, job: Dict[str, Any], file_ext: str, started: float) -> None:
+        """작업 큐 대기 시간과 작업 전체 소요 시간(완료/실패별)을 메트릭에 기록"""
+        if self.metrics is None:
+            return
+        try:
+            finished = self.job_queue.get(job['id'])
         except Exception as e:
-            logger.error(f"백그라운드 PDF 변환 중 오류 발생 ({task_id}): {str(e)}", exc_info=True)
-            
-            # 오류 저장
-            with self.lock:
-                self.conversion_tasks[task_id]['status'] = 'failed'
-                self.conversion_tasks[task_id]['error'] = str(e)
-                self.conversion_tasks[task_id]['end_time'] = time.time()
+            logger.error(f"변환 작업 상태 조회 중 오류 발생 ({job['id']}): {str(e)}")
+            return
+        file_type = file_type_label(file_ext)
+        outcome = finished['status'] if finished is not None else 'unknown'
+        self.metrics.observe_many([
+            ('docquery_job_wait_seconds', {'file_type': file_type}, max(0.0, started - job['created_at'])),
+            ('docquery_conversion_seconds', {'file_type': file_type, 'outcome': outcome}, time.time() - started),
+        ])
+
+    def _convert_job(self, task_id: str, file_path: str, file_ext: str, cache_key: Optional[str],
+                     control: TaskControl) -> None:
+        """작업 하나를 변환하고 작업 큐에 완료/실패 기록"""
+        # 배치 작업은 등록할 때 캐시를 확인하지 않으므로 여기서 확인
+        if cache_key is None:
+            cache_key = self._conversion_cache_key(file_path, file_ext)
+            cached_markdown = self._get_cached_markdown(cache_key) if cache_key is not None else None
+            if cached_markdown is not None:
+                logger.info(f"변환 캐시 적중: {file_path}")
+                self._finish_job(task_id, file_path, cached_markdown)
+                return
+
+        if file_ext == '.pdf':
+            self._process_pdf_in_background(task_id, file_path, control, cache_key)
+            return
+
+        markdown, cacheable = self._run_conversion(file_path, file_ext, control)
+        if markdown:
+            logger.info(f"백그라운드 변환 완료: {task_id}, 결과 크기: {len(markdown)} 바이트")
+            if cacheable:
+                self._store_cached_markdown(cache_key, file_ext, file_path, markdown)
+            self._finish_job(task_id, file_path, markdown)
+        else:
+            logger.error(f"백그라운드 변환 결과가 없습니다: {task_id}")
+            self._fail_job(task_id, "변환 결과가 없습니다 (자세한 내용은 로그 참고)")
+
+    def _finish_job(self, task_id: str, file_path: str, markdown: str) -> None:
+        """변환 결과를 저장하고 작업 완료 기록 - 결과는 출력 파일 경로로 기록 (저장 실패 시 작업 실패)
+
+        그 사이 작업이 다른 워커에게 넘어갔거나 취소되었으면 출력 파일을 덮어쓰지 않는다.
+        """
+        if not self.job_queue.is_claimed_by(task_id, self._claim_worker()):
+            self._log_lost_claim(task_id)
+            return
+        output_file_path, save_error = self._save_background_output(task_id, file_path, markdown)
+        if output_file_path is not None:
+            self._complete_job(task_id, output_file_path)
+        else:
+            self._fail_job(task_id, save_error)
     
-    def _log_conversion_progress(self, task_id: str, stop_event: threading.Event) -> None:
-        """PDF 변환 진행 상황을 주기적으로 로깅하는 함수"""
-        while not stop_event.is_set():
-            # 10초마다 로깅
-            time.sleep(15)
-            
-            if stop_event.is_set():
-                break
-                
-            with self.lock:
-                if task_id not in self.conversion_tasks:
-                    break
-                    
-                task = self.conversion_tasks[task_id]
-                if task['status'] not in ['pending', 'processing']:
-                    break
-                    
-                # 진행 카운트 증가
-                task['progress_count'] += 1
-                elapsed_time = time.time() - task['start_time']
-                
-                # 상태 로깅
-                logger.info(f"PDF 변환 진행 중 ({task_id}): {task['progress_count'] * 10}초 경과, 상태: {task['status']}")
-                
-                # 메모리 사용량 로깅 (옵션)
+    def _process_pdf_in_background(self, task_id: str, file_path: str, control: TaskControl,
+                                   cache_key: Optional[str] = None) -> None:
+        """백그라운드에서 PDF 파일을 처리하는 함수 (작업 큐에서 가져온 작업)
+
+        페이지가 pdf_chunk_pages보다 많으면 페이지 범위로 나누어 변환하고, 변환된 페이지 수를
+        진행 상황으로 기록한다.
+        """
+        pages_total = _count_pdf_pages(file_path)
+        if pages_total is not None and 0 < self.pdf_chunk_pages < pages_total:
+            output_file_path, error = self._convert_pdf_in_chunks(task_id, file_path, pages_total, control, cache_key)
+            if output_file_path is not None:
+                self._complete_job(task_id, output_file_path)
+            else:
+                self._fail_job(task_id, error)
+            return
+
+        # PDF 변환 작업 수행 (변환 프로세스 풀이 있으면 워커에서 실행)
+        logger.info(f"PDF 변환 시작 ({task_id}): {file_path}, 페이지 수: {pages_total if pages_total is not None else '알 수 없음'}")
+        markdown, _ = self._run_conversion(file_path, '.pdf', control)
+
+        if markdown:
+            logger.info(f"백그라운드 PDF 변환 완료: {task_id}, 결과 크기: {len(markdown)} 바이트")
+            self._store_cached_markdown(cache_key, '.pdf', file_path, markdown)
+            if pages_total is not None:
+                self.job_queue.progress(task_id, pages_total, pages_total)
+            self._finish_job(task_id, file_path, markdown)
+        else:
+            logger.error(f"백그라운드 PDF 변환 결과가 없습니다: {task_id}")
+            self._fail_job(task_id, "변환 결과가 없습니다 (자세한 내용은 로그 참고)")
+
+    def _convert_pdf_in_chunks(self, task_id: str, file_path: str, pages_total: int, control: TaskControl,
+                               cache_key: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
+        """PDF를 페이지 범위로 나누어 변환하고 순서대로 이어 붙임
+
+        범위는 끝나는 순서대로 도착하지만 임시 파일에는 앞에서부터 이어지는 부분만 추가하고,
+        모든 범위가 성공하면 임시 파일을 출력 파일로 바꾼 뒤 검색 색인을 갱신한다.
+        (출력 파일 경로, None) 또는 실패 시 (None, 오류 메시지) 반환 - 실패/취소/시간 초과 시
+        임시 파일은 지우고 이전 출력 파일과 색인은 그대로 둔다.
+        """
+        ranges = [(start, min(start + self.pdf_chunk_pages - 1, pages_total))
+                  for start in range(1, pages_total + 1, self.pdf_chunk_pages)]
+        logger.info(f"PDF 분할 변환 시작 ({task_id}): {file_path}, {pages_total}페이지, {len(ranges)}개 범위")
+        self.job_queue.progress(task_id, 0, pages_total)
+
+        output_file_path = self._background_output_path(file_path)
+        os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+        temp_path = f"{output_file_path}.{task_id}.part"  # .md로 끝나지 않으므로 검색/목록에 나타나지 않음
+        chunks: Dict[int, Optional[str]] = {}
+        written = 0  # 임시 파일에 쓴 범위 수 (앞에서부터 연속)
+        pages_done = 0
+        failed_ranges: List[str] = []
+        timings: Dict[str, float] = {}
+        replaced = False
+
+        try:
+            for i, markdown in self._iter_pdf_chunks(file_path, ranges, control):
+                chunks[i] = markdown
+                start, end = ranges[i]
+                if markdown is None:
+                    failed_ranges.append(f"{start}-{end}")
+                else:
+                    pages_done += end - start + 1
+
+                flushed = []
+                while chunks.get(written) is not None:
+                    flushed.append(chunks[written])
+                    written += 1
+                if flushed:
+                    try:
+                        with stage_timer(timings, 'output_write'), \
+                                open(temp_path, 'w' if written == len(flushed) else 'a', encoding='utf-8') as f_out:
+                            f_out.write(('' if written == len(flushed) else '\n\n') + '\n\n'.join(flushed))
+                    except OSError as e_save:
+                        logger.error(f"PDF 분할 변환 결과 저장 중 오류 발생 ({task_id}): {str(e_save)}", exc_info=True)
+                        return None, f"File save error: {str(e_save)}"
+                self.job_queue.progress(task_id, pages_done, pages_total)
+            self._record_stage_timings('.pdf', timings)
+
+            if failed_ranges:
+                logger.error(f"PDF 분할 변환 실패 ({task_id}): 페이지 {', '.join(failed_ranges)}")
+                return None, f"페이지 {', '.join(failed_ranges)} 변환 실패 (이전 출력 파일은 그대로 둠)"
+
+            if not self.job_queue.is_claimed_by(task_id, self._claim_worker()):
+                self._log_lost_claim(task_id)
+                return None, "작업이 다른 워커에게 넘어가 결과를 저장하지 않았습니다"
+            try:
+                os.replace(temp_path, output_file_path)
+            except OSError as e_save:
+                logger.error(f"PDF 분할 변환 결과 저장 중 오류 발생 ({task_id}): {str(e_save)}", exc_info=True)
+                return None, f"File save error: {str(e_save)}"
+            replaced = True
+        finally:
+            if not replaced:
                 try:
-                    import psutil
-                    process = psutil.Process()
-                    memory_info = process.memory_info()
-                    logger.debug(f"메모리 사용량: {memory_info.rss / (1024 * 1024):.2f} MB")
-                except ImportError:
-                    pass  # psutil이 설치되지 않은 경우 무시
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+
+        logger.info(f"PDF 분할 변환 완료 ({task_id}): {output_file_path}")
+        self._update_search_index(output_file_path)
+        self._store_cached_markdown(cache_key, '.pdf', file_path, '\n\n'.join(chunks[i] for i in range(len(ranges))))
+        return output_file_path, None
+
+    def _iter_pdf_chunks(self, file_path: str, ranges: List[Tuple[int, int]],
+                         control: TaskControl) -> Iterator[Tuple[int, Optional[str]]]:
+        """페이지 범위별 변환 결과를 (범위 번호, 마크다운) 형태로 끝나는 순서대로 반환
+
+        변환 프로세스 풀이 있으면 범위들을 풀 워커에 나누어 병렬로 변환한다.
+        취소되거나 마감이 지나면 남은 범위를 변환하지 않고 ConversionCancelled/ConversionTimeout 발생.
+        """
+        if self.conversion_workers <= 1:
+            for i, (start, end) in enumerate(ranges):
+                control.check()
+                timings: Dict[str, float] = {}
+                markdown = _convert_pdf_pages(self.converter, file_path, start, end, timings)
+                self._record_stage_timings('.pdf', timings)
+                yield i, markdown
+            return
+
+        pool = self._get_process_pool()
+        futures = {pool.submit(_convert_pages_in_worker, file_path, start, end, control=control): i
+                   for i, (start, end) in enumerate(ranges)}
+        try:
+            for future in as_completed(futures):
+                try:
+                    markdown, timings = future.result()
+                    self._record_stage_timings('.pdf', timings)
+                except WorkerCrashed as e:
+                    logger.error(f"변환 워커가 비정상 종료되었습니다 ({file_path}): {str(e)}")
+                    markdown = None
+                except (ConversionCancelled, ConversionTimeout):
+                    raise
+                except Exception as e:
+                    logger.error(f"변환 워커에서 오류 발생 ({file_path}): {str(e)}", exc_info=True)
+                    markdown = None
+                yield futures[future], markdown
+        finally:
+            # 중단된 경우 아직 시작하지 않은 범위 취소 (실행 중인 범위는 같은 마감/취소 신호로 멈춤)
+            for future in futures:
+                future.cancel()
+
+    def _background_output_path(self, file_path: str) -> str:
+        """백그라운드 변환 결과를 저장할 출력 파일 경로 (입력 파일명에서 확장자만 .md로)"""
+        file_name_without_ext, _ = os.path.splitext(os.path.basename(file_path))
+        return os.path.join(self.output_folder, f"{file_name_without_ext}.md")
+    
+    def _save_background_output(self, task_id: str, file_path: str, markdown: str) -> Tuple[Optional[str], Optional[str]]:
+        """백그라운드 변환 결과를 출력 폴더에 저장하고 검색 색인을 갱신하는 함수
+
+        (저장된 파일 경로, None) 또는 저장 실패 시 (None, 오류 메시지) 반환
+        """
+        try:
+            output_file_path = self._background_output_path(file_path)
+            os.makedirs(os.path.dirname(output_file_path), exist_ok=True)
+
+            timings: Dict[str, float] = {}
+            with stage_timer(timings, 'output_write'), open(output_file_path, 'w', encoding='utf-8') as f_out:
+                f_out.write(markdown)
+            self._record_stage_timings(os.path.splitext(file_path)[1], timings)
+            logger.info(f"변환된 마크다운 파일 저장 완료: {output_file_path}")
+
+        except Exception as e_save:
+            logger.error(f"백그라운드 변환 후 파일 저장 중 오류 발생 ({task_id}): {str(e_save)}", exc_info=True)
+            return None, f"File save error: {str(e_save)}"
+
+        self._update_search_index(output_file_path)
+        return output_file_path, None
+
+    def _update_search_index(self, output_file_path: str) -> None:
+        """저장된 파일의 검색 색인만 증분 갱신"""
+        if self.search_index is not None:
+            try:
+                self.search_index.update_file(output_file_path)
+            except Exception as e_index:
+                logger.error(f"검색 색인 갱신 중 오류 발생 ({output_file_path}): {str(e_index)}", exc_info=True)
+
+    def _heartbeat_loop(self, stop_event: threading.Event) -> None:
+        """이 프로세스에서 처리 중인 작업 전체의 취소 요청을 확인하고 heartbeat와 진행 상황을 기록
+
+        작업마다 스레드를 띄우지 않고 프로세스마다 이 스레드 하나가 CANCEL_POLL_SECONDS마다 깨어나
+        취소 요청을 확인하고, HEARTBEAT_SECONDS마다 heartbeat와 진행 로그를 남긴다.
+        """
+        last_heartbeat = time.time()
+        while not stop_event.wait(self.CANCEL_POLL_SECONDS):
+            with self._running_lock:
+                running = dict(self._running_jobs)
+            if not running:
+                continue
+            try:
+                # 다른 워커가 받은 취소 요청도 작업 큐를 통해 전달됨 - 워커 풀이 변환 워커를 종료
+                for task_id in self.job_queue.cancel_requested(list(running)):
+                    running[task_id][1].cancelled.set()
+            except Exception as e:
+                logger.error(f"변환 작업 취소 요청 확인 중 오류 발생: {str(e)}")
+
+            now = time.time()
+            if now - last_heartbeat < self.HEARTBEAT_SECONDS:
+                continue
+            last_heartbeat = now
+            try:
+                self.job_queue.heartbeat(list(running))
+            except Exception as e:
+                logger.error(f"변환 작업 heartbeat 기록 중 오류 발생: {str(e)}")
+            for task_id, (started, control) in running.items():
+                overdue = control.deadline is not None and now > control.deadline
+                logger.info(f"변환 진행 중 ({task_id}): {now - started:.0f}초 경과, 상태: processing"
+                            + (" (제한 시간 초과 - 현재 프로세스에서 변환 중이라 끝날 때까지 대기)" if overdue else ""))
+            logger.debug(f"처리 중인 변환 작업 {len(running)}개 ({format_memory_usage(memory_usage())})")
+
+    def cancel_conversion(self, task_id: str) -> Optional[str]:
+        """변환 작업 취소 - 대기 중이면 바로 취소, 처리 중이면 처리하는 워커가 변환을 중단
+
+        바뀐 상태('cancelled', 'cancelling')나 이미 끝난 작업의 상태 반환 (작업이 없으면 None)
+        """
+        status = self.job_queue.cancel(task_id)
+        with self._running_lock:
+            running = self._running_jobs.get(task_id)
+        if status == 'cancelling' and running is not None:
+            running[1].cancelled.set()  # 이 프로세스에서 처리 중이면 바로 중단
+        if status is not None:
+            logger.info(f"변환 작업 취소 요청: {task_id} ({status})")
+        return status
+
+    def cancel_batch(self, batch_id: str) -> Optional[Dict[str, int]]:
+        """배치의 끝나지 않은 작업 전체 취소 - 바로 취소한 수와 중단 요청한 수 (배치가 없으면 None)"""
+        if not self.job_queue.batch_jobs(batch_id):
+            return None
+        result = self.job_queue.cancel_batch(batch_id)
+        logger.info(f"변환 배치 취소 요청: {batch_id} ({result})")
+        return result
     
     def get_conversion_status(self, task_id: str) -> Dict[str, Any]:
-        """변환 작업의 상태를 확인하는 함수"""
-        with self.lock:
-            if task_id in self.conversion_tasks:
-                return self.conversion_tasks[task_id].copy()
-            else:
-                return {'status': 'not_found', 'error': f"작업 ID를 찾을 수 없습니다: {task_id}"}
+        """변환 작업의 상태를 확인하는 함수 (어느 워커에서 등록한 작업이든 조회 가능)"""
+        job = self.job_queue.get(task_id)
+        if job is None:
+            return {'status': 'not_found', 'error': f"작업 ID를 찾을 수 없습니다: {task_id}"}
+        return self._job_status(job)
+
+    def get_batch_status(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """배치의 파일별 작업 상태와 상태별 개수 (배치가 없으면 None)"""
+        jobs = self.job_queue.batch_jobs(batch_id)
+        if not jobs:
+            return None
+        counts: Dict[str, int] = {}
+        for job in jobs:
+            counts[job['status']] = counts.get(job['status'], 0) + 1
+        finished = sum(counts.get(status, 0) for status in FINISHED_STATUSES)
+        return {
+            'batch_id': batch_id,
+            'total': len(jobs),
+            'counts': counts,
+            'done': finished == len(jobs),
+            'jobs': [self._job_status(job) for job in jobs],
+        }
+
+    def _job_status(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            'task_id': job['id'],
+            'filename': os.path.basename(job['file_path']),
+            'batch_id': job['batch_id'],
+            'file_path': job['file_path'],
+            'status': job['status'],
+            'result_path': job['result_path'],
+            'error': job['error'],
+            'worker': job['worker'],
+            'attempts': job['attempts'],
+            'priority': job['priority'],
+            'cancel_requested': bool(job['cancel_requested']),
+            'pages_done': job['pages_done'],
+            'pages_total': job['pages_total'],
+            'start_time': job['created_at'],
+            'started_at': job['started_at'],
+            'end_time': job['finished_at'],
+        }
     
     def get_conversion_result(self, task_id: str) -> Tuple[bool, Optional[str]]:
-        """변환 작업의 결과를 가져오는 함수"""
-        with self.lock:
-            if task_id not in self.conversion_tasks:
-                return False, f"작업 ID를 찾을 수 없습니다: {task_id}"
-            
-            task = self.conversion_tasks[task_id]
-            
-            if task['status'] == 'completed':
-                return True, task['result']
-            elif task['status'] == 'failed':
-                return False, f"변환 작업 실패: {task['error']}"
-            else:
-                return False, f"변환 작업이 아직 완료되지 않았습니다. 현재 상태: {task['status']}"
+        """변환 작업의 결과를 가져오는 함수 (저장된 출력 파일에서 읽음)"""
+        job = self.job_queue.get(task_id)
+        if job is None:
+            return False, f"작업 ID를 찾을 수 없습니다: {task_id}"
+        
+        if job['status'] == 'completed':
+            try:
+                with open(job['result_path'], 'r', encoding='utf-8') as f:
+                    return True, f.read()
+            except (OSError, TypeError) as e:
+                return False, f"변환 결과 파일을 읽을 수 없습니다: {str(e)}"
+        elif job['status'] == 'failed':
+            return False, f"변환 작업 실패: {job['error']}"
+        elif job['status'] == 'cancelled':
+            return False, "변환 작업이 취소되었습니다"
+        else:
+            return False, f"변환 작업이 아직 완료되지 않았습니다. 현재 상태: {job['status']}"
     
     def cleanup_old_tasks(self, max_age_hours: int = 24) -> int:
-        """오래된 작업 정보를 정리하는 함수"""
-        current_time = time.time()
-        max_age_seconds = max_age_hours * 3600
-        removed_count = 0
-        
-        with self.lock:
-            task_ids = list(self.conversion_tasks.keys())
-            
-            for task_id in task_ids:
-                task = self.conversion_tasks[task_id]
-                
-                # 완료되었거나 실패한 작업 중 오래된 것 제거
-                if task['status'] in ['completed', 'failed']:
-                    if 'end_time' in task and (current_time - task['end_time']) > max_age_seconds:
-                        del self.conversion_tasks[task_id]
-                        removed_count += 1
-                        
-                # 시작된 지 너무 오래된 작업(처리 중이지만 멈춘 것으로 추정) 제거
-                elif (current_time - task['start_time']) > max_age_seconds * 2:  # 더 긴 시간 허용
-                    del self.conversion_tasks[task_id]
-                    removed_count += 1
-        
-        return removed_count
+        """오래된 작업 정보를 정리하는 함수 (완료/실패/취소 후 max_age_hours가 지난 작업 삭제)
+
+        실행 중인 변환을 멈추려면 cancel_conversion이나 conversion_timeout_seconds를 사용한다.
+        """
+        return self.job_queue.cleanup(max_age_hours * 3600)
 
 
 # 사용 예시 (테스트용)
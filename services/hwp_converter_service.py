@@ -3,94 +3,372 @@ import olefile
 import zlib
 import struct
 import re
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services.metrics import stage_timer
+
+# 변환 결과가 달라지는 수정을 하면 올려서 변환 캐시(services/conversion_cache.py)를 무효화
+HWP_CONVERTER_VERSION = '3'
+
+# 스트림을 읽고 압축을 푸는 단위(바이트) - 변환 중 메모리는 문서 전체가 아니라 이 크기(+ 레코드 하나)로 제한됨
+HWP_READ_CHUNK_SIZE = 64 * 1024
+
+# 본문 레코드 태그 (HWP 5.0 문서 형식, HWPTAG_BEGIN = 16)
+HWPTAG_PARA_TEXT = 67
+HWPTAG_CTRL_HEADER = 71
+HWPTAG_LIST_HEADER = 72
+HWPTAG_TABLE = 77
+# CTRL_HEADER 앞 4바이트의 컨트롤 ID 'tbl ' (UINT32 리틀 엔디언이라 뒤집혀 저장됨)
+_TABLE_CTRL_ID = b' lbt'
+# 레코드 헤더의 크기 필드가 이 값이면 실제 크기는 뒤따르는 4바이트에 있음
+_EXTENDED_SIZE = 0xfff
+
+# 인라인/확장 컨트롤 - 제어 문자, 정보 6글자, 같은 제어 문자로 8글자를 차지함 (탭만 탭으로 남김)
+_INLINE_CONTROLS = re.compile(r'([\x01-\x09\x0b\x0c\x0e-\x17])[\s\S]{6}\1')
+# 문자 컨트롤 - 줄 바꿈, 하이픈, 묶음/고정폭 빈칸만 바꾸어 남기고 나머지 제어 문자는 제거
+_CHAR_CONTROLS = {code: None for code in range(0x20) if code != 0x09}
+_CHAR_CONTROLS.update({0x0a: '\n', 0x18: '-', 0x1e: ' ', 0x1f: ' '})
+_LONE_SURROGATES = re.compile(r'[\ud800-\udfff]')
 
 # 원본 hwp_text_converter.py에서 가져온 함수들
 
-def get_hwp_text(filename: str) -> str:
-    """HWP 파일에서 텍스트를 추출하여 Markdown 형식으로 반환하는 함수."""
-    with olefile.OleFileIO(filename) as f:
-        if not f.exists('FileHeader') or not f.exists('\x05HwpSummaryInformation'):
-            raise ValueError(f"유효하지 않은 HWP 파일: {filename}")
-
-        header = f.openstream('FileHeader').read()
-        is_compressed = (header[36] & 1) == 1
-
-        sections = []
-        for entry in f.listdir():
-            if entry[0] == 'BodyText' and entry[1].startswith('Section'):
-                idx = int(entry[1][len('Section'):])
-                sections.append((idx, f"BodyText/Section{idx}"))
-        sections.sort()
-
-        md_lines: List[str] = []
-        for _, stream in sections:
-            raw = f.openstream(stream).read()
-            data = zlib.decompress(raw, -15) if is_compressed else raw
+def get_hwp_text(filename: str, timings: Optional[Dict[str, float]] = None) -> str:
+    """HWP 파일에서 텍스트를 추출하여 Markdown 형식으로 반환하는 함수.
+
+    timings를 넘기면 단계별(ole_open, read, decompress, parse) 소요 시간을 더해 기록한다.
+    """
+    return '\n'.join(iter_hwp_markdown(filename, timings)) + '\n'
+
+def iter_hwp_markdown(filename: str, timings: Optional[Dict[str, float]] = None) -> Iterator[str]:
+    """HWP 파일의 Markdown을 한 줄씩 반환하는 제너레이터 (줄바꿈 문자 제외)
+
+    본문 섹션 스트림을 청크 단위로 읽어 압축을 풀면서 레코드를 따라가고, 문단 텍스트와
+    표(TABLE/LIST_HEADER 레코드로 만든 Markdown 테이블)를 빈 줄 정리를 거쳐 바로 내보낸다.
+    """
+    with stage_timer(timings, 'ole_open'):
+        ole = olefile.OleFileIO(filename)
+    with ole as f:
+        with stage_timer(timings, 'ole_open'):
+            is_compressed, sections = _read_hwp_layout(f, filename)
+
+        writer = _MarkdownWriter()
+        for stream in sections:
+            parser = _SectionParser()
+            for records in _iter_section_records(f.openstream(stream), is_compressed, timings):
+                out: List[str] = []
+                with stage_timer(timings, 'parse'):
+                    for line in parser.feed(records):
+                        writer.feed(line, out)
+                yield from out
+            out = []
+            with stage_timer(timings, 'parse'):
+                for line in parser.finish():
+                    writer.feed(line, out)
+            yield from out
+
+def list_hwp_sections(filename: str, timings: Optional[Dict[str, float]] = None) -> Tuple[bool, List[str]]:
+    """HWP 파일의 (본문 압축 여부, 순서대로 정렬한 섹션 스트림 경로 목록)"""
+    with stage_timer(timings, 'ole_open'):
+        with olefile.OleFileIO(filename) as f:
+            return _read_hwp_layout(f, filename)
+
+def get_hwp_section(filename: str, stream: str, is_compressed: bool,
+                    timings: Optional[Dict[str, float]] = None) -> Tuple[List[str], List[str], List[str]]:
+    """섹션 스트림 하나를 해석한 (앞 줄, 가운데 Markdown 줄, 뒤 줄) - 섹션별 병렬 변환용
+
+    빈 줄 정리는 앞 섹션의 상태(앞에 내용이 있었는지, 끝에 빈 줄이 남았는지)에 따라 달라지므로
+    첫 내용 줄까지와 마지막 내용 줄 뒤는 그대로 두고, 그 사이만 미리 정리한다.
+    내용 줄을 지나면 앞 상태와 관계없이 같은 상태가 되기 때문이다.
+    섹션 순서대로 join_hwp_sections에 넘기면 get_hwp_text와 같은 결과가 된다.
+    """
+    with stage_timer(timings, 'ole_open'):
+        ole = olefile.OleFileIO(filename)
+    with ole as f:
+        head: List[str] = []
+        body: List[str] = []
+        tail: List[str] = []  # 마지막 내용 줄 뒤의 빈 줄
+        parser = _SectionParser()
+        started = False  # 첫 내용 줄을 head에 넣었는지
+
+        def take(lines: List[str]) -> None:
+            nonlocal started
+            for line in lines:
+                if not started:
+                    head.append(line)
+                    started = bool(line.strip())
+                elif not line.strip():
+                    tail.append(line)
+                else:
+                    if tail:
+                        body.append('')  # 내용 줄 사이의 빈 줄은 하나로 축소
+                        tail.clear()
+                    body.append(line)
+
+        for records in _iter_section_records(f.openstream(stream), is_compressed, timings):
+            with stage_timer(timings, 'parse'):
+                take(parser.feed(records))
+        with stage_timer(timings, 'parse'):
+            take(parser.finish())
+        return head, body, tail
+
+def join_hwp_sections(sections: Iterable[Tuple[List[str], List[str], List[str]]]) -> str:
+    """섹션 순서대로 받은 get_hwp_section 결과를 이어 Markdown으로 변환"""
+    writer = _MarkdownWriter()
+    out: List[str] = []
+    for head, body, tail in sections:
+        for line in head:
+            writer.feed(line, out)
+        out.extend(body)
+        for line in tail:
+            writer.feed(line, out)
+    return '\n'.join(out) + '\n'
+
+def _read_hwp_layout(f, filename: str) -> Tuple[bool, List[str]]:
+    """열린 OLE 파일에서 (본문 압축 여부, 섹션 스트림 경로 목록) - HWP 파일이 아니면 ValueError"""
+    if not f.exists('FileHeader') or not f.exists('\x05HwpSummaryInformation'):
+        raise ValueError(f"유효하지 않은 HWP 파일: {filename}")
+
+    header = f.openstream('FileHeader').read()
+    is_compressed = (header[36] & 1) == 1
+
+    sections = []
+    for entry in f.listdir():
+        if entry[0] == 'BodyText' and entry[1].startswith('Section'):
+            idx = int(entry[1][len('Section'):])
+            sections.append((idx, f"BodyText/Section{idx}"))
+    sections.sort()
+    return is_compressed, [stream for _, stream in sections]
+
+def _iter_section_records(stream, is_compressed: bool,
+                          timings: Optional[Dict[str, float]]) -> Iterator[List[Tuple[int, int, memoryview]]]:
+    """섹션 스트림을 청크 단위로 읽고 (압축되어 있으면 풀어서) 레코드 목록을 차례로 반환"""
+    chunks = _read_chunks(stream, timings)
+    if is_compressed:
+        chunks = _decompress_chunks(chunks, timings)
+    return _iter_record_batches(chunks, timings)
+
+def _read_chunks(stream, timings: Optional[Dict[str, float]]) -> Iterator[bytes]:
+    """OLE 스트림을 HWP_READ_CHUNK_SIZE 단위로 읽음"""
+    while True:
+        with stage_timer(timings, 'read'):
+            chunk = stream.read(HWP_READ_CHUNK_SIZE)
+        if not chunk:
+            return
+        yield chunk
+
+def _decompress_chunks(chunks: Iterator[bytes], timings: Optional[Dict[str, float]]) -> Iterator[bytes]:
+    """raw deflate 청크를 차례로 풀어 반환 (한 번에 HWP_READ_CHUNK_SIZE 이하)"""
+    decompressor = zlib.decompressobj(-15)
+    for chunk in chunks:
+        while chunk:
+            with stage_timer(timings, 'decompress'):
+                data = decompressor.decompress(chunk, HWP_READ_CHUNK_SIZE)
+                chunk = decompressor.unconsumed_tail
+            if data:
+                yield data
+    with stage_timer(timings, 'decompress'):
+        data = decompressor.flush()
+        if not decompressor.eof:
+            # zlib.decompress와 같이 잘린 스트림은 오류로 처리
+            raise zlib.error("Error -5 while decompressing data: incomplete or truncated stream")
+    if data:
+        yield data
+
+def _iter_record_batches(chunks: Iterator[bytes],
+                         timings: Optional[Dict[str, float]]) -> Iterator[List[Tuple[int, int, memoryview]]]:
+    """청크마다 그 안에서 끝나는 레코드의 (태그, 레벨, 내용) 목록을 반환
+
+    내용은 청크를 복사하지 않는 memoryview이며 다음 목록을 받기 전까지만 유효하다.
+    청크 경계에 걸친 레코드는 조각을 모아 두었다가 선언된 길이만큼 모이면 한 번에 이어 붙인다
+    (큰 레코드도 청크마다 다시 복사하지 않음).
+    """
+    pending: List[bytes] = []  # 경계에 걸친 레코드의 조각들
+    pending_size = 0
+    needed = 0  # 걸친 레코드를 끝까지 읽는 데 필요한 바이트 수 (헤더를 다 못 읽었으면 0)
+    for chunk in chunks:
+        with stage_timer(timings, 'parse'):
+            if pending:
+                pending.append(chunk)
+                pending_size += len(chunk)
+                if pending_size < needed:
+                    continue
+                data = b''.join(pending)
+            else:
+                data = chunk
+            view = memoryview(data)
+            records = []
             i, size = 0, len(data)
-            while i < size:
+            needed = 0
+            while i + 4 <= size:
                 header = struct.unpack_from('<I', data, i)[0]
                 rec_type = header & 0x3ff
+                rec_level = (header >> 10) & 0x3ff
                 rec_len = (header >> 20) & 0xfff
-                if rec_type == 67:
-                    rec_data = data[i+4:i+4+rec_len]
-                    try:
-                        text = rec_data.decode('utf-16-le')
-                    except UnicodeDecodeError:
-                        text = rec_data.decode('utf-16', errors='ignore')
-                    # 제어문자 제거
-                    text = re.sub(r"[\x00-\x1F]+", '', text)
-                    for line in text.splitlines():
-                        md_lines.append(line.rstrip())
-                i += 4 + rec_len
-
-        # 중복 빈 줄 축소
-        cleaned, prev_blank = [], False
-        for line in md_lines:
-            if not line.strip():
-                if not prev_blank:
-                    cleaned.append('')
-                prev_blank = True
+                start = i + 4
+                if rec_len == _EXTENDED_SIZE:
+                    if start + 4 > size:
+                        break
+                    rec_len = struct.unpack_from('<I', data, start)[0]
+                    start += 4
+                end = start + rec_len
+                if end > size:
+                    needed = end - i
+                    break
+                records.append((rec_type, rec_level, view[start:end]))
+                i = end
+            if i < size:
+                pending = [bytes(view[i:])]
+                pending_size = size - i
             else:
-                cleaned.append(line)
-                prev_blank = False
-        markdown = '\n'.join(cleaned).strip() + '\n'
-        # 표 변환 적용
-        return convert_tables(markdown)
-
-def convert_tables(md: str) -> str:
-    """탭 구분 또는 공백 구분된 블록을 Markdown 테이블로 변환"""
-    """탭 구분 또는 공백 구분된 블록을 Markdown 테이블로 변환"""
-    lines = md.splitlines()
-    out_lines: List[str] = []
-    i = 0
-    while i < len(lines):
-        # 연속된 표 블록 감지 (탭 또는 2개 이상의 연속된 스페이스)
-        if '\t' in lines[i] or re.search(r' {2,}', lines[i]):
-            # 블록 수집
-            block = []
-            while i < len(lines) and ('\t' in lines[i] or re.search(r' {2,}', lines[i])):
-                # 셀 구분: 우선 탭 스플릿, 없으면 두 칸 이상 스페이스
-                if '\t' in lines[i]:
-                    cells = [c.strip() for c in lines[i].split('\t')]
-                else:
-                    cells = [c.strip() for c in re.split(r' {2,}', lines[i])]
-                block.append(cells)
-                i += 1
-            # 최대 컬럼 수
-            max_cols = max(len(row) for row in block)
-            # 패딩
-            for row in block:
-                row += [''] * (max_cols - len(row))
-            # Markdown 테이블 생성
-            # 헤더로 첫 행 사용
-            header = block[0]
-            out_lines.append('| ' + ' | '.join(header) + ' |')
-            out_lines.append('| ' + ' | '.join(['---'] * max_cols) + ' |')
-            for row in block[1:]:
-                out_lines.append('| ' + ' | '.join(row) + ' |')
-            out_lines.append('')
+                pending = []
+                pending_size = 0
+        if records:
+            yield records
+    # 스트림 끝에 남은 조각은 완전한 레코드가 아니므로 버림
+
+def _paragraph_lines(payload: memoryview) -> List[str]:
+    """PARA_TEXT 레코드 내용을 컨트롤을 뺀 줄 목록으로 변환"""
+    try:
+        text = str(payload, 'utf-16-le')
+    except UnicodeDecodeError:
+        # 컨트롤 정보 글자에 짝이 없는 서로게이트가 있으면 글자 수를 유지한 채 읽고 나중에 제거
+        text = str(payload[:len(payload) // 2 * 2], 'utf-16-le', 'surrogatepass')
+        text = _LONE_SURROGATES.sub('', _INLINE_CONTROLS.sub(_inline_control_text, text))
+    else:
+        text = _INLINE_CONTROLS.sub(_inline_control_text, text)
+    text = text.translate(_CHAR_CONTROLS)
+    return [line.rstrip() for line in text.splitlines()]
+
+def _inline_control_text(match) -> str:
+    return '\t' if match.group(1) == '\t' else ''
+
+class _TableBuilder:
+    """표 컨트롤 하나의 셀 내용을 모아 Markdown 테이블로 만듦
+
+    TABLE 레코드에서 행/열 수를, 셀마다 오는 LIST_HEADER 레코드에서 셀 주소(열, 행)를 읽고,
+    그 뒤의 문단 텍스트를 해당 셀에 넣는다. 병합된 셀은 왼쪽 위 칸에만 내용을 쓴다.
+    TABLE 레코드보다 앞에 오는 LIST_HEADER는 표 캡션이다.
+    """
+
+    def __init__(self, level: int):
+        self.level = level  # 표 CTRL_HEADER 레코드의 레벨 - 이 레벨 이하 레코드가 오면 표가 끝남
+        self.rows = 0
+        self.cols = 0
+        self.sized = False  # TABLE 레코드를 읽었는지
+        self.caption: List[str] = []
+        self.cells: Dict[Tuple[int, int], List[str]] = {}
+        self.current: Optional[List[str]] = None
+        self._cell_count = 0
+
+    def set_size(self, payload: memoryview) -> None:
+        """TABLE 레코드 - 속성(UINT32), 행 수(UINT16), 열 수(UINT16) ..."""
+        self.sized = True
+        if len(payload) >= 8:
+            self.rows, self.cols = struct.unpack_from('<HH', payload, 4)
+
+    def start_list(self, payload: memoryview) -> None:
+        """LIST_HEADER 레코드 - TABLE 레코드 전이면 캡션, 뒤면 셀 시작"""
+        if self.sized:
+            self.start_cell(payload)
         else:
-            out_lines.append(lines[i])
-            i += 1
-    return '\n'.join(out_lines) + '\n'
\ No newline at end of file
+            self.current = self.caption
+
+    def start_cell(self, payload: memoryview) -> None:
+        """셀 LIST_HEADER 레코드 - 문단 수, 속성 (8바이트) 뒤에 열 주소(UINT16), 행 주소(UINT16) ..."""
+        if len(payload) >= 12:
+            col, row = struct.unpack_from('<HH', payload, 8)
+        else:
+            # 셀 주소가 없으면 저장 순서(행 우선)대로 배치
+            row, col = divmod(self._cell_count, self.cols or 1)
+        self._cell_count += 1
+        self.current = self.cells.setdefault((row, col), [])
+
+    def add_lines(self, lines: List[str]) -> None:
+        if self.current is not None:
+            self.current.extend(line.strip() for line in lines if line.strip())
+
+    def cell_texts(self) -> List[str]:
+        """셀 내용을 셀마다 한 줄로 (주소 순서)"""
+        return [' '.join(' '.join(self.cells[key]).split()) for key in sorted(self.cells) if self.cells[key]]
+
+    def to_markdown(self) -> List[str]:
+        """첫 행을 헤더로 하는 Markdown 테이블 줄 목록 (셀이 없으면 빈 목록)"""
+        if not self.cells:
+            return []
+        rows = max(self.rows, max(row for row, _ in self.cells) + 1)
+        cols = max(self.cols, max(col for _, col in self.cells) + 1)
+        grid = [[''] * cols for _ in range(rows)]
+        for (row, col), lines in self.cells.items():
+            grid[row][col] = ' '.join(' '.join(lines).split()).replace('|', '\\|')
+        lines = ['| ' + ' | '.join(grid[0]) + ' |', '| ' + ' | '.join(['---'] * cols) + ' |']
+        lines.extend('| ' + ' | '.join(row) + ' |' for row in grid[1:])
+        return lines
+
+class _SectionParser:
+    """섹션 하나의 레코드를 차례로 받아 문단 줄과 표를 Markdown 줄로 바꿈
+
+    표 컨트롤(CTRL_HEADER 'tbl ') 아래 레코드는 표가 끝날 때(같거나 낮은 레벨의 레코드)까지
+    셀별로 모았다가 앞뒤에 빈 줄을 둔 테이블로 내보낸다. 셀 안의 표는 바깥 셀의 텍스트로 넣는다.
+    """
+
+    def __init__(self):
+        self.tables: List[_TableBuilder] = []  # 열려 있는 표 (안쪽 표가 마지막)
+
+    def feed(self, records: List[Tuple[int, int, memoryview]]) -> List[str]:
+        out: List[str] = []
+        for tag, level, payload in records:
+            while self.tables and level <= self.tables[-1].level:
+                self._close_table(out)
+            if tag == HWPTAG_CTRL_HEADER and payload[:4] == _TABLE_CTRL_ID:
+                self.tables.append(_TableBuilder(level))
+            elif not self.tables:
+                if tag == HWPTAG_PARA_TEXT:
+                    out.extend(_paragraph_lines(payload))
+            else:
+                table = self.tables[-1]
+                if tag == HWPTAG_PARA_TEXT:
+                    table.add_lines(_paragraph_lines(payload))
+                elif level == table.level + 1:
+                    if tag == HWPTAG_TABLE:
+                        table.set_size(payload)
+                    elif tag == HWPTAG_LIST_HEADER:
+                        table.start_list(payload)
+        return out
+
+    def finish(self) -> List[str]:
+        """섹션 끝에서 열려 있는 표를 닫음"""
+        out: List[str] = []
+        while self.tables:
+            self._close_table(out)
+        return out
+
+    def _close_table(self, out: List[str]) -> None:
+        table = self.tables.pop()
+        if self.tables:
+            self.tables[-1].add_lines(table.caption + table.cell_texts())
+            return
+        out.extend(table.caption)
+        markdown = table.to_markdown()
+        if markdown:
+            out.append('')
+            out.extend(markdown)
+            out.append('')
+
+class _MarkdownWriter:
+    """줄을 받아 중복 빈 줄 축소와 문서 앞뒤 빈 줄/공백 제거를 한 번에 처리"""
+
+    def __init__(self):
+        self.started = False  # 첫 내용 줄을 내보냈는지 (문서 앞 빈 줄/공백 제거)
+        self.pending_blank = False  # 다음 내용 줄 앞에 빈 줄 하나를 넣을지 (문서 끝 빈 줄은 버림)
+
+    def feed(self, line: str, out: List[str]) -> None:
+        if not line.strip():
+            self.pending_blank = self.started
+            return
+        if not self.started:
+            line = line.lstrip()
+            self.started = True
+        if self.pending_blank:
+            out.append('')
+            self.pending_blank = False
+        out.append(line)
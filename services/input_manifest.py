@@ -0,0 +1,141 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Callable
+
+from services.conversion_cache import hash_file
+
+logger = logging.getLogger(__name__)
+
+_ENTRY_COLUMNS = ('filename', 'size', 'mtime_ns', 'content_hash', 'output_path', 'converted_at')
+
+
+class InputManifest:
+    """입력 폴더 파일별 크기, mtime, 내용 해시와 변환해서 만든 출력 파일 기록
+
+    convert-all이 새 파일과 바뀐 파일만 변환하고, 지워진 입력의 출력 파일을 정리하는 데 쓴다.
+    크기와 mtime이 같으면 해시를 다시 계산하지 않으므로 대부분 그대로인 폴더는 stat만으로 끝난다.
+    """
+
+    def __init__(self, db_path: str, input_folder: str,
+                 content_hash: Optional[Callable[[str], str]] = None):
+        self.db_path = db_path
+        self.input_folder = os.path.abspath(input_folder)
+        self.content_hash = content_hash or hash_file  # 변환 캐시의 해시 메모를 넘기면 같은 파일을 다시 읽지 않음
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS inputs ('
+                ' filename TEXT PRIMARY KEY,'
+                ' size INTEGER NOT NULL,'
+                ' mtime_ns INTEGER NOT NULL,'
+                ' content_hash TEXT NOT NULL,'
+                ' output_path TEXT NOT NULL,'
+                ' converted_at REAL NOT NULL)'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환"""
+        conn = getattr(self._local, 'conn', None)
+        # fork로 물려받은 부모 프로세스의 연결은 쓰지 않고 새로 연결 (gunicorn preload)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def filename_of(self, file_path: str) -> Optional[str]:
+        """입력 폴더 안의 파일이면 폴더 기준 이름, 아니면 None (업로드 임시 파일 등은 기록하지 않음)"""
+        abs_path = os.path.abspath(file_path)
+        if os.path.dirname(abs_path) != self.input_folder:
+            return None
+        return os.path.basename(abs_path)
+
+    def record(self, file_path: str, output_path: str, st: os.stat_result, content_hash: str) -> None:
+        """변환에 성공한 입력 기록 - st와 content_hash는 변환을 시작할 때의 값을 넘김
+
+        (변환 중에 파일이 바뀌면 다음 convert-all에서 바뀐 파일로 다시 변환되도록)
+        """
+        filename = self.filename_of(file_path)
+        if filename is None:
+            return
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'INSERT OR REPLACE INTO inputs (filename, size, mtime_ns, content_hash, output_path, converted_at) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (filename, st.st_size, st.st_mtime_ns, content_hash, os.path.abspath(output_path), time.time())
+            )
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        rows = self._connect().execute(f'SELECT {", ".join(_ENTRY_COLUMNS)} FROM inputs').fetchall()
+        return {row[0]: dict(zip(_ENTRY_COLUMNS, row)) for row in rows}
+
+    def remove(self, filenames: List[str]) -> None:
+        conn = self._connect()
+        with conn:
+            conn.executemany('DELETE FROM inputs WHERE filename = ?', [(name,) for name in filenames])
+
+    def plan(self, filenames: List[str], update: bool = False, check_deleted: bool = True) -> Dict[str, Any]:
+        """입력 파일 목록을 기록과 비교하여 변환 계획 반환
+
+        new: 기록이 없는 파일, changed: 내용이 바뀌었거나 출력 파일이 없어진 파일,
+        unchanged: 그대로인 파일, deleted: 기록은 있지만 입력 폴더에서 지워진 파일,
+        orphaned_outputs: deleted 파일이 만들었고 다른 입력이 쓰지 않는 출력 파일.
+        update이면 내용은 같고 mtime만 바뀐 파일의 기록을 갱신하여 다음에는 해시를 건너뛴다.
+        filenames가 폴더 전체가 아니면(입력 폴더 감시) check_deleted=False로 삭제 확인을 건너뛴다.
+        """
+        recorded = self.entries()
+        new, changed, unchanged, touched = [], [], [], []
+        for filename in filenames:
+            entry = recorded.get(filename)
+            if entry is None:
+                new.append(filename)
+                continue
+            file_path = os.path.join(self.input_folder, filename)
+            try:
+                st = os.stat(file_path)
+            except OSError:
+                continue
+            if not os.path.exists(entry['output_path']):
+                changed.append(filename)
+            elif (st.st_size, st.st_mtime_ns) == (entry['size'], entry['mtime_ns']):
+                unchanged.append(filename)
+            elif st.st_size == entry['size'] and self.content_hash(file_path) == entry['content_hash']:
+                # 복사/touch로 mtime만 바뀐 경우
+                unchanged.append(filename)
+                touched.append((st.st_mtime_ns, filename))
+            else:
+                changed.append(filename)
+
+        current = set(filenames)
+        deleted = sorted(name for name in recorded if name not in current) if check_deleted else []
+        # 남아 있는 입력이 쓰는 출력 파일은 지우지 않음 (a.pdf와 a.docx가 같은 a.md를 만드는 경우)
+        kept_outputs = {recorded[name]['output_path'] for name in recorded if name in current}
+        kept_stems = {os.path.splitext(name)[0] for name in current}
+        orphaned_outputs = sorted({
+            recorded[name]['output_path'] for name in deleted
+            if recorded[name]['output_path'] not in kept_outputs
+            and os.path.splitext(os.path.basename(recorded[name]['output_path']))[0] not in kept_stems
+            and os.path.exists(recorded[name]['output_path'])
+        })
+
+        if update and touched:
+            conn = self._connect()
+            with conn:
+                conn.executemany('UPDATE inputs SET mtime_ns = ? WHERE filename = ?', touched)
+
+        return {
+            'new': new,
+            'changed': changed,
+            'unchanged': unchanged,
+            'deleted': deleted,
+            'orphaned_outputs': orphaned_outputs,
+        }
@@ -0,0 +1,208 @@
+import os
+import time
+import logging
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from inotify_simple import INotify, flags as inotify_flags
+except ImportError:  # inotify_simple이 없거나 Linux가 아니면 scandir 폴링 사용
+    INotify = None
+    inotify_flags = None
+
+try:
+    import fcntl
+except ImportError:  # Windows - 잠금 없이 항상 감시
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# 다른 프로그램이 쓰는 중인 임시 파일 (복사 도구, 브라우저 다운로드, 편집기 백업 등)
+_TEMP_SUFFIXES = ('.tmp', '.part', '.crdownload', '.swp', '~')
+
+
+class InputWatcher:
+    """입력 폴더를 감시하여 새 파일/바뀐 파일을 on_ready 콜백으로 넘기는 백그라운드 서비스
+
+    inotify_simple이 있으면 inotify 이벤트로, 없으면 os.scandir로 stat만 비교하여 변경을 찾는다.
+    파일 크기와 mtime이 debounce_seconds 동안 바뀌지 않아야 다 쓴 파일로 보고 넘기므로
+    복사 중인 파일을 변환하지 않는다. gunicorn 워커 여럿이 시작해도 잠금 파일을 가진
+    한 프로세스만 감시하며, 그 프로세스가 종료되면 다른 프로세스가 이어받는다.
+    감지부터 콜백까지는 최대 poll_seconds + debounce_seconds 정도 걸린다.
+    """
+
+    # inotify 이벤트를 놓친 경우(큐 넘침 등)를 대비한 전체 재확인 주기(초)
+    RESCAN_SECONDS = 300.0
+
+    def __init__(self, input_folder: str, allowed_extensions: Iterable[str],
+                 on_ready: Callable[[List[str]], None], lock_path: Optional[str] = None,
+                 debounce_seconds: float = 2.0, poll_seconds: float = 2.0, use_inotify: bool = True):
+        self.input_folder = os.path.abspath(input_folder)
+        self.allowed_extensions = {ext.lower() for ext in allowed_extensions}
+        self.on_ready = on_ready
+        self.lock_path = lock_path
+        self.debounce_seconds = debounce_seconds
+        self.poll_seconds = poll_seconds
+        self.use_inotify = use_inotify and INotify is not None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._thread_pid: Optional[int] = None
+        self._lock_file = None
+        # 파일명 -> ((크기, mtime), 마지막으로 바뀐 시각, 처음 감지한 시각)
+        self._pending: Dict[str, Tuple[Tuple[int, int], float, float]] = {}
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+
+    # ------------------------------------------------------------------
+    # 시작/종료
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        """감시 스레드 시작 (프로세스마다 한 번, fork 이후 호출되면 새로 시작)"""
+        if self._thread_pid == os.getpid():
+            return
+        self._thread_pid = os.getpid()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self.run, name='input-watcher')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def run(self) -> None:
+        """현재 스레드에서 감시 (잠금을 얻을 때까지 대기 후 stop()까지 계속)"""
+        while not self._stop.is_set():
+            if self._acquire_leadership():
+                break
+            # 다른 프로세스가 감시 중 - 그 프로세스가 종료되면 이어받음
+            self._stop.wait(self.poll_seconds * 5)
+        if self._stop.is_set():
+            return
+
+        mode = 'inotify' if self.use_inotify else 'scandir 폴링'
+        logger.info(f"입력 폴더 감시 시작 ({mode}, pid={os.getpid()}): {self.input_folder}")
+        try:
+            if self.use_inotify:
+                self._run_inotify()
+            else:
+                self._run_polling()
+        except Exception as e:
+            logger.error(f"입력 폴더 감시 중 오류 발생: {str(e)}", exc_info=True)
+        finally:
+            self._release_leadership()
+
+    def _acquire_leadership(self) -> bool:
+        if self.lock_path is None or fcntl is None:
+            return True
+        lock_file = open(self.lock_path, 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _release_leadership(self) -> None:
+        if self._lock_file is not None:
+            self._lock_file.close()  # 닫으면 flock도 해제됨
+            self._lock_file = None
+
+    # ------------------------------------------------------------------
+    # 변경 감지
+    # ------------------------------------------------------------------
+    def _run_polling(self) -> None:
+        while not self._stop.is_set():
+            self._scan()
+            self._flush_ready()
+            self._stop.wait(self.poll_seconds)
+
+    def _run_inotify(self) -> None:
+        inotify = INotify()
+        try:
+            watch_flags = (inotify_flags.CLOSE_WRITE | inotify_flags.MOVED_TO
+                           | inotify_flags.CREATE | inotify_flags.MODIFY)
+            inotify.add_watch(self.input_folder, watch_flags)
+            # 감시 시작 전에 들어온 파일도 처리
+            self._scan()
+            last_rescan = time.time()
+            while not self._stop.is_set():
+                # 확인할 파일이 있으면 디바운스 간격으로 깨어나고, 없으면 이벤트가 올 때까지 대기
+                timeout = self.poll_seconds if self._pending else self.RESCAN_SECONDS
+                for event in inotify.read(timeout=int(timeout * 1000)):
+                    if event.name and self._is_candidate(event.name):
+                        self._mark(event.name)
+                if time.time() - last_rescan >= self.RESCAN_SECONDS:
+                    self._scan()
+                    last_rescan = time.time()
+                self._flush_ready()
+        finally:
+            inotify.close()
+
+    def _scan(self) -> None:
+        """폴더의 stat을 이전 목록과 비교하여 새 파일/바뀐 파일을 확인 대상으로 표시"""
+        snapshot = {}
+        try:
+            with os.scandir(self.input_folder) as entries:
+                for entry in entries:
+                    if not self._is_candidate(entry.name):
+                        continue
+                    try:
+                        if not entry.is_file():
+                            continue
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.name] = (st.st_size, st.st_mtime_ns)
+        except FileNotFoundError:
+            return
+        for name, key in snapshot.items():
+            if self._snapshot.get(name) != key:
+                self._mark(name, key)
+        self._snapshot = snapshot
+
+    def _is_candidate(self, name: str) -> bool:
+        if name.startswith('.') or name.endswith(_TEMP_SUFFIXES):
+            return False
+        return os.path.splitext(name)[1][1:].lower() in self.allowed_extensions
+
+    def _mark(self, name: str, key: Optional[Tuple[int, int]] = None) -> None:
+        now = time.time()
+        pending = self._pending.get(name)
+        if pending is None:
+            self._pending[name] = (key or (-1, -1), now, now)
+        else:
+            self._pending[name] = (key or pending[0], now, pending[2])
+
+    def _flush_ready(self) -> None:
+        """크기/mtime이 debounce_seconds 동안 그대로인 파일을 on_ready로 넘김"""
+        if not self._pending:
+            return
+        now = time.time()
+        ready: List[str] = []
+        gone: Set[str] = set()
+        oldest_detected = now
+        for name, (key, changed_at, detected_at) in list(self._pending.items()):
+            try:
+                st = os.stat(os.path.join(self.input_folder, name))
+            except FileNotFoundError:
+                gone.add(name)
+                continue
+            current = (st.st_size, st.st_mtime_ns)
+            if current != key:
+                # 아직 쓰는 중 - 디바운스 다시 시작
+                self._pending[name] = (current, now, detected_at)
+            elif now - changed_at >= self.debounce_seconds:
+                ready.append(name)
+                oldest_detected = min(oldest_detected, detected_at)
+                self._snapshot[name] = current
+        for name in gone | set(ready):
+            del self._pending[name]
+        if not ready:
+            return
+
+        try:
+            self.on_ready(sorted(ready))
+        except Exception as e:
+            logger.error(f"입력 파일 처리 요청 중 오류 발생: {str(e)}", exc_info=True)
+            return
+        logger.info(f"입력 파일 {len(ready)}개 처리 요청 (감지 후 최대 {time.time() - oldest_detected:.1f}초)")
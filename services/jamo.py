@@ -0,0 +1,113 @@
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+# 한글 음절(U+AC00~U+D7A3) 분해용 자모 표 - 겹모음/겹받침은 두벌식 자판에서 누르는
+# 순서대로 나누어, 자판에서 한 번 잘못 누른 오타가 편집 거리 1이 되도록 함
+_CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+_JUNGSEONG = [
+    'ㅏ', 'ㅐ', 'ㅑ', 'ㅒ', 'ㅓ', 'ㅔ', 'ㅕ', 'ㅖ', 'ㅗ', 'ㅗㅏ', 'ㅗㅐ', 'ㅗㅣ', 'ㅛ', 'ㅜ',
+    'ㅜㅓ', 'ㅜㅔ', 'ㅜㅣ', 'ㅠ', 'ㅡ', 'ㅡㅣ', 'ㅣ'
+]
+_JONGSEONG = [
+    '', 'ㄱ', 'ㄲ', 'ㄱㅅ', 'ㄴ', 'ㄴㅈ', 'ㄴㅎ', 'ㄷ', 'ㄹ', 'ㄹㄱ', 'ㄹㅁ', 'ㄹㅂ', 'ㄹㅅ', 'ㄹㅌ',
+    'ㄹㅍ', 'ㄹㅎ', 'ㅁ', 'ㅂ', 'ㅂㅅ', 'ㅅ', 'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ'
+]
+_HANGUL_BASE = 0xAC00
+_HANGUL_LAST = 0xD7A3
+
+# 자모 문자열 n-gram 길이와 단어 시작 표시 문자
+JAMO_NGRAM_SIZE = 3
+JAMO_PAD = '\x01'
+
+
+@lru_cache(maxsize=65536)
+def decompose(text: str) -> str:
+    """한글 음절을 자모로 분해 (한글이 아닌 글자는 그대로 유지)
+
+    예: '계약' -> 'ㄱㅖㅇㅑㄱ', '과' -> 'ㄱㅗㅏ'
+    """
+    result = []
+    for ch in text:
+        code = ord(ch)
+        if _HANGUL_BASE <= code <= _HANGUL_LAST:
+            index = code - _HANGUL_BASE
+            result.append(_CHOSEONG[index // 588])
+            result.append(_JUNGSEONG[(index % 588) // 28])
+            result.append(_JONGSEONG[index % 28])
+        else:
+            result.append(ch)
+    return ''.join(result)
+
+
+def max_edit_distance(jamo_length: int) -> int:
+    """검색어 자모 길이에 따른 허용 편집 거리 - 짧은 검색어는 오타 허용 시 후보가 너무 많아짐"""
+    if jamo_length < 4:
+        return 0
+    if jamo_length < 9:
+        return 1
+    return 2
+
+
+def jamo_ngrams(jamo: str, pad_end: bool = True) -> List[str]:
+    """자모 문자열의 trigram 목록 (단어 시작을 표시 문자로 채움)
+
+    색인 단어는 끝까지 채워 모든 자모가 trigram에 포함되게 하고, 검색어는
+    단어 앞부분 일치(접두사)를 찾기 위해 끝을 채우지 않는다.
+    """
+    padded = JAMO_PAD + jamo + (JAMO_PAD if pad_end else '')
+    if len(padded) < JAMO_NGRAM_SIZE:
+        return [padded]
+    grams = []
+    for i in range(len(padded) - JAMO_NGRAM_SIZE + 1):
+        gram = padded[i:i + JAMO_NGRAM_SIZE]
+        if gram not in grams:
+            grams.append(gram)
+    return grams
+
+
+def min_shared_ngrams(query_grams: int, max_distance: int) -> int:
+    """후보 단어가 최소한 공유해야 하는 trigram 수
+
+    삽입/삭제/치환 한 번은 최대 n개, 이웃한 글자 교환은 최대 n+1개의 n-gram을 바꾼다.
+    """
+    return max(1, query_grams - (JAMO_NGRAM_SIZE + 1) * max_distance)
+
+
+def prefix_edit_distance(query: str, target: str, max_distance: int) -> Optional[int]:
+    """query와 target의 앞부분 사이의 최소 편집 거리 (max_distance를 넘으면 None)
+
+    한국어 단어에는 조사/어미가 붙으므로('계약서를') 단어 전체가 아니라 앞부분과 비교한다.
+    이웃한 두 글자가 뒤바뀐 오타('contarct')도 편집 한 번으로 센다.
+    행의 최솟값이 max_distance를 넘으면 이후 값도 줄어들 수 없으므로 즉시 중단한다.
+    """
+    if len(target) < len(query) - max_distance:
+        return None
+    before_previous: Optional[List[int]] = None
+    previous = list(range(len(query) + 1))
+    best = previous[-1]
+    for j, ch in enumerate(target, 1):
+        current = [j]
+        for i, qc in enumerate(query, 1):
+            cost = min(previous[i] + 1, current[i - 1] + 1, previous[i - 1] + (qc != ch))
+            if (before_previous is not None and i > 1 and qc == target[j - 2]
+                    and query[i - 2] == ch):
+                cost = min(cost, before_previous[i - 2] + 1)
+            current.append(cost)
+        best = min(best, current[-1])
+        if min(current) > max_distance and min(previous) > max_distance:
+            break
+        before_previous, previous = previous, current
+    return best if best <= max_distance else None
+
+
+def fuzzy_matches(token: str, terms: Iterable[str], max_distance: Optional[int] = None) -> Dict[str, int]:
+    """terms 중 token과 자모 편집 거리 max_distance 이내로 앞부분이 일치하는 단어 {단어: 거리}"""
+    query = decompose(token.lower())
+    if max_distance is None:
+        max_distance = max_edit_distance(len(query))
+    matches = {}
+    for term in terms:
+        distance = prefix_edit_distance(query, decompose(term), max_distance)
+        if distance is not None:
+            matches[term] = distance
+    return matches
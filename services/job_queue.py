@@ -0,0 +1,398 @@
+import os
+import time
+import uuid
+import socket
+import sqlite3
+import logging
+import threading
+from typing import Dict, Any, Optional, List, Sequence
+
+logger = logging.getLogger(__name__)
+
+# 작업 상태
+STATUS_PENDING = 'pending'
+STATUS_PROCESSING = 'processing'
+STATUS_COMPLETED = 'completed'
+STATUS_FAILED = 'failed'
+STATUS_CANCELLED = 'cancelled'
+# 더 이상 바뀌지 않는 상태
+FINISHED_STATUSES = (STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED)
+
+_JOB_COLUMNS = (
+    'id', 'file_path', 'status', 'cache_key', 'result_path', 'error', 'worker', 'attempts',
+    'created_at', 'started_at', 'finished_at', 'heartbeat_at', 'pages_done', 'pages_total', 'batch_id', 'priority',
+    'cancel_requested'
+)
+
+
+def worker_id() -> str:
+    """작업을 가져간 프로세스 식별자 (호스트:pid)"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """SQLite 파일에 저장되는 변환 작업 큐
+
+    gunicorn 워커나 별도 변환 프로세스 모두 같은 파일을 열어 작업을 넣고(enqueue),
+    가져가고(claim), 완료/실패를 기록한다. 재시작해도 작업 상태가 유지된다.
+
+    claim은 우선순위(services/scheduling.py의 job_priority, 작을수록 먼저)가 가장 낮은 작업을
+    가져가되, aging_seconds를 기다릴 때마다 우선순위를 1씩 낮추고(오래 기다린 큰 작업도 결국 처리),
+    같은 배치에서 이미 처리 중인 작업 하나마다 batch_penalty를 더해 여러 배치가 번갈아 처리되게 한다.
+    처리하던 워커가 죽어 중단된 작업은 max_attempts번까지만 다시 시도한다.
+    """
+
+    # claim에서 실효 우선순위를 계산할 후보 수 (배치 없는 작업 중 앞선 작업, 가장 오래 기다린 작업 각각)
+    CLAIM_CANDIDATES = 32
+
+    def __init__(self, db_path: str, aging_seconds: float = 60.0, batch_penalty: float = 1.0,
+                 max_attempts: int = 3):
+        self.db_path = db_path
+        self.aging_seconds = aging_seconds
+        self.batch_penalty = batch_penalty
+        self.max_attempts = max_attempts  # 중단된 작업을 실패로 기록하기 전까지 가져갈 수 있는 횟수
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        conn = self._connect()
+        conn.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            ' id TEXT PRIMARY KEY,'
+            ' file_path TEXT NOT NULL,'
+            ' status TEXT NOT NULL,'
+            ' cache_key TEXT,'
+            ' result_path TEXT,'
+            ' error TEXT,'
+            ' worker TEXT,'
+            ' attempts INTEGER NOT NULL DEFAULT 0,'
+            ' created_at REAL NOT NULL,'
+            ' started_at REAL,'
+            ' finished_at REAL,'
+            ' heartbeat_at REAL,'
+            ' pages_done INTEGER,'
+            ' pages_total INTEGER,'
+            ' batch_id TEXT,'
+            ' priority INTEGER NOT NULL DEFAULT 0,'
+            ' cancel_requested INTEGER NOT NULL DEFAULT 0)'
+        )
+        # 이전 버전에서 만든 작업 큐에는 진행 상황 열이 없으므로 추가
+        columns = {row[1] for row in conn.execute('PRAGMA table_info(jobs)')}
+        for column, column_type in (('pages_done', 'INTEGER'), ('pages_total', 'INTEGER'), ('batch_id', 'TEXT'),
+                                    ('priority', 'INTEGER NOT NULL DEFAULT 0'),
+                                    ('cancel_requested', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                conn.execute(f'ALTER TABLE jobs ADD COLUMN {column} {column_type}')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch_id)')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS jobs_claim ON jobs (status, batch_id, priority, created_at)')
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환 (트랜잭션은 직접 BEGIN/COMMIT)"""
+        conn = getattr(self._local, 'conn', None)
+        # fork로 물려받은 부모 프로세스의 연결은 쓰지 않고 새로 연결 (gunicorn preload)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def enqueue(self, file_path: str, cache_key: Optional[str] = None, batch_id: Optional[str] = None,
+                priority: int = 0) -> str:
+        """변환 작업 추가 후 작업 ID 반환"""
+        task_id = f"task_{int(time.time())}_{uuid.uuid4().hex[:8]}"
+        self._connect().execute(
+            'INSERT INTO jobs (id, file_path, status, cache_key, batch_id, created_at, priority) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (task_id, file_path, STATUS_PENDING, cache_key, batch_id, time.time(), priority)
+        )
+        return task_id
+
+    def enqueue_batch(self, file_paths: List[str], batch_id: str, priorities: Optional[List[int]] = None) -> List[str]:
+        """여러 변환 작업을 한 트랜잭션으로 추가, 작업 ID 목록 반환 (우선순위가 같으면 목록 순서대로 처리됨)"""
+        now = time.time()
+        task_ids = [f"task_{int(now)}_{uuid.uuid4().hex[:8]}" for _ in file_paths]
+        if priorities is None:
+            priorities = [0] * len(file_paths)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.executemany(
+                'INSERT INTO jobs (id, file_path, status, batch_id, created_at, priority) VALUES (?, ?, ?, ?, ?, ?)',
+                # 같은 시각에 넣은 작업도 목록 순서대로 가져가도록 created_at을 조금씩 늘림
+                [(task_id, file_path, STATUS_PENDING, batch_id, now + i * 1e-6, priority)
+                 for i, (task_id, file_path, priority) in enumerate(zip(task_ids, file_paths, priorities))]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return task_ids
+
+    def claim(self, worker: Optional[str] = None, exclude: Sequence[str] = ()) -> Optional[Dict[str, Any]]:
+        """실효 우선순위가 가장 높은 대기 작업 하나를 처리 중으로 바꾸고 반환 (없으면 None)
+
+        exclude의 작업(예: 메모리 예산에 들지 않아 방금 되돌린 작업)은 건너뛴다.
+
+        실효 우선순위 = priority - 기다린 시간 / aging_seconds + 같은 배치의 처리 중 작업 수 * batch_penalty
+        (값이 같으면 먼저 넣은 작업). 대기 작업 전체가 아니라 _claim_candidates가 색인으로 고른 후보만
+        계산한다. BEGIN IMMEDIATE로 쓰기 잠금을 먼저 잡으므로 여러 프로세스가 동시에 호출해도
+        같은 작업을 두 번 가져가지 않는다.
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            running = dict(conn.execute(
+                'SELECT batch_id, COUNT(*) FROM jobs WHERE status = ? AND batch_id IS NOT NULL GROUP BY batch_id',
+                (STATUS_PROCESSING,)
+            ))
+            best = None
+            for task_id, priority, created_at, batch_id in self._claim_candidates(conn, exclude):
+                rank = (priority - (now - created_at) / self.aging_seconds
+                        + running.get(batch_id, 0) * self.batch_penalty, created_at)
+                if best is None or rank < best[0]:
+                    best = (rank, task_id)
+            if best is None:
+                conn.execute('COMMIT')
+                return None
+            task_id = best[1]
+            conn.execute(
+                'UPDATE jobs SET status = ?, worker = ?, attempts = attempts + 1, started_at = ?, heartbeat_at = ? '
+                'WHERE id = ?',
+                (STATUS_PROCESSING, worker or worker_id(), now, now, task_id)
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return self.get(task_id)
+
+    def _claim_candidates(self, conn: sqlite3.Connection, exclude: Sequence[str]) -> List[tuple]:
+        """실효 우선순위를 계산할 대기 작업 후보 (id, priority, created_at, batch_id) - 모두 색인으로 찾음
+
+        배치 작업은 한 번에 넣어 기다린 시간이 같으므로 배치마다 (priority, created_at) 순으로 첫 작업이면
+        충분하다. 배치 없는 작업은 그 순서로 앞선 CLAIM_CANDIDATES개를, 여기에 전체에서 가장 오래 기다린
+        CLAIM_CANDIDATES개를 더해 오래 기다린 작업도 aging으로 결국 선택되게 한다.
+        """
+        excluded = f" AND id NOT IN ({', '.join('?' * len(exclude))})" if exclude else ''
+        columns = 'id, priority, created_at, batch_id'
+        # 대기 작업이 있는 배치를 색인에서 건너뛰며 찾고(skip-scan) 배치마다 첫 작업 하나
+        rows = conn.execute(
+            'WITH RECURSIVE batches(batch_id) AS ('
+            ' SELECT MIN(batch_id) FROM jobs WHERE status = ? AND batch_id IS NOT NULL'
+            ' UNION ALL'
+            ' SELECT (SELECT MIN(batch_id) FROM jobs WHERE status = ? AND batch_id > batches.batch_id)'
+            ' FROM batches WHERE batch_id IS NOT NULL) '
+            f'SELECT {columns} FROM jobs WHERE id IN ('
+            ' SELECT (SELECT id FROM jobs'
+            f'         WHERE status = ? AND batch_id = batches.batch_id{excluded}'
+            '         ORDER BY priority, created_at LIMIT 1)'
+            ' FROM batches WHERE batch_id IS NOT NULL)',
+            (STATUS_PENDING, STATUS_PENDING, STATUS_PENDING, *exclude)
+        ).fetchall()
+        rows += conn.execute(
+            f'SELECT {columns} FROM jobs WHERE status = ? AND batch_id IS NULL{excluded} '
+            'ORDER BY priority, created_at LIMIT ?',
+            (STATUS_PENDING, *exclude, self.CLAIM_CANDIDATES)
+        ).fetchall()
+        rows += conn.execute(
+            f'SELECT {columns} FROM jobs WHERE status = ?{excluded} ORDER BY created_at LIMIT ?',
+            (STATUS_PENDING, *exclude, self.CLAIM_CANDIDATES)
+        ).fetchall()
+        return rows
+
+    def release(self, task_id: str) -> None:
+        """가져간 작업을 시작하지 않고 대기 상태로 되돌림 (시도 횟수에도 세지 않음)"""
+        self._connect().execute(
+            'UPDATE jobs SET status = ?, worker = NULL, started_at = NULL, attempts = attempts - 1 '
+            'WHERE id = ? AND status = ?',
+            (STATUS_PENDING, task_id, STATUS_PROCESSING)
+        )
+
+    def heartbeat(self, task_ids: List[str]) -> None:
+        """처리 중인 작업들이 살아 있음을 기록 (오래 갱신되지 않으면 requeue_stale 대상)"""
+        now = time.time()
+        conn = self._connect()
+        conn.execute('BEGIN')
+        try:
+            conn.executemany(
+                'UPDATE jobs SET heartbeat_at = ? WHERE id = ? AND status = ?',
+                [(now, task_id, STATUS_PROCESSING) for task_id in task_ids]
+            )
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+
+    def progress(self, task_id: str, pages_done: int, pages_total: int) -> None:
+        """변환한 페이지 수 기록 (heartbeat도 함께 갱신)"""
+        self._connect().execute(
+            'UPDATE jobs SET pages_done = ?, pages_total = ?, heartbeat_at = ? WHERE id = ? AND status = ?',
+            (pages_done, pages_total, time.time(), task_id, STATUS_PROCESSING)
+        )
+
+    def is_claimed_by(self, task_id: str, worker: str) -> bool:
+        """worker가 가져간 작업이 아직 그 worker의 처리 중 작업인지 (다시 대기열에 들어가 다른 워커가 가져갔거나 끝났으면 False)"""
+        row = self._connect().execute(
+            'SELECT 1 FROM jobs WHERE id = ? AND status = ? AND worker = ?', (task_id, STATUS_PROCESSING, worker)
+        ).fetchone()
+        return row is not None
+
+    def complete(self, task_id: str, worker: str, result_path: Optional[str], error: Optional[str] = None) -> bool:
+        """작업 완료 기록 - 결과는 result_path 파일에 있음 (저장 중 경고가 있으면 error에 함께 기록)
+
+        worker가 가져간 처리 중 작업일 때만 기록하고, 아니면(다른 워커가 다시 가져감, 취소됨) False 반환
+        """
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, result_path = ?, error = ?, finished_at = ? '
+            'WHERE id = ? AND status = ? AND worker = ?',
+            (STATUS_COMPLETED, result_path, error, time.time(), task_id, STATUS_PROCESSING, worker)
+        )
+        return cursor.rowcount > 0
+
+    def fail(self, task_id: str, worker: str, error: str) -> bool:
+        """작업 실패 기록 - worker가 가져간 처리 중 작업일 때만 기록하고, 아니면 False 반환"""
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status = ? AND worker = ?',
+            (STATUS_FAILED, error, time.time(), task_id, STATUS_PROCESSING, worker)
+        )
+        return cursor.rowcount > 0
+
+    def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """작업 정보 반환 (없으면 None)"""
+        row = self._connect().execute(
+            f'SELECT {", ".join(_JOB_COLUMNS)} FROM jobs WHERE id = ?', (task_id,)
+        ).fetchone()
+        return dict(zip(_JOB_COLUMNS, row)) if row is not None else None
+
+    def batch_jobs(self, batch_id: str) -> List[Dict[str, Any]]:
+        """배치에 속한 작업 목록 (추가한 순서)"""
+        rows = self._connect().execute(
+            f'SELECT {", ".join(_JOB_COLUMNS)} FROM jobs WHERE batch_id = ? ORDER BY created_at', (batch_id,)
+        ).fetchall()
+        return [dict(zip(_JOB_COLUMNS, row)) for row in rows]
+
+    def cancel(self, task_id: str) -> Optional[str]:
+        """작업 취소 - 대기 중이면 바로 취소, 처리 중이면 취소 요청만 기록 (처리하는 워커가 중단)
+
+        바뀐 뒤의 상태('cancelled' 또는 처리 중이면 'cancelling')나 이미 끝난 작업의 상태 반환 (없으면 None)
+        """
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute('SELECT status FROM jobs WHERE id = ?', (task_id,)).fetchone()
+            if row is None:
+                conn.execute('COMMIT')
+                return None
+            status = row[0]
+            if status == STATUS_PENDING:
+                conn.execute('UPDATE jobs SET status = ?, finished_at = ? WHERE id = ?',
+                             (STATUS_CANCELLED, time.time(), task_id))
+                status = STATUS_CANCELLED
+            elif status == STATUS_PROCESSING:
+                conn.execute('UPDATE jobs SET cancel_requested = 1 WHERE id = ?', (task_id,))
+                status = 'cancelling'
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return status
+
+    def cancel_batch(self, batch_id: str) -> Dict[str, int]:
+        """배치의 대기 작업은 바로 취소하고 처리 중인 작업에는 취소 요청 기록 - 각각의 수 반환"""
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            cancelled = conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ? WHERE batch_id = ? AND status = ?',
+                (STATUS_CANCELLED, time.time(), batch_id, STATUS_PENDING)
+            ).rowcount
+            cancelling = conn.execute(
+                'UPDATE jobs SET cancel_requested = 1 WHERE batch_id = ? AND status = ?',
+                (batch_id, STATUS_PROCESSING)
+            ).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        return {'cancelled': cancelled, 'cancelling': cancelling}
+
+    def cancel_requested(self, task_ids: List[str]) -> List[str]:
+        """task_ids 중 취소 요청이 기록된 처리 중 작업 ID"""
+        if not task_ids:
+            return []
+        placeholders = ', '.join('?' * len(task_ids))
+        rows = self._connect().execute(
+            f'SELECT id FROM jobs WHERE id IN ({placeholders}) AND status = ? AND cancel_requested = 1',
+            (*task_ids, STATUS_PROCESSING)
+        ).fetchall()
+        return [row[0] for row in rows]
+
+    def mark_cancelled(self, task_id: str, worker: str) -> bool:
+        """처리 중이던 작업을 취소 완료로 기록 - worker가 가져간 처리 중 작업일 때만 기록하고, 아니면 False 반환"""
+        cursor = self._connect().execute(
+            'UPDATE jobs SET status = ?, finished_at = ? WHERE id = ? AND status = ? AND worker = ?',
+            (STATUS_CANCELLED, time.time(), task_id, STATUS_PROCESSING, worker)
+        )
+        return cursor.rowcount > 0
+
+    def requeue_stale(self, stale_seconds: float) -> int:
+        """heartbeat가 stale_seconds 이상 끊긴 처리 중 작업(워커 종료/재시작)을 다시 대기 상태로, 다시 넣은 수 반환
+
+        취소 요청이 기록된 작업은 다시 처리하지 않고 취소로 기록한다. 이미 max_attempts번 가져간
+        작업은 매번 워커를 죽이거나 멈추게 하는 문서일 수 있으므로 실패로 기록한다.
+        """
+        now = time.time()
+        stale = (STATUS_PROCESSING, now - stale_seconds)
+        conn = self._connect()
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            conn.execute(
+                'UPDATE jobs SET status = ?, finished_at = ?, worker = NULL '
+                'WHERE status = ? AND heartbeat_at < ? AND cancel_requested = 1',
+                (STATUS_CANCELLED, now, *stale)
+            )
+            failed = conn.execute(
+                'UPDATE jobs SET status = ?, error = ?, finished_at = ?, worker = NULL '
+                'WHERE status = ? AND heartbeat_at < ? AND attempts >= ?',
+                (STATUS_FAILED, f"변환 중 워커가 {self.max_attempts}번 중단되어 더 시도하지 않습니다",
+                 now, *stale, self.max_attempts)
+            ).rowcount
+            requeued = conn.execute(
+                'UPDATE jobs SET status = ?, worker = NULL, pages_done = NULL WHERE status = ? AND heartbeat_at < ?',
+                (STATUS_PENDING, *stale)
+            ).rowcount
+            conn.execute('COMMIT')
+        except Exception:
+            conn.execute('ROLLBACK')
+            raise
+        if failed:
+            logger.error(f"중단된 변환 작업 {failed}개가 최대 시도 횟수({self.max_attempts})를 넘어 실패로 기록했습니다.")
+        if requeued:
+            logger.warning(f"중단된 변환 작업 {requeued}개를 다시 대기열에 넣었습니다.")
+        return requeued
+
+    def counts(self) -> Dict[str, int]:
+        """상태별 작업 수"""
+        return dict(self._connect().execute('SELECT status, COUNT(*) FROM jobs GROUP BY status'))
+
+    def list_jobs(self, status: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """최근 작업 목록"""
+        query = f'SELECT {", ".join(_JOB_COLUMNS)} FROM jobs'
+        params: tuple = ()
+        if status is not None:
+            query += ' WHERE status = ?'
+            params = (status,)
+        query += ' ORDER BY created_at DESC LIMIT ?'
+        rows = self._connect().execute(query, params + (limit,)).fetchall()
+        return [dict(zip(_JOB_COLUMNS, row)) for row in rows]
+
+    def cleanup(self, max_age_seconds: float) -> int:
+        """완료/실패/취소 후 max_age_seconds가 지난 작업 삭제, 삭제한 수 반환"""
+        cursor = self._connect().execute(
+            'DELETE FROM jobs WHERE status IN (?, ?, ?) AND finished_at < ?',
+            (*FINISHED_STATUSES, time.time() - max_age_seconds)
+        )
+        return cursor.rowcount
@@ -0,0 +1,182 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 변환 단계/작업 시간 히스토그램 구간(초) - 작은 TXT부터 수 분 걸리는 PDF까지
+CONVERSION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+# 검색 응답 시간 히스토그램 구간(초)
+SEARCH_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 이름 -> (설명, 구간)
+HISTOGRAMS = {
+    'docquery_conversion_stage_seconds': ('변환 단계별 소요 시간 (stage, file_type별)', CONVERSION_BUCKETS),
+    'docquery_conversion_seconds': ('변환 작업 전체 소요 시간 (file_type, outcome별)', CONVERSION_BUCKETS),
+    'docquery_job_wait_seconds': ('변환 작업이 작업 큐에서 기다린 시간 (file_type별)', CONVERSION_BUCKETS),
+    'docquery_search_seconds': ('검색 응답 시간 (endpoint, mode별)', SEARCH_BUCKETS),
+}
+
+# 관측값 (이름, 레이블, 값)
+Observation = Tuple[str, Dict[str, str], float]
+# 수집 시점에 값을 계산하는 게이지 - (레이블, 값) 목록 반환
+GaugeCallback = Callable[[], List[Tuple[Dict[str, str], float]]]
+
+
+@contextmanager
+def stage_timer(timings: Optional[Dict[str, float]], stage: str) -> Iterator[None]:
+    """with 블록 실행 시간을 timings[stage]에 더함 (timings가 None이면 측정하지 않음)
+
+    변환 프로세스 풀 워커에서도 쓰므로 측정값은 dict로 모아 반환하고,
+    기록(Metrics.observe_many)은 웹 워커에서 한다.
+    """
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[stage] = timings.get(stage, 0.0) + time.perf_counter() - started
+
+
+def file_type_label(file_ext: str) -> str:
+    """파일 형식 레이블 ('.pdf' -> 'pdf', 확장자가 없으면 unknown)"""
+    return file_ext.lstrip('.').lower() or 'unknown'
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """Prometheus 레이블 문자열 (키 이름순, 값은 이스케이프)"""
+    parts = []
+    for key in sorted(labels):
+        value = str(labels[key]).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return ','.join(parts)
+
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metrics:
+    """변환 단계별 시간, 작업 대기 시간, 검색 응답 시간 히스토그램 (Prometheus 텍스트 형식으로 출력)
+
+    관측값은 SQLite 파일에 누적하므로 gunicorn 워커 중 어느 워커가 /metrics 요청을 받아도
+    모든 워커의 합계를 보여 주고, 재시작 후에도 카운터가 줄어들지 않는다.
+    작업 큐 길이처럼 매번 계산하는 값은 add_gauge로 등록한 함수로 수집 시점에 구한다.
+    기록 중 오류는 로그만 남기고 변환/검색에는 영향을 주지 않는다.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._gauges: Dict[str, Tuple[str, GaugeCallback]] = {}
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS histograms ('
+                ' name TEXT NOT NULL,'
+                ' labels TEXT NOT NULL,'
+                ' count INTEGER NOT NULL,'
+                ' sum REAL NOT NULL,'
+                ' PRIMARY KEY (name, labels))'
+            )
+            # 구간별 누적 개수 (값 <= le인 관측 수) - 관측이 없는 구간은 행이 없음
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS histogram_buckets ('
+                ' name TEXT NOT NULL,'
+                ' labels TEXT NOT NULL,'
+                ' le REAL NOT NULL,'
+                ' count INTEGER NOT NULL,'
+                ' PRIMARY KEY (name, labels, le))'
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환"""
+        conn = getattr(self._local, 'conn', None)
+        # fork로 물려받은 부모 프로세스의 연결은 쓰지 않고 새로 연결 (gunicorn preload)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        """히스토그램에 관측값 하나 기록"""
+        self.observe_many([(name, labels, value)])
+
+    def observe_many(self, observations: List[Observation]) -> None:
+        """관측값 여러 개를 한 트랜잭션으로 기록 (변환 한 번의 단계별 시간 등)"""
+        if not observations:
+            return
+        sums, buckets = [], []
+        for name, labels, value in observations:
+            label_text = _format_labels(labels)
+            sums.append((name, label_text, value))
+            buckets.extend((name, label_text, le) for le in HISTOGRAMS[name][1] if value <= le)
+        try:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    'INSERT INTO histograms (name, labels, count, sum) VALUES (?, ?, 1, ?) '
+                    'ON CONFLICT (name, labels) DO UPDATE SET count = count + 1, sum = sum + excluded.sum',
+                    sums
+                )
+                conn.executemany(
+                    'INSERT INTO histogram_buckets (name, labels, le, count) VALUES (?, ?, ?, 1) '
+                    'ON CONFLICT (name, labels, le) DO UPDATE SET count = count + 1',
+                    buckets
+                )
+        except sqlite3.Error as e:
+            logger.error(f"메트릭 기록 중 오류 발생: {str(e)}")
+
+    def add_gauge(self, name: str, help_text: str, callback: GaugeCallback) -> None:
+        """수집할 때마다 callback으로 값을 구하는 게이지 등록"""
+        self._gauges[name] = (help_text, callback)
+
+    def render(self) -> str:
+        """Prometheus 텍스트 형식(0.0.4)으로 모든 메트릭 출력"""
+        conn = self._connect()
+        bucket_counts: Dict[Tuple[str, str], Dict[float, int]] = {}
+        for name, label_text, le, count in conn.execute('SELECT name, labels, le, count FROM histogram_buckets'):
+            bucket_counts.setdefault((name, label_text), {})[le] = count
+        series: Dict[str, List[Tuple[str, int, float]]] = {}
+        for name, label_text, count, total in conn.execute(
+                'SELECT name, labels, count, sum FROM histograms ORDER BY name, labels'):
+            series.setdefault(name, []).append((label_text, count, total))
+
+        lines: List[str] = []
+        for name, (help_text, bucket_bounds) in HISTOGRAMS.items():
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} histogram')
+            for label_text, count, total in series.get(name, []):
+                prefix = f'{label_text},' if label_text else ''
+                counts = bucket_counts.get((name, label_text), {})
+                for le in bucket_bounds:
+                    lines.append(f'{name}_bucket{{{prefix}le="{_format_value(le)}"}} {counts.get(le, 0)}')
+                lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {count}')
+                suffix = f'{{{label_text}}}' if label_text else ''
+                lines.append(f'{name}_sum{suffix} {_format_value(total)}')
+                lines.append(f'{name}_count{suffix} {count}')
+
+        for name, (help_text, callback) in self._gauges.items():
+            try:
+                values = callback()
+            except Exception as e:
+                logger.error(f"게이지 값 계산 중 오류 발생 ({name}): {str(e)}", exc_info=True)
+                continue
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, value in values:
+                label_text = _format_labels(labels)
+                lines.append(f'{name}{{{label_text}}} {_format_value(value)}' if label_text
+                             else f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
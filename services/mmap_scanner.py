@@ -0,0 +1,93 @@
+import os
+import re
+import mmap
+import threading
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Optional, Tuple
+
+
+@lru_cache(maxsize=256)
+def to_byte_pattern(text_pattern: str, flags: int) -> Optional[re.Pattern]:
+    """문자열 정규식(re.escape된 키워드)을 UTF-8 바이트 정규식으로 변환
+
+    bytes 정규식의 IGNORECASE는 ASCII 글자만 대소문자를 무시하므로, 대소문자가 있는
+    비ASCII 글자(예: 라틴 확장, 키릴 문자)가 포함된 경우에는 None을 반환한다.
+    한글은 대소문자가 없으므로 그대로 바이트 검색이 가능하다.
+    """
+    if flags & re.IGNORECASE:
+        for ch in text_pattern:
+            if not ch.isascii() and ch.lower() != ch.upper():
+                return None
+    byte_flags = re.IGNORECASE if flags & re.IGNORECASE else 0
+    return re.compile(text_pattern.encode('utf-8'), byte_flags)
+
+
+class MappedDocument:
+    """메모리 매핑된 파일과 줄 바꿈 오프셋 테이블 - 필요한 줄만 디코딩"""
+
+    def __init__(self, file_path: str, data: mmap.mmap, line_starts: array):
+        self.file_path = file_path
+        self.data = data
+        self.line_starts = line_starts
+        self.line_count = len(line_starts)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.data.close()
+
+    def get_line(self, i: int) -> str:
+        """i번째(0부터 시작) 줄만 디코딩하여 반환"""
+        start = self.line_starts[i]
+        end = self.line_starts[i + 1] - 1 if i + 1 < self.line_count else len(self.data)
+        return self.data[start:end].rstrip(b'\r').decode('utf-8', errors='ignore')
+
+    def line_of(self, pos: int) -> int:
+        """바이트 위치가 속한 줄 번호(0부터 시작) 반환"""
+        return bisect_right(self.line_starts, pos) - 1
+
+
+class MmapScanner:
+    """큰 마크다운 파일을 메모리 매핑으로 열고, 줄 바꿈 오프셋 테이블을 (mtime, size) 기준으로 캐시"""
+
+    def __init__(self, max_cached_files: int = 256):
+        self.max_cached_files = max_cached_files
+        self._line_starts: "OrderedDict[str, Tuple[int, int, array]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def open(self, file_path: str) -> MappedDocument:
+        """파일을 읽기 전용으로 매핑하여 MappedDocument 반환 (with 문으로 사용)"""
+        with open(file_path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            line_starts = self._get_line_starts(file_path, st, data)
+        except Exception:
+            data.close()
+            raise
+        return MappedDocument(file_path, data, line_starts)
+
+    def _get_line_starts(self, file_path: str, st: os.stat_result, data: mmap.mmap) -> array:
+        key = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            cached = self._line_starts.get(file_path)
+            if cached is not None and cached[:2] == key:
+                self._line_starts.move_to_end(file_path)
+                return cached[2]
+
+        line_starts = array('Q', [0])
+        pos = data.find(b'\n')
+        while pos != -1:
+            line_starts.append(pos + 1)
+            pos = data.find(b'\n', pos + 1)
+
+        with self._lock:
+            self._line_starts[file_path] = (key[0], key[1], line_starts)
+            self._line_starts.move_to_end(file_path)
+            while len(self._line_starts) > self.max_cached_files:
+                self._line_starts.popitem(last=False)
+        return line_starts
@@ -0,0 +1,90 @@
+import os
+from typing import Dict, Optional
+
+try:
+    import psutil
+except ImportError:  # psutil이 없으면 /proc 또는 resource 값으로 대신함
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def memory_usage() -> Dict[str, float]:
+    """현재 프로세스 메모리 사용량(MB)
+
+    rss는 fork 후 부모와 공유 중인(copy-on-write) 페이지까지 포함하므로, psutil이 있으면
+    이 프로세스만 쓰는 uss와 공유 페이지를 프로세스 수로 나눈 pss도 함께 반환한다.
+    """
+    if psutil is not None:
+        try:
+            info = psutil.Process().memory_full_info()
+            usage = {'rss_mb': info.rss / (1024 * 1024), 'uss_mb': info.uss / (1024 * 1024)}
+            if hasattr(info, 'pss'):
+                usage['pss_mb'] = info.pss / (1024 * 1024)
+            return usage
+        except (psutil.Error, AttributeError):
+            pass
+
+    try:
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return {'rss_mb': int(line.split()[1]) / 1024}
+    except OSError:
+        pass
+    if resource is not None:
+        # 최대 RSS (Linux는 KB 단위)
+        return {'max_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    return {}
+
+
+def format_memory_usage(usage: Dict[str, float]) -> str:
+    """로그용 문자열 (예: 'rss=512.3MB uss=40.1MB')"""
+    return ' '.join(f"{name[:-3]}={value:.1f}MB" for name, value in usage.items())
+
+
+def current_rss_bytes(include_children: bool = False) -> Optional[int]:
+    """현재 RSS(바이트) - 자주 호출해도 되도록 가벼운 방법만 사용 (알 수 없으면 None)
+
+    include_children이면 변환 프로세스 풀 워커 같은 자식 프로세스의 RSS도 더한다 (psutil 필요).
+    """
+    if psutil is not None:
+        try:
+            process = psutil.Process()
+            rss = process.memory_info().rss
+            if include_children:
+                for child in process.children(recursive=True):
+                    try:
+                        rss += child.memory_info().rss
+                    except psutil.Error:
+                        pass  # 그 사이 종료된 자식
+            return rss
+        except psutil.Error:
+            pass
+
+    try:
+        with open('/proc/self/statm', 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def process_cpu_seconds(pid: int) -> Optional[float]:
+    """프로세스가 지금까지 쓴 사용자+시스템 CPU 시간(초) (알 수 없으면 None)"""
+    if psutil is not None:
+        try:
+            times = psutil.Process(pid).cpu_times()
+            return times.user + times.system
+        except psutil.Error:
+            return None
+
+    try:
+        with open(f'/proc/{pid}/stat', 'r') as f:
+            # 프로세스 이름(괄호 안)에 공백이 있을 수 있으므로 ')' 뒤부터 나눔 - utime, stime은 14, 15번째 필드
+            fields = f.read().rsplit(')', 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf('SC_CLK_TCK')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
@@ -0,0 +1,49 @@
+import os
+
+_MB = 1024 * 1024
+
+# 확장자별 예상 비용 등급 기준 (작음 상한, 보통 상한) 바이트 - 넘으면 큰 작업
+# docling PDF/이미지 변환은 페이지마다 레이아웃 모델을 돌리므로 같은 크기라도 훨씬 오래 걸림
+COST_CLASS_LIMITS = {
+    '.pdf': (512 * 1024, 5 * _MB),
+    '.png': (1 * _MB, 5 * _MB),
+    '.jpg': (1 * _MB, 5 * _MB),
+    '.jpeg': (1 * _MB, 5 * _MB),
+    '.docx': (2 * _MB, 20 * _MB),
+    '.xlsx': (2 * _MB, 20 * _MB),
+    '.hwp': (5 * _MB, 50 * _MB),
+    '.txt': (20 * _MB, 200 * _MB),
+}
+DEFAULT_COST_CLASS_LIMITS = (2 * _MB, 20 * _MB)
+
+# 비용 등급 (작을수록 먼저 처리)
+COST_SMALL = 0
+COST_MEDIUM = 1
+COST_LARGE = 2
+
+# convert-all, 입력 폴더 감시처럼 사용자가 기다리지 않는 작업에 더하는 우선순위 값
+BACKGROUND_PRIORITY_OFFSET = 3
+
+
+def cost_class(file_path: str) -> int:
+    """파일 형식과 크기로 추정한 변환 비용 등급 (COST_SMALL/MEDIUM/LARGE)"""
+    small_limit, medium_limit = COST_CLASS_LIMITS.get(os.path.splitext(file_path)[1].lower(),
+                                                      DEFAULT_COST_CLASS_LIMITS)
+    try:
+        size = os.path.getsize(file_path)
+    except OSError:
+        return COST_SMALL  # 없는 파일은 바로 실패 처리되므로 기다리게 할 필요 없음
+    if size <= small_limit:
+        return COST_SMALL
+    if size <= medium_limit:
+        return COST_MEDIUM
+    return COST_LARGE
+
+
+def job_priority(file_path: str, background: bool = False) -> int:
+    """작업 큐 우선순위 (작을수록 먼저) - 비용 등급 + 백그라운드 작업 가중치
+
+    사용자가 요청한 작은 변환은 0, 백그라운드 큰 PDF는 5가 되며, 실제 처리 순서는
+    JobQueue.claim에서 대기 시간(aging)과 배치별 처리 중 작업 수(fairness)를 함께 반영한다.
+    """
+    return cost_class(file_path) + (BACKGROUND_PRIORITY_OFFSET if background else 0)
@@ -0,0 +1,637 @@
+import os
+import re
+import math
+import time
+import sqlite3
+import logging
+import threading
+from array import array
+from bisect import bisect_right
+from typing import Dict, List, Optional, Iterable, Iterator, Tuple
+
+from services.jamo import decompose, jamo_ngrams, max_edit_distance, min_shared_ngrams, fuzzy_matches
+
+logger = logging.getLogger(__name__)
+
+# 인덱스 스키마 버전 - 구조가 바뀌면 올려서 기존 인덱스를 재구축하도록 함
+SCHEMA_VERSION = 5
+
+# 단어(term) 토큰화 패턴 - \w는 한글/영문/숫자를 모두 포함
+TERM_PATTERN = re.compile(r'\w+')
+
+# 부분 문자열 검색용 문자 trigram 길이와 줄 끝 채움 문자
+# 줄 끝을 채워 두면 모든 글자 위치가 어떤 trigram의 시작이 되므로,
+# 1~2글자 검색어도 trigram 접두사 범위 조회로 처리할 수 있다.
+NGRAM_SIZE = 3
+NGRAM_PAD = '\n'
+
+# BM25 파라미터
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# 전체 동기화 시 한 트랜잭션에 묶을 파일 수
+SYNC_BATCH_SIZE = 50
+
+# 유사어(오타 허용) 검색용 자모 trigram을 만들 최대 단어 길이 - 긴 토큰(URL, 해시 등)은 제외
+FUZZY_MAX_TERM_LENGTH = 30
+
+
+def _encode_ints(values: Iterable[int]) -> bytes:
+    """정수 목록을 BLOB으로 저장하기 위해 바이트로 변환"""
+    return array('I', values).tobytes()
+
+
+def _decode_ints(blob: bytes) -> array:
+    """BLOB으로 저장된 정수 목록을 복원"""
+    values = array('I')
+    values.frombytes(blob)
+    return values
+
+
+def _line_ngrams(line: str) -> set:
+    """소문자로 변환된 줄에서 trigram 집합 생성 (공백, 기호 포함, 줄 끝은 채움 문자로 채움)"""
+    padded = line + NGRAM_PAD * (NGRAM_SIZE - 1)
+    return {padded[i:i + NGRAM_SIZE] for i in range(len(line))}
+
+
+def _query_ngrams(keyword: str) -> List[str]:
+    """검색어를 덮는 trigram 목록 - 3글자 미만이면 검색어 자체를 접두사로 사용"""
+    if len(keyword) < NGRAM_SIZE:
+        return [keyword]
+    grams = []
+    for i in range(len(keyword) - NGRAM_SIZE + 1):
+        gram = keyword[i:i + NGRAM_SIZE]
+        if gram not in grams:
+            grams.append(gram)
+    return grams
+
+
+def _term_jamo_rows(terms: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """단어 사전의 단어들에 대한 term_jamo 행 (gram, term) - 너무 긴 단어와 숫자는 유사어 검색에서 제외"""
+    return ((gram, term) for term in terms if len(term) <= FUZZY_MAX_TERM_LENGTH and not term.isdigit()
+            for gram in jamo_ngrams(decompose(term)))
+
+
+def _chunks(values: list, size: int = 500) -> Iterable[list]:
+    """SQLite 변수 개수 제한을 넘지 않도록 IN 조회용 목록을 나눔"""
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _split_lines(data: bytes) -> Tuple[List[str], array]:
+    """파일 바이트를 줄 단위로 나누고 각 줄의 시작 바이트 오프셋을 함께 반환"""
+    lines: List[str] = []
+    offsets = array('Q')
+    start, size = 0, len(data)
+    while start <= size:
+        end = data.find(b'\n', start)
+        if end == -1:
+            end = size
+        offsets.append(start)
+        lines.append(data[start:end].rstrip(b'\r').decode('utf-8', errors='ignore'))
+        start = end + 1
+    # 마지막 줄의 끝 위치(파일 크기)를 추가하여 줄 길이를 계산할 수 있게 함
+    offsets.append(size + 1)
+    return lines, offsets
+
+
+class IndexedDocument:
+    """인덱스에 저장된 줄 오프셋을 사용해 필요한 줄만 읽어오는 문서 핸들"""
+
+    def __init__(self, file_path: str, line_offsets: array, token_lines: Optional[array] = None):
+        self.file_path = file_path
+        self.line_offsets = line_offsets
+        self.token_lines = token_lines  # 줄마다 첫 단어의 위치 - 단어 위치를 줄 번호로 변환할 때 사용
+        self.line_count = len(line_offsets) - 1
+        self.size = line_offsets[-1] - 1
+        self._file = None
+        self._lines: Dict[int, str] = {}
+
+    def __enter__(self):
+        self._file = open(self.file_path, 'rb')
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+    def line_of_position(self, position: int) -> int:
+        """문서 내 단어 위치(단어 순번)가 속한 줄 번호(0부터 시작) 반환"""
+        return bisect_right(self.token_lines, position) - 1
+
+    def get_line(self, i: int) -> str:
+        """i번째(0부터 시작) 줄을 읽어 반환 - 한 번 읽은 줄은 재사용"""
+        if i not in self._lines:
+            start = self.line_offsets[i]
+            end = self.line_offsets[i + 1] - 1
+            self._file.seek(start)
+            raw = self._file.read(max(0, end - start))
+            self._lines[i] = raw.rstrip(b'\r').decode('utf-8', errors='ignore')
+        return self._lines[i]
+
+
+class SearchIndex:
+    """출력 폴더의 마크다운 파일에 대한 디스크 기반 역색인(term -> 파일/줄 목록)
+
+    SQLite 파일에 저장되므로 gunicorn 워커 간에 공유되며, 마크다운이 저장될 때마다
+    update_file()로 해당 파일의 색인만 갱신한다.
+    """
+
+    def __init__(self, output_folder: str, index_path: str, refresh_interval: float = 30.0):
+        self.output_folder = os.path.abspath(output_folder)
+        self.index_path = index_path
+        self.refresh_interval = refresh_interval
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+        self._last_refresh = 0.0
+
+        os.makedirs(os.path.dirname(os.path.abspath(index_path)), exist_ok=True)
+        self._init_schema()
+
+    # ------------------------------------------------------------------
+    # 저장소 관리
+    # ------------------------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        """스레드별 SQLite 연결 반환"""
+        conn = getattr(self._local, 'conn', None)
+        # fork로 물려받은 부모 프로세스의 연결은 쓰지 않고 새로 연결 (gunicorn preload)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.index_path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA cache_size=-65536')  # 색인 갱신 시 B-tree 페이지 캐시 64MB
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._connect()
+        with conn:
+            conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)')
+            row = conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+            if row is not None and int(row[0]) != SCHEMA_VERSION:
+                logger.info(f"검색 인덱스 스키마 변경 감지 ({row[0]} -> {SCHEMA_VERSION}), 인덱스를 재구축합니다.")
+                self._drop_tables(conn)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS files ('
+                ' id INTEGER PRIMARY KEY,'
+                ' name TEXT UNIQUE NOT NULL,'
+                ' mtime_ns INTEGER NOT NULL,'
+                ' size INTEGER NOT NULL,'
+                ' length INTEGER NOT NULL,'
+                ' line_offsets BLOB NOT NULL,'
+                ' token_lines BLOB NOT NULL)'
+            )
+            conn.execute('CREATE TABLE IF NOT EXISTS terms (term TEXT PRIMARY KEY) WITHOUT ROWID')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS postings ('
+                ' term TEXT NOT NULL,'
+                ' file_id INTEGER NOT NULL,'
+                ' tf INTEGER NOT NULL,'
+                ' lines BLOB NOT NULL,'
+                ' positions BLOB NOT NULL,'
+                ' PRIMARY KEY (term, file_id)) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS postings_file ON postings (file_id)')
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS ngrams ('
+                ' gram TEXT NOT NULL,'
+                ' file_id INTEGER NOT NULL,'
+                ' lines BLOB NOT NULL,'
+                ' PRIMARY KEY (gram, file_id)) WITHOUT ROWID'
+            )
+            conn.execute('CREATE INDEX IF NOT EXISTS ngrams_file ON ngrams (file_id)')
+            # 단어 사전의 자모 trigram (유사어 검색 후보 단어 조회용)
+            conn.execute(
+                'CREATE TABLE IF NOT EXISTS term_jamo ('
+                ' gram TEXT NOT NULL,'
+                ' term TEXT NOT NULL,'
+                ' PRIMARY KEY (gram, term)) WITHOUT ROWID'
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)",
+                (str(SCHEMA_VERSION),)
+            )
+
+    def _drop_tables(self, conn: sqlite3.Connection) -> None:
+        for table in ('term_jamo', 'ngrams', 'postings', 'terms', 'files'):
+            conn.execute(f'DROP TABLE IF EXISTS {table}')
+        conn.execute("DELETE FROM meta WHERE key = 'built_at'")
+
+    def is_ready(self) -> bool:
+        """전체 색인이 한 번 이상 구축되었는지 여부"""
+        row = self._connect().execute("SELECT value FROM meta WHERE key = 'built_at'").fetchone()
+        return row is not None
+
+    # ------------------------------------------------------------------
+    # 색인 갱신
+    # ------------------------------------------------------------------
+    def _relative_name(self, file_path: str) -> Optional[str]:
+        """출력 폴더 안의 마크다운 파일이면 파일명을, 아니면 None 반환"""
+        abs_path = os.path.abspath(file_path)
+        if os.path.dirname(abs_path) != self.output_folder or not abs_path.endswith('.md'):
+            return None
+        return os.path.basename(abs_path)
+
+    def update_file(self, file_path: str) -> bool:
+        """마크다운 파일 하나의 색인을 갱신 (저장 직후 호출)"""
+        name = self._relative_name(file_path)
+        if name is None:
+            return False
+        conn = self._connect()
+        with conn:
+            return self._index_file(conn, name, file_path)
+
+    def _index_file(self, conn: sqlite3.Connection, name: str, file_path: str) -> bool:
+        """파일을 읽어 postings를 교체 (커밋은 호출하는 쪽에서 수행)"""
+        try:
+            st = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            self._delete_file(conn, name)
+            return False
+
+        lines, offsets = _split_lines(data)
+        term_lines: Dict[str, List[int]] = {}
+        term_positions: Dict[str, List[int]] = {}
+        gram_lines: Dict[str, List[int]] = {}
+        token_lines = array('I')  # 줄마다 첫 단어의 문서 내 위치(단어 순번)
+        length = 0
+        for i, line in enumerate(lines):
+            lowered = line.lower()
+            terms = TERM_PATTERN.findall(lowered)
+            token_lines.append(length)
+            for term in terms:
+                term_positions.setdefault(term, []).append(length)
+                length += 1
+            for term in set(terms):
+                term_lines.setdefault(term, []).append(i)
+            for gram in _line_ngrams(lowered):
+                gram_lines.setdefault(gram, []).append(i)
+
+        conn.execute(
+            'INSERT INTO files (name, mtime_ns, size, length, line_offsets, token_lines) VALUES (?, ?, ?, ?, ?, ?) '
+            'ON CONFLICT(name) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size, '
+            'length = excluded.length, line_offsets = excluded.line_offsets, token_lines = excluded.token_lines',
+            (name, st.st_mtime_ns, st.st_size, length, offsets.tobytes(), token_lines.tobytes())
+        )
+        file_id = conn.execute('SELECT id FROM files WHERE name = ?', (name,)).fetchone()[0]
+        old_terms = [row[0] for row in conn.execute('SELECT term FROM postings WHERE file_id = ?', (file_id,))]
+        conn.execute('DELETE FROM postings WHERE file_id = ?', (file_id,))
+        conn.execute('DELETE FROM ngrams WHERE file_id = ?', (file_id,))
+        # 키 순서대로 넣어 B-tree 페이지 접근을 국소화
+        new_terms = []
+        for term in sorted(term_lines):
+            if conn.execute('INSERT OR IGNORE INTO terms (term) VALUES (?)', (term,)).rowcount:
+                new_terms.append(term)
+        # 사전에 처음 추가된 단어만 자모 trigram을 색인
+        conn.executemany('INSERT OR IGNORE INTO term_jamo (gram, term) VALUES (?, ?)', _term_jamo_rows(new_terms))
+        conn.executemany(
+            'INSERT INTO postings (term, file_id, tf, lines, positions) VALUES (?, ?, ?, ?, ?)',
+            ((term, file_id, len(term_positions[term]), _encode_ints(term_lines[term]),
+              _encode_ints(term_positions[term])) for term in sorted(term_lines))
+        )
+        conn.executemany(
+            'INSERT INTO ngrams (gram, file_id, lines) VALUES (?, ?, ?)',
+            ((gram, file_id, _encode_ints(gram_lines[gram])) for gram in sorted(gram_lines))
+        )
+        self._remove_orphan_terms(conn, set(old_terms).difference(term_lines))
+        logger.debug(f"검색 인덱스 갱신: {name} (줄 {len(lines)}개, 단어 {len(term_lines)}개)")
+        return True
+
+    def remove_file(self, file_path: str) -> None:
+        """삭제된 마크다운 파일을 색인에서 제거"""
+        name = self._relative_name(file_path)
+        if name is None:
+            return
+        conn = self._connect()
+        with conn:
+            self._delete_file(conn, name)
+
+    def _delete_file(self, conn: sqlite3.Connection, name: str) -> None:
+        row = conn.execute('SELECT id FROM files WHERE name = ?', (name,)).fetchone()
+        if row is not None:
+            old_terms = [r[0] for r in conn.execute('SELECT term FROM postings WHERE file_id = ?', (row[0],))]
+            conn.execute('DELETE FROM postings WHERE file_id = ?', (row[0],))
+            conn.execute('DELETE FROM ngrams WHERE file_id = ?', (row[0],))
+            conn.execute('DELETE FROM files WHERE id = ?', (row[0],))
+            self._remove_orphan_terms(conn, old_terms)
+
+    def _remove_orphan_terms(self, conn: sqlite3.Connection, terms: Iterable[str]) -> None:
+        """postings가 더 이상 없는 단어를 단어 사전과 자모 trigram에서 제거 (사전이 계속 커지지 않도록)"""
+        orphans = [term for term in sorted(terms)
+                   if conn.execute('SELECT 1 FROM postings WHERE term = ? LIMIT 1', (term,)).fetchone() is None]
+        if not orphans:
+            return
+        conn.executemany('DELETE FROM terms WHERE term = ?', ((term,) for term in orphans))
+        conn.executemany('DELETE FROM term_jamo WHERE gram = ? AND term = ?', _term_jamo_rows(orphans))
+
+    def sync(self) -> int:
+        """출력 폴더와 색인을 비교하여 변경/추가/삭제된 파일만 갱신, 갱신된 파일 수 반환"""
+        with self._build_lock:
+            conn = self._connect()
+            indexed = {
+                name: (mtime_ns, size)
+                for name, mtime_ns, size in conn.execute('SELECT name, mtime_ns, size FROM files')
+            }
+            changed = 0
+            seen = set()
+            pending = []
+            with os.scandir(self.output_folder) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.md') or not entry.is_file():
+                        continue
+                    seen.add(entry.name)
+                    st = entry.stat()
+                    if indexed.get(entry.name) != (st.st_mtime_ns, st.st_size):
+                        pending.append((entry.name, entry.path))
+            # 여러 파일을 한 트랜잭션으로 묶어 커밋 비용을 줄임
+            for i in range(0, len(pending), SYNC_BATCH_SIZE):
+                with conn:
+                    for name, path in pending[i:i + SYNC_BATCH_SIZE]:
+                        if self._index_file(conn, name, path):
+                            changed += 1
+            with conn:
+                for name in indexed.keys() - seen:
+                    self._delete_file(conn, name)
+                    changed += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO meta (key, value) VALUES ('built_at', ?)", (str(time.time()),)
+                )
+            self._last_refresh = time.time()
+            return changed
+
+    def refresh_in_background(self, force: bool = False) -> None:
+        """마지막 동기화 후 refresh_interval이 지났으면 백그라운드 스레드에서 sync() 실행"""
+        if not force and time.time() - self._last_refresh < self.refresh_interval:
+            return
+        if self._build_lock.locked():
+            return
+        self._last_refresh = time.time()
+        thread = threading.Thread(target=self._safe_sync, daemon=True)
+        thread.start()
+
+    def _safe_sync(self) -> None:
+        try:
+            started = time.time()
+            changed = self.sync()
+            if changed:
+                logger.info(f"검색 인덱스 동기화 완료: {changed}개 파일 갱신 ({time.time() - started:.2f}초)")
+        except Exception as e:
+            logger.error(f"검색 인덱스 동기화 중 오류 발생: {str(e)}", exc_info=True)
+
+    # ------------------------------------------------------------------
+    # 조회
+    # ------------------------------------------------------------------
+    def lookup(self, keyword: str) -> Optional[Dict[str, List[int]]]:
+        """키워드를 포함할 수 있는 후보 줄을 파일별로 반환
+
+        검색어의 trigram postings를 교집합하여 임의의 부분 문자열(한글 복합어,
+        조사, 공백/기호 포함)을 찾는다. 3글자 미만 검색어는 해당 문자열로 시작하는
+        trigram 전체를 범위 조회한다.
+        후보는 실제 일치 여부를 정규식으로 다시 확인해야 한다.
+        """
+        lowered = keyword.lower()
+        if not lowered:
+            return None
+        if len(lowered) >= NGRAM_SIZE:
+            candidates = self._intersect_postings(
+                'SELECT file_id, lines FROM ngrams WHERE gram = ?',
+                [(gram,) for gram in _query_ngrams(lowered)]
+            )
+        else:
+            # 접두사 범위: prefix <= gram < prefix + U+10FFFF
+            candidates = self._intersect_postings(
+                'SELECT file_id, lines FROM ngrams WHERE gram >= ? AND gram < ?',
+                [(lowered, lowered + '\U0010ffff')]
+            )
+
+        names = self._file_names(candidates.keys())
+        return {names[file_id]: sorted(lines) for file_id, lines in candidates.items() if file_id in names}
+
+    def _intersect_postings(self, query: str, params_list: List[tuple]) -> Dict[int, set]:
+        """각 조회 결과의 postings를 (파일, 줄) 단위로 교집합"""
+        conn = self._connect()
+        candidates: Optional[Dict[int, set]] = None
+        for params in params_list:
+            key_lines: Dict[int, set] = {}
+            for file_id, blob in conn.execute(query, params):
+                if candidates is not None and file_id not in candidates:
+                    continue
+                key_lines.setdefault(file_id, set()).update(_decode_ints(blob))
+            if candidates is None:
+                candidates = key_lines
+            else:
+                candidates = {
+                    file_id: lines & key_lines[file_id]
+                    for file_id, lines in candidates.items()
+                    if file_id in key_lines and lines & key_lines[file_id]
+                }
+            if not candidates:
+                return {}
+        return candidates or {}
+
+    def bm25_scores(self, keyword: str, filenames: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """색인에 저장된 문서별 단어 빈도, 문서 길이, 코퍼스 IDF로 BM25 점수 계산
+
+        검색어의 각 단어는 그 단어로 시작하는 색인 단어 전체로 확장한다
+        (예: '계약' -> '계약', '계약서를', '계약이'). 한국어 조사/어미가 붙은 형태도
+        같은 단어로 집계하기 위함이다. filenames가 주어지면 해당 문서의 점수만 반환한다.
+        """
+        tokens = list(dict.fromkeys(TERM_PATTERN.findall(keyword.lower())))
+        if not tokens:
+            return {}
+
+        conn = self._connect()
+        doc_count, total_length = conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM files').fetchone()
+        if doc_count == 0:
+            return {}
+        avg_length = (total_length / doc_count) or 1.0
+
+        # 단어별 문서 빈도(tf)를 접두사 범위 조회로 집계
+        token_tfs = []
+        for token in tokens:
+            tfs = dict(conn.execute(
+                'SELECT file_id, SUM(tf) FROM postings WHERE term >= ? AND term < ? GROUP BY file_id',
+                (token, token + '\U0010ffff')
+            ))
+            token_tfs.append(tfs)
+        return self._bm25(token_tfs, doc_count, avg_length, filenames)
+
+    def bm25_term_scores(self, term_groups: List[Iterable[str]],
+                         filenames: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """검색어 단어마다 확장된 색인 단어 묶음(예: 유사어 후보)을 한 단어로 보고 BM25 점수 계산"""
+        conn = self._connect()
+        doc_count, total_length = conn.execute('SELECT COUNT(*), COALESCE(SUM(length), 0) FROM files').fetchone()
+        if doc_count == 0:
+            return {}
+        avg_length = (total_length / doc_count) or 1.0
+
+        token_tfs = []
+        for terms in term_groups:
+            tfs: Dict[int, int] = {}
+            for chunk in _chunks(list(terms)):
+                placeholders = ','.join('?' * len(chunk))
+                for file_id, tf in conn.execute(
+                    f'SELECT file_id, SUM(tf) FROM postings WHERE term IN ({placeholders}) GROUP BY file_id', chunk
+                ):
+                    tfs[file_id] = tfs.get(file_id, 0) + tf
+            token_tfs.append(tfs)
+        return self._bm25(token_tfs, doc_count, avg_length, filenames)
+
+    def _bm25(self, token_tfs: List[Dict[int, int]], doc_count: int, avg_length: float,
+              filenames: Optional[Iterable[str]]) -> Dict[str, float]:
+        """검색어 단어별 {file_id: tf}로 문서별 BM25 점수 합산"""
+        file_ids = set()
+        for tfs in token_tfs:
+            file_ids.update(tfs)
+        names = self._file_names(file_ids)
+        if filenames is not None:
+            wanted = set(filenames)
+            file_ids = {file_id for file_id in file_ids if names.get(file_id) in wanted}
+        lengths = self._file_lengths(file_ids)
+
+        scores: Dict[str, float] = {}
+        for tfs in token_tfs:
+            df = len(tfs)
+            idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+            for file_id, tf in tfs.items():
+                if file_id not in file_ids or file_id not in names:
+                    continue
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths.get(file_id, 0) / avg_length)
+                score = idf * tf * (BM25_K1 + 1) / (tf + norm)
+                scores[names[file_id]] = scores.get(names[file_id], 0.0) + score
+        return scores
+
+    def fuzzy_terms(self, token: str, max_distance: Optional[int] = None) -> Dict[str, int]:
+        """자모 단위 편집 거리 max_distance 이내로 token과 앞부분이 일치하는 색인 단어 {단어: 거리}
+
+        검색어의 자모 trigram을 충분히 공유하는 단어만 사전에서 골라낸 뒤(개수 필터)
+        실제 편집 거리로 확인하므로, 모든 단어나 줄과 비교하지 않는다.
+        """
+        query = decompose(token.lower())
+        if max_distance is None:
+            max_distance = max_edit_distance(len(query))
+        grams = jamo_ngrams(query, pad_end=False)
+        placeholders = ','.join('?' * len(grams))
+        rows = self._connect().execute(
+            f'SELECT term FROM term_jamo WHERE gram IN ({placeholders}) GROUP BY term HAVING COUNT(*) >= ?',
+            (*grams, min_shared_ngrams(len(grams), max_distance))
+        )
+        return fuzzy_matches(token, (term for (term,) in rows), max_distance)
+
+    def fuzzy_lookup(self, keyword: str) -> Tuple[Dict[str, List[int]], List[Dict[str, int]]]:
+        """오타를 허용하여 검색어의 모든 단어를 (유사하게) 포함하는 파일과 후보 줄 반환
+
+        반환값: ({파일명: 줄 번호 목록}, 검색어 단어별 {일치한 색인 단어: 편집 거리})
+        """
+        tokens = list(dict.fromkeys(TERM_PATTERN.findall(keyword.lower())))
+        term_groups = [self.fuzzy_terms(token) for token in tokens]
+        if not term_groups or not all(term_groups):
+            return {}, term_groups
+
+        conn = self._connect()
+        candidates: Optional[Dict[int, set]] = None
+        for terms in term_groups:
+            file_lines: Dict[int, set] = {}
+            for chunk in _chunks(list(terms)):
+                placeholders = ','.join('?' * len(chunk))
+                for file_id, blob in conn.execute(
+                    f'SELECT file_id, lines FROM postings WHERE term IN ({placeholders})', chunk
+                ):
+                    if candidates is None or file_id in candidates:
+                        file_lines.setdefault(file_id, set()).update(_decode_ints(blob))
+            if candidates is None:
+                candidates = file_lines
+            else:
+                # 파일은 모든 단어를 포함해야 하고, 줄은 어느 단어든 일치한 줄을 모두 사용
+                candidates = {
+                    file_id: lines | file_lines[file_id]
+                    for file_id, lines in candidates.items() if file_id in file_lines
+                }
+            if not candidates:
+                return {}, term_groups
+
+        names = self._file_names(candidates.keys())
+        lookup = {names[file_id]: sorted(lines) for file_id, lines in candidates.items() if file_id in names}
+        return lookup, term_groups
+
+    def term_positions(self, prefix: str) -> Dict[int, List[int]]:
+        """prefix로 시작하는 단어들의 문서별 위치 목록 (접두사 범위 조회 한 번)"""
+        merged: Dict[int, List[int]] = {}
+        for file_id, blob in self._connect().execute(
+            'SELECT file_id, positions FROM postings WHERE term >= ? AND term < ?',
+            (prefix, prefix + '\U0010ffff')
+        ):
+            merged.setdefault(file_id, []).extend(_decode_ints(blob))
+        for positions in merged.values():
+            positions.sort()
+        return merged
+
+    def postings_provider(self) -> "IndexPostings":
+        """질의 평가기(services/search_query.py)에 넘길 위치 postings provider"""
+        return IndexPostings(self)
+
+    def _file_lengths(self, file_ids: Iterable[int]) -> Dict[int, int]:
+        conn = self._connect()
+        lengths: Dict[int, int] = {}
+        for chunk in _chunks(list(file_ids)):
+            placeholders = ','.join('?' * len(chunk))
+            for file_id, length in conn.execute(
+                f'SELECT id, length FROM files WHERE id IN ({placeholders})', chunk
+            ):
+                lengths[file_id] = length
+        return lengths
+
+    def _file_names(self, file_ids: Iterable[int]) -> Dict[int, str]:
+        conn = self._connect()
+        names: Dict[int, str] = {}
+        for chunk in _chunks(list(file_ids)):
+            placeholders = ','.join('?' * len(chunk))
+            for file_id, name in conn.execute(
+                f'SELECT id, name FROM files WHERE id IN ({placeholders})', chunk
+            ):
+                names[file_id] = name
+        return names
+
+    def open_document(self, filename: str) -> Optional[IndexedDocument]:
+        """색인된 줄 오프셋으로 문서를 연다. 파일이 색인 이후 변경되었으면 None 반환"""
+        row = self._connect().execute(
+            'SELECT mtime_ns, size, line_offsets, token_lines FROM files WHERE name = ?', (filename,)
+        ).fetchone()
+        if row is None:
+            return None
+        file_path = os.path.join(self.output_folder, filename)
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        if (st.st_mtime_ns, st.st_size) != (row[0], row[1]):
+            return None
+        offsets = array('Q')
+        offsets.frombytes(row[2])
+        return IndexedDocument(file_path, offsets, _decode_ints(row[3]))
+
+
+class IndexPostings:
+    """SearchIndex를 질의 평가기용 provider로 감싼 객체 - 파일 목록은 한 번만 읽어 재사용"""
+
+    def __init__(self, index: SearchIndex):
+        self.index = index
+        self._names: Optional[Dict[int, str]] = None
+
+    def _load_names(self) -> Dict[int, str]:
+        if self._names is None:
+            self._names = dict(self.index._connect().execute('SELECT id, name FROM files'))
+        return self._names
+
+    def term_positions(self, prefix: str) -> Dict[int, List[int]]:
+        return self.index.term_positions(prefix)
+
+    def all_keys(self) -> Iterable[int]:
+        return self._load_names().keys()
+
+    def key_name(self, key: int) -> str:
+        return self._load_names().get(key, '')
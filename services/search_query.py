@@ -0,0 +1,389 @@
+import re
+import fnmatch
+from bisect import bisect_left
+from typing import Dict, List, Optional, Set, Iterable
+
+# 단어 토큰화 패턴 - 색인(services/search_index.py)과 동일해야 함
+TERM_PATTERN = re.compile(r'\w+')
+
+# 질의 토큰: 괄호, "구문", NEAR/n, file:필터, 연산자 앞의 -, 그 외 단어
+_TOKEN_PATTERN = re.compile(
+    r'\s*(?:'
+    r'(?P<lparen>\()|(?P<rparen>\))'
+    r'|"(?P<phrase>[^"]*)"'
+    r'|(?P<near>NEAR/(?P<distance>\d+))(?=[\s("]|$)'
+    r'|file:(?:"(?P<file_quoted>[^"]*)"|(?P<file>[^\s()]+))'
+    r'|(?P<minus>-)(?=[^\s])'
+    r'|(?P<word>[^\s()"]+)'
+    r')'
+)
+
+OPERATORS = {'AND', 'OR', 'NOT'}
+
+
+class QuerySyntaxError(ValueError):
+    """검색 질의 문법 오류"""
+
+
+# ----------------------------------------------------------------------
+# 질의 트리
+# ----------------------------------------------------------------------
+class Term:
+    """단어 - 색인 단어 중 이 단어로 시작하는 것과 일치 (한국어 조사/어미 허용)"""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def words(self) -> List[List[str]]:
+        return [[self.text]]
+
+
+class Phrase:
+    """"따옴표 구문" - 단어들이 순서대로 연속해서 나와야 함"""
+
+    def __init__(self, terms: List[str]):
+        self.terms = terms
+
+    def words(self) -> List[List[str]]:
+        return [self.terms]
+
+
+class Near:
+    """A NEAR/n B - 두 항목이 n 단어 이내에 함께 나와야 함"""
+
+    def __init__(self, left, right, distance: int):
+        self.left = left
+        self.right = right
+        self.distance = distance
+
+    def words(self) -> List[List[str]]:
+        return self.left.words() + self.right.words()
+
+
+class And:
+    def __init__(self, children: list):
+        self.children = children
+
+    def words(self) -> List[List[str]]:
+        return [w for child in self.children for w in child.words()]
+
+
+class Or:
+    def __init__(self, children: list):
+        self.children = children
+
+    def words(self) -> List[List[str]]:
+        return [w for child in self.children for w in child.words()]
+
+
+class Not:
+    def __init__(self, child):
+        self.child = child
+
+    def words(self) -> List[List[str]]:
+        # 제외 조건의 단어는 강조/점수 계산에 사용하지 않음
+        return []
+
+
+class FileFilter:
+    """file:패턴 - 파일명 필터 (와일드카드가 있으면 glob, 없으면 부분 일치, 대소문자 무시)"""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern.lower()
+
+    def matches(self, filename: str) -> bool:
+        name = filename.lower()
+        if any(ch in self.pattern for ch in '*?['):
+            return fnmatch.fnmatchcase(name, self.pattern)
+        return self.pattern in name
+
+    def words(self) -> List[List[str]]:
+        return []
+
+
+# ----------------------------------------------------------------------
+# 파서
+# ----------------------------------------------------------------------
+def _tokenize(query: str) -> List[tuple]:
+    tokens = []
+    pos = 0
+    query = query.strip()
+    while pos < len(query):
+        m = _TOKEN_PATTERN.match(query, pos)
+        if m is None or m.end() == pos:
+            raise QuerySyntaxError(f"해석할 수 없는 질의입니다: {query[pos:]}")
+        pos = m.end()
+        if m.group('lparen'):
+            tokens.append(('(', None))
+        elif m.group('rparen'):
+            tokens.append((')', None))
+        elif m.group('phrase') is not None:
+            tokens.append(('phrase', m.group('phrase')))
+        elif m.group('near'):
+            tokens.append(('near', int(m.group('distance'))))
+        elif m.group('file_quoted') is not None or m.group('file') is not None:
+            tokens.append(('file', m.group('file_quoted') if m.group('file_quoted') is not None else m.group('file')))
+        elif m.group('minus'):
+            tokens.append(('NOT', None))
+        else:
+            word = m.group('word')
+            tokens.append((word, None) if word in OPERATORS else ('word', word))
+    return tokens
+
+
+class _Parser:
+    """재귀 하강 파서 - 우선순위: NOT > NEAR > AND(생략 가능) > OR"""
+
+    def __init__(self, tokens: List[tuple]):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self) -> Optional[str]:
+        return self.tokens[self.pos][0] if self.pos < len(self.tokens) else None
+
+    def take(self) -> tuple:
+        token = self.tokens[self.pos]
+        self.pos += 1
+        return token
+
+    def parse(self):
+        node = self.parse_or()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"예상하지 못한 토큰: {self.tokens[self.pos][1] or self.tokens[self.pos][0]}")
+        return node
+
+    def parse_or(self):
+        children = [self.parse_and()]
+        while self.peek() == 'OR':
+            self.take()
+            children.append(self.parse_and())
+        children = [c for c in children if c is not None]
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else Or(children)
+
+    def parse_and(self):
+        children = [self.parse_near()]
+        while self.peek() not in (None, 'OR', ')'):
+            if self.peek() == 'AND':
+                self.take()
+            children.append(self.parse_near())
+        children = [c for c in children if c is not None]
+        if not children:
+            return None
+        return children[0] if len(children) == 1 else And(children)
+
+    def parse_near(self):
+        node = self.parse_unary()
+        while self.peek() == 'near':
+            _, distance = self.take()
+            right = self.parse_unary()
+            if not isinstance(node, (Term, Phrase)) or not isinstance(right, (Term, Phrase)):
+                raise QuerySyntaxError("NEAR/n 양쪽에는 단어나 구문이 와야 합니다")
+            node = Near(node, right, distance)
+        return node
+
+    def parse_unary(self):
+        kind = self.peek()
+        if kind is None:
+            raise QuerySyntaxError("질의가 불완전합니다")
+        if kind == 'NOT':
+            self.take()
+            child = self.parse_unary()
+            if child is None:
+                raise QuerySyntaxError("NOT 뒤에 검색할 단어가 없습니다")
+            return Not(child)
+        if kind == '(':
+            self.take()
+            node = self.parse_or()
+            if self.peek() != ')':
+                raise QuerySyntaxError("괄호가 닫히지 않았습니다")
+            self.take()
+            return node
+        if kind in ('AND', 'OR', ')', 'near'):
+            raise QuerySyntaxError(f"연산자 위치가 올바르지 않습니다: {kind}")
+
+        kind, value = self.take()
+        if kind == 'file':
+            return FileFilter(value)
+        # 단어 안의 기호(예: apple-pie)는 구문으로 취급, 기호만 있는 단어는 무시
+        words = TERM_PATTERN.findall(value.lower())
+        if not words:
+            return None
+        if kind == 'phrase' or len(words) > 1:
+            return Phrase(words) if len(words) > 1 else Term(words[0])
+        return Term(words[0])
+
+
+def parse_query(query: str):
+    """검색 질의 문자열을 질의 트리로 변환
+
+    문법: 단어, "구문", A AND B (AND 생략 가능), A OR B, NOT A 또는 -A,
+    A NEAR/n B, (괄호), file:파일명패턴
+    """
+    node = _Parser(_tokenize(query)).parse()
+    if node is None:
+        raise QuerySyntaxError("검색할 단어가 없습니다")
+    return node
+
+
+# ----------------------------------------------------------------------
+# 평가
+# ----------------------------------------------------------------------
+def _phrase_positions(postings_list: List[Dict[int, List[int]]]) -> Dict[int, List[int]]:
+    """각 단어의 위치 목록에서 연속으로 나오는 구문의 시작 위치 계산"""
+    result = postings_list[0]
+    for offset, postings in enumerate(postings_list[1:], start=1):
+        next_result = {}
+        for key, starts in result.items():
+            positions = postings.get(key)
+            if not positions:
+                continue
+            position_set = set(positions)
+            matched = [p for p in starts if p + offset in position_set]
+            if matched:
+                next_result[key] = matched
+        result = next_result
+    return result
+
+
+def _near_positions(left: Dict[int, List[int]], left_len: int,
+                    right: Dict[int, List[int]], right_len: int, distance: int) -> Dict[int, List[int]]:
+    """두 항목 사이 거리(단어 수)가 distance 이내인 위치들 계산"""
+    result = {}
+    for key, left_positions in left.items():
+        right_positions = right.get(key)
+        if not right_positions:
+            continue
+        hits = set()
+        for p in left_positions:
+            # p 주변 [p - distance - right_len, p + left_len + distance] 범위의 right 위치 탐색
+            lo = bisect_left(right_positions, p - distance - right_len + 1)
+            for q in right_positions[lo:]:
+                if q > p + left_len - 1 + distance:
+                    break
+                hits.add(p)
+                hits.add(q)
+        if hits:
+            result[key] = sorted(hits)
+    return result
+
+
+class QueryEvaluator:
+    """질의 트리를 위치 postings 위에서 평가하여 {문서 키: 일치 위치 목록} 반환
+
+    provider는 다음 메서드를 제공해야 한다.
+    - term_positions(prefix): {문서 키: 정렬된 단어 위치 목록}
+    - all_keys(): 전체 문서 키 집합
+    - key_name(key): 문서 파일명
+    """
+
+    def __init__(self, provider):
+        self.provider = provider
+        self._term_cache: Dict[str, Dict[int, List[int]]] = {}
+
+    def evaluate(self, node) -> Dict[int, List[int]]:
+        if isinstance(node, Not):
+            excluded = self.evaluate(node.child)
+            return {key: [] for key in self.provider.all_keys() if key not in excluded}
+        if isinstance(node, FileFilter):
+            return {key: [] for key in self.provider.all_keys() if node.matches(self.provider.key_name(key))}
+        if isinstance(node, Term):
+            return self._term(node.text)
+        if isinstance(node, Phrase):
+            return _phrase_positions([self._term(t) for t in node.terms])
+        if isinstance(node, Near):
+            return _near_positions(
+                self.evaluate(node.left), self._span(node.left),
+                self.evaluate(node.right), self._span(node.right),
+                node.distance
+            )
+        if isinstance(node, And):
+            return self._and(node.children)
+        if isinstance(node, Or):
+            result: Dict[int, Set[int]] = {}
+            for child in node.children:
+                for key, positions in self.evaluate(child).items():
+                    result.setdefault(key, set()).update(positions)
+            return {key: sorted(positions) for key, positions in result.items()}
+        raise QuerySyntaxError(f"알 수 없는 질의 노드: {type(node).__name__}")
+
+    def _and(self, children: list) -> Dict[int, List[int]]:
+        # 제외 조건은 나머지를 평가한 뒤 빼서 전체 문서 목록을 만들지 않도록 함
+        positives = [c for c in children if not isinstance(c, Not)]
+        negatives = [c.child for c in children if isinstance(c, Not)]
+        if not positives:
+            result = self.evaluate(Not(Or(negatives) if len(negatives) > 1 else negatives[0]))
+            return result
+
+        result: Optional[Dict[int, Set[int]]] = None
+        for child in positives:
+            child_result = self.evaluate(child)
+            if result is None:
+                result = {key: set(positions) for key, positions in child_result.items()}
+            else:
+                result = {
+                    key: positions | set(child_result[key])
+                    for key, positions in result.items() if key in child_result
+                }
+            if not result:
+                return {}
+        for child in negatives:
+            for key in self.evaluate(child):
+                result.pop(key, None)
+        return {key: sorted(positions) for key, positions in result.items()}
+
+    def _term(self, text: str) -> Dict[int, List[int]]:
+        if text not in self._term_cache:
+            self._term_cache[text] = self.provider.term_positions(text)
+        return self._term_cache[text]
+
+    def _span(self, node) -> int:
+        return len(node.terms) if isinstance(node, Phrase) else 1
+
+
+def highlight_pattern(node) -> Optional[re.Pattern]:
+    """질의의 (제외 조건이 아닌) 단어/구문을 스니펫에서 강조하기 위한 정규식"""
+    alternatives = []
+    for words in node.words():
+        alternatives.append(r'\W+'.join(re.escape(w) + r'\w*' for w in words))
+    if not alternatives:
+        return None
+    # 긴 구문이 먼저 일치하도록 정렬
+    alternatives.sort(key=len, reverse=True)
+    return re.compile('|'.join(alternatives), re.IGNORECASE)
+
+
+def query_terms(node) -> str:
+    """BM25 점수 계산에 사용할 단어들을 공백으로 이은 문자열"""
+    return ' '.join(w for words in node.words() for w in words)
+
+
+class DocumentPostings:
+    """색인이 없을 때 문서 하나의 내용으로 위치 postings를 만드는 provider (문서 키는 0)"""
+
+    def __init__(self, filename: str, content: str):
+        self.filename = filename
+        self.positions: Dict[str, List[int]] = {}
+        self.token_lines: List[int] = []
+        lowered = content.lower()
+        line = 0
+        last = 0
+        for i, m in enumerate(TERM_PATTERN.finditer(lowered)):
+            line += lowered.count('\n', last, m.start())
+            last = m.start()
+            self.positions.setdefault(m.group(), []).append(i)
+            self.token_lines.append(line)
+
+    def term_positions(self, prefix: str) -> Dict[int, List[int]]:
+        merged: List[int] = []
+        for term, positions in self.positions.items():
+            if term.startswith(prefix):
+                merged.extend(positions)
+        return {0: sorted(merged)} if merged else {}
+
+    def all_keys(self) -> Iterable[int]:
+        return [0]
+
+    def key_name(self, key: int) -> str:
+        return self.filename
@@ -1,83 +1,578 @@
 import os
 import re
-from typing import Dict, List, Any, Optional
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Callable, Iterable, Iterator, Tuple
+
+from services.search_index import SearchIndex
+from services.content_cache import ContentCache
+from services.mmap_scanner import MmapScanner, to_byte_pattern
+from services.search_query import (
+    parse_query, highlight_pattern, query_terms, QueryEvaluator, DocumentPostings, TERM_PATTERN
+)
+from services.jamo import fuzzy_matches
+
+
+# 병렬 스캔 워커 프로세스마다 하나씩 유지되는 검색 서비스 (워커별 내용 캐시 재사용)
+_shard_service: Optional["SearchService"] = None
+
+
+def _scan_shard(output_folder: str, keyword: str, filenames: List[str],
+                snippet_limit: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """병렬 스캔 워커에서 파일 묶음(shard)을 검색하고 파일 순서대로 결과 반환 (파일당 스니펫 snippet_limit개까지)"""
+    global _shard_service
+    if _shard_service is None or _shard_service.output_folder != output_folder:
+        _shard_service = SearchService(output_folder)
+    pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+    results = []
+    for filename in filenames:
+        entry = _shard_service._search_file(pattern, filename, snippet_limit)
+        if entry is not None:
+            results.append((filename, entry))
+    return results
 
 
 class SearchService:
     """마크다운 파일 검색 기능을 담당하는 클래스"""
-    
-    def __init__(self, output_folder: str):
+
+    # 색인 검색 시 이 크기 이하의 문서는 내용 캐시에 올려서 확인
+    CACHE_FILL_MAX_BYTES = 256 * 1024
+    # 파일당 반환하는 스니펫 수
+    SNIPPETS_PER_FILE = 10
+    # 워커당 나눌 shard 수 (파일 크기 편차에 따른 부하 불균형 완화)
+    SHARDS_PER_WORKER = 4
+
+    def __init__(self, output_folder: str, search_index: Optional[SearchIndex] = None,
+                 content_cache: Optional[ContentCache] = None,
+                 scan_workers: int = 0, parallel_min_files: int = 200,
+                 mmap_min_bytes: int = 1024 * 1024):
         self.output_folder = output_folder
-    
-    def search_keyword(self, keyword: str) -> Dict[str, Dict[str, Any]]:
-        """키워드 검색 함수 - 완전/부분 일치 구분 및 스니펫 제공"""
+        self.search_index = search_index
+        self.content_cache = content_cache if content_cache is not None else ContentCache()
+        self.scan_workers = scan_workers  # 0이면 병렬 스캔 사용 안 함
+        self.parallel_min_files = parallel_min_files
+        self._scan_pool: Optional[ProcessPoolExecutor] = None
+        self.mmap_min_bytes = mmap_min_bytes  # 이 크기 이상의 파일은 mmap 바이트 검색 사용
+        self.mmap_scanner = MmapScanner()
+
+    def search_keyword(self, keyword: str, top_n: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """키워드 검색 함수 - 완전/부분 일치 구분 및 스니펫 제공
+
+        색인을 사용할 수 있으면 BM25 점수('score') 순으로 정렬하며, top_n이 주어지면
+        상위 top_n개 문서만 확인하여 반환한다.
+        """
         result = {}
-        output_files = self._get_markdown_files()
-        
+
         if not keyword.strip():
             return result
-        
-        # 정규식 패턴, 대소문자 구분 없이 키워드 전체 단어 검색을 위해 양쪽에  추가 고려
+
+        # 색인이 준비되어 있으면 후보 줄만 확인하고, 없으면 전체 파일을 스캔
+        candidates = self._lookup_candidates(keyword)
+        if candidates is not None:
+            for filename, entry in self._iter_results(keyword, candidates, max_files=top_n, ranked=True):
+                result[filename] = entry
+            return result
+
+        for filename, entry in self._iter_results(keyword, None):
+            result[filename] = entry
+        if top_n is not None:
+            # 색인이 없으면 BM25 통계를 쓸 수 없으므로 일치 개수 순으로 상위 N개만 반환
+            result = dict(sorted(result.items(), key=lambda item: -item[1]['count'])[:top_n])
+        return result
+
+    def iter_search(self, keyword: str, limit: Optional[int] = None, max_files: Optional[int] = None,
+                    ranked: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """파일 단위로 검색 결과를 찾는 즉시 (파일명, 결과) 형태로 내보내는 제너레이터
+
+        limit: 전체 스니펫 수 상한 - 도달하면 검색 중단
+        max_files: 결과 파일 수 상한 - 도달하면 검색 중단
+        ranked: 색인을 사용할 수 있으면 BM25 점수가 높은 문서부터 내보냄
+        일치 개수(count)는 항상 전부 세지만, 스니펫은 실제로 반환할 만큼만 만든다.
+        """
+        if not keyword.strip():
+            return
+        candidates = self._lookup_candidates(keyword)
+        yield from self._iter_results(keyword, candidates, limit, max_files, ranked)
+
+    def _iter_results(self, keyword: str, candidates: Optional[Dict[str, List[int]]],
+                      limit: Optional[int] = None, max_files: Optional[int] = None,
+                      ranked: bool = False) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """후보(색인 결과) 또는 전체 파일 목록을 순서대로 검색하여 결과를 내보냄"""
+        # 정규식 패턴, 대소문자 구분 없이 키워드 전체 단어 검색을 위해 양쪽에  추가 고려
         # 하지만 부분 일치도 찾아야 하므로, 우선 기존 패턴을 사용하고, 이후 로직에서 완전 일치 여부 판단
         pattern = re.compile(re.escape(keyword), re.IGNORECASE) # re.escape 추가
-        
-        for filename in output_files:
-            file_path = os.path.join(self.output_folder, filename)
+
+        scores = None
+        if candidates is not None:
+            filenames = sorted(candidates)
+            if ranked:
+                scores = self._rank_scores(keyword, filenames)
+                # 점수 내림차순, 동점이면 파일명 순 (정렬 안정성 이용)
+                filenames.sort(key=lambda name: -scores.get(name, 0.0))
+        else:
+            filenames = self._get_markdown_files()
+            if self.scan_workers > 1 and len(filenames) >= self.parallel_min_files:
+                yield from self._iter_parallel_results(keyword, filenames, limit, max_files)
+                return
+
+        if candidates is not None:
+            scan_file = lambda filename, snippet_limit: self._search_indexed_file(
+                pattern, filename, candidates[filename], snippet_limit)
+        else:
+            scan_file = lambda filename, snippet_limit: self._search_file(pattern, filename, snippet_limit)
+        yield from self._iter_limited(filenames, scan_file, limit, max_files, scores)
+
+    def _iter_limited(self, filenames: List[str], scan_file: Callable[[str, int], Optional[Dict[str, Any]]],
+                      limit: Optional[int], max_files: Optional[int],
+                      scores: Optional[Dict[str, float]] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """파일을 순서대로 scan_file(파일명, 스니펫 상한)로 검색하여 결과가 있는 파일만 내보냄
+
+        limit(전체 스니펫 수)이나 max_files(결과 파일 수) 상한에 도달하면 중단하며,
+        남은 스니펫 수만큼만 만들도록 scan_file에 스니펫 상한을 넘긴다.
+        scores가 있으면 결과에 'score'로 기록한다.
+        """
+        remaining = limit
+        files_found = 0
+        for filename in filenames:
+            snippet_limit = self.SNIPPETS_PER_FILE if remaining is None else min(self.SNIPPETS_PER_FILE, remaining)
+            entry = scan_file(filename, snippet_limit)
+            if entry is None:
+                continue
+            if scores is not None:
+                entry['score'] = round(scores.get(filename, 0.0), 4)
+
+            yield filename, entry
+            files_found += 1
+            if remaining is not None:
+                remaining -= len(entry['snippets'])
+                if remaining <= 0:
+                    return
+            if max_files is not None and files_found >= max_files:
+                return
+
+    def search_query(self, query: str, top_n: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """질의 언어 검색 - AND/OR/NOT, "구문", NEAR/n, file:필터 (services/search_query.py 참고)
+
+        결과 형식은 search_keyword와 같으며, 문법 오류는 QuerySyntaxError로 알린다.
+        """
+        result = {}
+        for filename, entry in self.iter_query(query, max_files=top_n):
+            result[filename] = entry
+        return result
+
+    def iter_query(self, query: str, limit: Optional[int] = None,
+                   max_files: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """질의를 위치 색인 위에서 한 번에 평가하고 BM25 점수 순으로 파일별 결과를 내보냄
+
+        색인이 준비되지 않았으면 문서마다 내용으로 위치 목록을 만들어 같은 방식으로 평가한다.
+        """
+        node = parse_query(query)
+        highlight = highlight_pattern(node)
+
+        positions_by_name = None
+        scores = None
+        if self.search_index is not None and self._index_ready():
             try:
-                snippets = []
-                count = 0
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                    lines = content.split('\n')
-                    for i, line in enumerate(lines):
-                        for match in pattern.finditer(line):
-                            count += 1
-                            start, end = match.span()
-                            
-                            # 완전 일치 여부 판단
-                            # match_type: 'complete' 또는 'partial'
-                            match_type = 'partial' # 기본값은 부분 일치
-                            
-                            # 매치 앞부분이 라인의 시작이거나, 앞 글자가 알파벳/숫자가 아닌 경우
-                            is_prefix_boundary = (start == 0) or (not line[start-1].isalnum())
-                            # 매치 뒷부분이 라인의 끝이거나, 뒷 글자가 알파벳/숫자가 아닌 경우
-                            is_suffix_boundary = (end == len(line)) or (not line[end].isalnum())
-                            
-                            if is_prefix_boundary and is_suffix_boundary:
-                                match_type = 'complete'
-                                
-                            context_start = max(0, start - 50)
-                            context_end = min(len(line), end + 50)
-                            
-                            # 이전 줄 가져오기
-                            prev_line = lines[i-1] + '\n' if i > 0 else ""
-                            # 다음 줄 가져오기
-                            next_line = '\n' + lines[i+1] if i < len(lines)-1 else ""
-                            
-                            # 이전 줄을 before에 포함, 다음 줄을 after에 포함
-                            before = prev_line + line[context_start:start]
-                            matched_text = line[start:end]
-                            after = line[end:context_end] + next_line
-                            
-                            snippet = {
-                                'line_number': i + 1,
-                                'before': before,
-                                'matched': matched_text, # 필드명 'matched' 유지
-                                'after': after,
-                                'match_type': match_type # 완전/부분 일치 정보 추가
-                            }
-                            snippets.append(snippet)
-                
-                if count > 0:
-                    result[filename] = {
-                        'count': count,
-                        'snippets': snippets[:10]
-                    }
+                provider = self.search_index.postings_provider()
+                matches = QueryEvaluator(provider).evaluate(node)
+                positions_by_name = {provider.key_name(key): positions for key, positions in matches.items()}
+                filenames = sorted(positions_by_name)
+                scores = self._rank_scores(query_terms(node), filenames)
+                filenames.sort(key=lambda name: -scores.get(name, 0.0))
             except Exception as e:
-                print(f"Error searching in {file_path}: {str(e)}")
-        
+                print(f"Error evaluating query on search index: {str(e)}")
+                positions_by_name = None
+                scores = None
+        if positions_by_name is None:
+            filenames = self._get_markdown_files()
+
+        if positions_by_name is not None:
+            scan_file = lambda filename, snippet_limit: self._query_indexed_file(
+                node, highlight, filename, positions_by_name[filename], snippet_limit)
+        else:
+            scan_file = lambda filename, snippet_limit: self._query_file(node, highlight, filename, snippet_limit)
+        yield from self._iter_limited(filenames, scan_file, limit, max_files, scores)
+
+    def search_fuzzy(self, keyword: str, top_n: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+        """오타 허용 검색 - 한글을 자모로 분해하여 편집 거리 이내의 단어까지 찾음
+
+        검색어와 다른 형태로 일치한 스니펫은 match_type이 'fuzzy'로 표시된다.
+        """
+        result = {}
+        for filename, entry in self.iter_fuzzy(keyword, max_files=top_n):
+            result[filename] = entry
         return result
-    
+
+    def iter_fuzzy(self, keyword: str, limit: Optional[int] = None,
+                   max_files: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """오타 허용 검색 결과를 파일 단위로 내보냄 - 색인이 있으면 자모 trigram으로 후보 단어를 찾음"""
+        tokens = list(dict.fromkeys(TERM_PATTERN.findall(keyword.lower())))
+        if not tokens:
+            return
+
+        lookup = None
+        if self.search_index is not None and self._index_ready():
+            try:
+                lookup, term_groups = self.search_index.fuzzy_lookup(keyword)
+            except Exception as e:
+                print(f"Error looking up fuzzy terms: {str(e)}")
+                lookup = None
+
+        scores = None
+        if lookup is not None:
+            pattern = self._fuzzy_pattern(tokens, term_groups)
+            filenames = sorted(lookup)
+            scores = self._rank_fuzzy_scores(term_groups, filenames)
+            filenames.sort(key=lambda name: -scores.get(name, 0.0))
+        else:
+            filenames = self._get_markdown_files()
+
+        if lookup is not None:
+            scan_file = lambda filename, snippet_limit: self._search_indexed_file(
+                pattern, filename, lookup[filename], snippet_limit)
+        else:
+            scan_file = lambda filename, snippet_limit: self._fuzzy_file(tokens, filename, snippet_limit)
+        yield from self._iter_limited(filenames, scan_file, limit, max_files, scores)
+
+    def _fuzzy_pattern(self, tokens: List[str], term_groups: List[Dict[str, int]]) -> re.Pattern:
+        """검색어 단어(단어 시작 일치)와 유사어 후보(단어 전체 일치, 'fuzzy' 그룹)를 찾는 정규식"""
+        fuzzy_terms = {term for terms in term_groups for term, distance in terms.items() if distance > 0}
+        exact = '|'.join(re.escape(t) for t in sorted(tokens, key=len, reverse=True))
+        alternatives = [f'(?P<exact>{exact})']
+        if fuzzy_terms:
+            fuzzy = '|'.join(re.escape(t) for t in sorted(fuzzy_terms, key=len, reverse=True))
+            alternatives.append(f'(?P<fuzzy>{fuzzy})(?!\\w)')
+        return re.compile(r'(?<!\w)(?:' + '|'.join(alternatives) + ')', re.IGNORECASE)
+
+    def _fuzzy_file(self, tokens: List[str], filename: str, snippet_limit: int) -> Optional[Dict[str, Any]]:
+        """색인 없이 문서 하나의 단어 목록에서 유사어를 찾아 검색"""
+        file_path = os.path.join(self.output_folder, filename)
+        try:
+            document = self.content_cache.get(file_path)
+            vocabulary = set(TERM_PATTERN.findall(document.content.lower()))
+            term_groups = []
+            for token in tokens:
+                terms = fuzzy_matches(token, vocabulary)
+                if not terms:
+                    return None
+                term_groups.append(terms)
+            pattern = self._fuzzy_pattern(tokens, term_groups)
+            return self._scan_document(pattern, pattern, document, document.content, snippet_limit)
+        except Exception as e:
+            print(f"Error searching in {file_path}: {str(e)}")
+            return None
+
+    def _rank_fuzzy_scores(self, term_groups: List[Dict[str, int]], filenames: List[str]) -> Dict[str, float]:
+        """유사어 후보 묶음을 검색어 단어 하나로 보고 계산한 BM25 점수"""
+        try:
+            return self.search_index.bm25_term_scores(term_groups, filenames)
+        except Exception as e:
+            print(f"Error ranking search results: {str(e)}")
+            return {}
+
+    def _index_ready(self) -> bool:
+        """색인을 사용할 수 있는지 확인 - 아직 없으면 백그라운드 구축을 시작하고 False"""
+        try:
+            if not self.search_index.is_ready():
+                self.search_index.refresh_in_background(force=True)
+                return False
+            self.search_index.refresh_in_background()
+            return True
+        except Exception as e:
+            print(f"Error checking search index: {str(e)}")
+            return False
+
+    def _query_indexed_file(self, node, highlight: Optional[re.Pattern], filename: str,
+                            positions: List[int], snippet_limit: int) -> Optional[Dict[str, Any]]:
+        """색인 평가 결과(단어 위치)를 줄 번호로 바꿔 해당 줄만 읽고 스니펫 생성"""
+        document = self.search_index.open_document(filename)
+        if document is None:
+            # 색인 이후 파일이 바뀜 - 이 파일만 내용으로 다시 평가
+            self.search_index.refresh_in_background(force=True)
+            return self._query_file(node, highlight, filename, snippet_limit)
+        try:
+            line_numbers = sorted({document.line_of_position(p) for p in positions})
+            with document:
+                snippets = self._highlight_lines(highlight, line_numbers, document.get_line,
+                                                 document.line_count, snippet_limit)
+            return {
+                'count': len(positions),
+                'snippets': snippets
+            }
+        except Exception as e:
+            print(f"Error searching in {document.file_path}: {str(e)}")
+            return None
+
+    def _query_file(self, node, highlight: Optional[re.Pattern], filename: str,
+                    snippet_limit: int) -> Optional[Dict[str, Any]]:
+        """색인 없이 문서 하나의 내용으로 질의를 평가"""
+        file_path = os.path.join(self.output_folder, filename)
+        try:
+            document = self.content_cache.get(file_path)
+            postings = DocumentPostings(filename, document.content)
+            matches = QueryEvaluator(postings).evaluate(node)
+            if 0 not in matches:
+                return None
+            positions = matches[0]
+            line_numbers = sorted({postings.token_lines[p] for p in positions})
+            snippets = self._highlight_lines(highlight, line_numbers, document.get_line,
+                                             document.line_count, snippet_limit)
+            return {
+                'count': len(positions),
+                'snippets': snippets
+            }
+        except Exception as e:
+            print(f"Error searching in {file_path}: {str(e)}")
+            return None
+
+    def _highlight_lines(self, highlight: Optional[re.Pattern], line_numbers: List[int],
+                         get_line: Callable[[int], str], line_count: int, snippet_limit: int) -> List[Dict[str, Any]]:
+        if highlight is None:
+            return []
+        _, snippets = self._collect_matches(highlight, line_numbers, get_line, line_count, snippet_limit)
+        return snippets
+
+    def _rank_scores(self, keyword: str, filenames: List[str]) -> Dict[str, float]:
+        """후보 문서의 BM25 점수 - 실패하면 빈 딕셔너리(파일명 순 유지)"""
+        try:
+            return self.search_index.bm25_scores(keyword, filenames)
+        except Exception as e:
+            print(f"Error ranking search results: {str(e)}")
+            return {}
+
+    def _lookup_candidates(self, keyword: str) -> Optional[Dict[str, List[int]]]:
+        """색인에서 후보 줄 목록을 조회 - 색인을 사용할 수 없으면 None"""
+        # 최초 구축은 백그라운드에서 진행하고 이번 요청은 전체 스캔으로 처리
+        if self.search_index is None or not self._index_ready():
+            return None
+        try:
+            return self.search_index.lookup(keyword)
+        except Exception as e:
+            print(f"Error looking up search index: {str(e)}")
+            return None
+
+    def _iter_parallel_results(self, keyword: str, filenames: List[str], limit: Optional[int],
+                               max_files: Optional[int]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """파일 목록을 shard로 나누어 프로세스 풀에서 스캔하고, 순차 스캔과 같은 파일 순서와 상한으로 내보냄
+
+        shard는 처음 남은 스니펫 수만큼만 스니펫을 만들고, 이후 파일은 그 시점의 남은 수에 맞춰 자른다.
+        상한에 도달하면 아직 시작하지 않은 shard는 취소한다.
+        """
+        snippet_limit = self.SNIPPETS_PER_FILE if limit is None else min(self.SNIPPETS_PER_FILE, limit)
+        scanned = self._iter_parallel_scan(keyword, filenames, snippet_limit)
+        try:
+            # scanned는 filenames와 같은 순서로 파일마다 결과(없으면 None)를 하나씩 내보냄
+            yield from self._iter_limited(
+                filenames, lambda filename, snippet_limit: self._trim_snippets(next(scanned), snippet_limit),
+                limit, max_files)
+        finally:
+            scanned.close()
+
+    def _iter_parallel_scan(self, keyword: str, filenames: List[str],
+                            snippet_limit: int) -> Iterator[Optional[Dict[str, Any]]]:
+        """파일 목록을 연속된 shard로 나누어 프로세스 풀에서 스캔하고 파일 순서대로 파일별 결과(없으면 None) 반환
+
+        풀을 쓸 수 없거나 shard 하나가 실패하면 그 부분만 현재 프로세스에서 순차 스캔한다.
+        """
+        shard_count = min(len(filenames), self.scan_workers * self.SHARDS_PER_WORKER)
+        shard_size = -(-len(filenames) // shard_count)
+        shards = [filenames[i:i + shard_size] for i in range(0, len(filenames), shard_size)]
+        pattern = re.compile(re.escape(keyword), re.IGNORECASE)
+
+        try:
+            pool = self._get_scan_pool()
+            futures = [pool.submit(_scan_shard, self.output_folder, keyword, shard, snippet_limit) for shard in shards]
+        except Exception as e:
+            print(f"Error in parallel scan, falling back to sequential scan: {str(e)}")
+            for filename in filenames:
+                yield self._search_file(pattern, filename, snippet_limit)
+            return
+
+        try:
+            # shard 순서대로 결과를 받아 결정적인 파일 순서를 유지
+            for shard, future in zip(shards, futures):
+                try:
+                    found = dict(future.result())
+                except Exception as e:
+                    print(f"Error in parallel scan, scanning shard sequentially: {str(e)}")
+                    found = {}
+                    for filename in shard:
+                        entry = self._search_file(pattern, filename, snippet_limit)
+                        if entry is not None:
+                            found[filename] = entry
+                for filename in shard:
+                    yield found.get(filename)
+        finally:
+            for future in futures:
+                future.cancel()
+
+    @staticmethod
+    def _trim_snippets(entry: Optional[Dict[str, Any]], snippet_limit: int) -> Optional[Dict[str, Any]]:
+        """미리 스캔한 결과의 스니펫을 snippet_limit개로 줄임 (일치 개수는 그대로)"""
+        if entry is not None and len(entry['snippets']) > snippet_limit:
+            entry['snippets'] = entry['snippets'][:snippet_limit]
+        return entry
+
+    def _get_scan_pool(self) -> ProcessPoolExecutor:
+        """병렬 스캔용 프로세스 풀 (최초 사용 시 생성)
+
+        gevent/스레드와 함께 안전하게 쓰기 위해 fork 대신 spawn 방식으로 워커를 띄운다.
+        """
+        if self._scan_pool is None:
+            self._scan_pool = ProcessPoolExecutor(
+                max_workers=self.scan_workers,
+                mp_context=multiprocessing.get_context('spawn')
+            )
+        return self._scan_pool
+
+    def close(self) -> None:
+        """병렬 스캔용 프로세스 풀 종료"""
+        if self._scan_pool is not None:
+            self._scan_pool.shutdown()
+            self._scan_pool = None
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """내용 캐시의 적중/실패/제거 통계 반환"""
+        return self.content_cache.stats()
+
+    def _search_file(self, pattern: re.Pattern, filename: str,
+                     snippet_limit: int = SNIPPETS_PER_FILE) -> Optional[Dict[str, Any]]:
+        """파일 전체를 검색 - 스니펫은 필요한 줄에 대해서만 생성
+
+        mmap_min_bytes 이상인 큰 파일은 메모리 매핑 후 UTF-8 바이트 위에서 바로 검색하고
+        일치한 줄만 디코딩한다. 그 외 파일은 내용 캐시에서 가져와 검색한다.
+        """
+        file_path = os.path.join(self.output_folder, filename)
+        try:
+            byte_pattern = None
+            if os.path.getsize(file_path) >= self.mmap_min_bytes:
+                byte_pattern = to_byte_pattern(pattern.pattern, pattern.flags)
+            if byte_pattern is not None:
+                with self.mmap_scanner.open(file_path) as document:
+                    return self._scan_document(pattern, byte_pattern, document, document.data, snippet_limit)
+            document = self.content_cache.get(file_path)
+            return self._scan_document(pattern, pattern, document, document.content, snippet_limit)
+        except Exception as e:
+            print(f"Error searching in {file_path}: {str(e)}")
+            return None
+
+    def _scan_document(self, pattern: re.Pattern, scan_pattern: re.Pattern, document,
+                       content, snippet_limit: int) -> Optional[Dict[str, Any]]:
+        """문서 전체에서 한 번에 일치 개수를 세고, 스니펫을 만들 줄 번호만 추려 스니펫 생성"""
+        count = 0
+        line_numbers = []
+        for match in scan_pattern.finditer(content):
+            count += 1
+            if count <= snippet_limit:
+                i = document.line_of(match.start())
+                if not line_numbers or line_numbers[-1] != i:
+                    line_numbers.append(i)
+        if count == 0:
+            return None
+        _, snippets = self._collect_matches(
+            pattern, line_numbers, document.get_line, document.line_count, snippet_limit
+        )
+        return {
+            'count': count,
+            'snippets': snippets
+        }
+
+    def _search_indexed_file(self, pattern: re.Pattern, filename: str, line_numbers: List[int],
+                             snippet_limit: int = SNIPPETS_PER_FILE) -> Optional[Dict[str, Any]]:
+        """색인이 알려준 후보 줄만 확인 - 색인 이후 파일이 바뀌었으면 전체를 다시 읽음
+
+        작은 문서는 내용 캐시에 올려 두고 메모리에서 확인하며, 큰 문서는 줄 오프셋으로
+        필요한 줄만 디스크에서 읽는다.
+        """
+        document = self.search_index.open_document(filename)
+        if document is None:
+            self.search_index.refresh_in_background(force=True)
+            return self._search_file(pattern, filename, snippet_limit)
+        try:
+            if document.size <= self.CACHE_FILL_MAX_BYTES:
+                cached = self.content_cache.get(document.file_path)
+                count, snippets = self._collect_matches(
+                    pattern, line_numbers, cached.get_line, cached.line_count, snippet_limit
+                )
+            else:
+                cached = self.content_cache.peek(document.file_path)
+                if cached is not None:
+                    count, snippets = self._collect_matches(
+                        pattern, line_numbers, cached.get_line, cached.line_count, snippet_limit
+                    )
+                else:
+                    with document:
+                        count, snippets = self._collect_matches(
+                            pattern, line_numbers, document.get_line, document.line_count, snippet_limit
+                        )
+            if count == 0:
+                return None
+            return {
+                'count': count,
+                'snippets': snippets
+            }
+        except Exception as e:
+            print(f"Error searching in {document.file_path}: {str(e)}")
+            return None
+
+    def _collect_matches(self, pattern: re.Pattern, line_numbers: Iterable[int],
+                         get_line: Callable[[int], str], line_count: int,
+                         snippet_limit: int = SNIPPETS_PER_FILE):
+        """지정한 줄들에서 일치 항목을 찾아 (개수, 스니펫 목록) 반환
+
+        개수는 모두 세지만 스니펫은 snippet_limit개까지만 만든다.
+        """
+        snippets = []
+        count = 0
+        for i in line_numbers:
+            line = get_line(i)
+            for match in pattern.finditer(line):
+                count += 1
+                if len(snippets) < snippet_limit:
+                    snippets.append(self._build_snippet(line, match, i, get_line, line_count))
+        return count, snippets
+
+    def _build_snippet(self, line: str, match: re.Match, i: int,
+                       get_line: Callable[[int], str], line_count: int) -> Dict[str, Any]:
+        """일치 항목 하나의 스니펫(앞뒤 줄 및 문맥 포함) 생성"""
+        start, end = match.span()
+
+        # 완전 일치 여부 판단
+        # match_type: 'complete' 또는 'partial'
+        match_type = 'partial' # 기본값은 부분 일치
+
+        # 매치 앞부분이 라인의 시작이거나, 앞 글자가 알파벳/숫자가 아닌 경우
+        is_prefix_boundary = (start == 0) or (not line[start-1].isalnum())
+        # 매치 뒷부분이 라인의 끝이거나, 뒷 글자가 알파벳/숫자가 아닌 경우
+        is_suffix_boundary = (end == len(line)) or (not line[end].isalnum())
+
+        if is_prefix_boundary and is_suffix_boundary:
+            match_type = 'complete'
+        # 오타 허용 검색에서 검색어와 다른 단어(유사어)로 일치한 경우
+        if match.lastgroup == 'fuzzy':
+            match_type = 'fuzzy'
+
+        context_start = max(0, start - 50)
+        context_end = min(len(line), end + 50)
+
+        # 이전 줄 가져오기
+        prev_line = get_line(i-1) + '\n' if i > 0 else ""
+        # 다음 줄 가져오기
+        next_line = '\n' + get_line(i+1) if i < line_count-1 else ""
+
+        # 이전 줄을 before에 포함, 다음 줄을 after에 포함
+        before = prev_line + line[context_start:start]
+        matched_text = line[start:end]
+        after = line[end:context_end] + next_line
+
+        return {
+            'line_number': i + 1,
+            'before': before,
+            'matched': matched_text, # 필드명 'matched' 유지
+            'after': after,
+            'match_type': match_type # 완전/부분 일치 정보 추가
+        }
+
     def _get_markdown_files(self) -> List[str]:
         """출력 폴더에 있는 모든 마크다운 파일 목록을 반환하는 함수"""
         files = []
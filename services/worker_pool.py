@@ -0,0 +1,255 @@
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+from services.process_stats import process_cpu_seconds
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerCrashed(Exception):
+    """변환 워커 프로세스가 작업 중 비정상 종료됨 (메모리 부족 등)"""
+
+
+class ConversionTimeout(Exception):
+    """변환이 제한 시간(벽시계 또는 CPU)을 넘겨 워커를 종료함"""
+
+
+class ConversionCancelled(Exception):
+    """취소 요청으로 변환을 중단함"""
+
+
+class TaskControl:
+    """작업 하나의 마감 시각과 취소 신호 - 한 작업의 여러 변환 호출(PDF 페이지 범위 등)이 함께 사용"""
+
+    def __init__(self, deadline: Optional[float] = None):
+        self.deadline = deadline  # time.time() 기준, None이면 제한 없음
+        self.cancelled = threading.Event()
+
+    def check(self) -> None:
+        """취소되었거나 마감이 지났으면 예외 발생 (현재 프로세스에서 변환할 때 단계 사이에 호출)"""
+        if self.cancelled.is_set():
+            raise ConversionCancelled("취소 요청으로 변환을 중단했습니다")
+        if self.deadline is not None and time.time() > self.deadline:
+            raise ConversionTimeout("변환 제한 시간을 넘었습니다")
+
+
+def _worker_main(conn, initializer: Optional[Callable[[], None]]) -> None:
+    """워커 프로세스 - 초기화 후 준비 신호를 보내고 (함수, 인자)를 받아 결과를 돌려줌"""
+    if initializer is not None:
+        initializer()
+    conn.send(('ready', None))
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return  # 부모 프로세스 종료
+        if task is None:
+            return
+        func, args = task
+        try:
+            result = ('ok', func(*args))
+        except Exception as e:
+            result = ('error', e)
+        try:
+            conn.send(result)
+        except Exception as e:  # 결과나 예외를 pickle할 수 없는 경우
+            conn.send(('error', RuntimeError(f"변환 결과를 전달할 수 없습니다: {str(e)}")))
+
+
+class _Worker:
+    """워커 프로세스 하나와 통신용 파이프"""
+
+    def __init__(self, mp_context, initializer: Optional[Callable[[], None]]):
+        self.conn, child_conn = mp_context.Pipe()
+        self.process = mp_context.Process(target=_worker_main, args=(child_conn, initializer), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.dead = False
+        try:
+            self.conn.recv()  # 초기화(모델 로드)가 끝날 때까지 대기 - 작업 제한 시간에 넣지 않음
+        except (EOFError, OSError):
+            self.kill()
+            raise WorkerCrashed(f"변환 워커 초기화 중 종료되었습니다 (exit code {self.process.exitcode})")
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid
+
+    def kill(self) -> None:
+        self.dead = True
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        """작업이 없는 워커를 정상 종료"""
+        try:
+            self.conn.send(None)
+            self.process.join(timeout=5)
+        except (OSError, EOFError):
+            pass
+        self.kill()
+
+
+class SupervisedPool:
+    """작업마다 제한 시간과 취소를 감시하고, 멈춘 워커는 강제 종료 후 새로 띄우는 변환 프로세스 풀
+
+    ProcessPoolExecutor는 실행 중인 작업 하나만 멈출 수 없어 잘못된 문서 하나가 워커 자리를
+    계속 차지한다. 여기서는 작업마다 감시 스레드가 결과를 기다리면서 벽시계 마감(TaskControl.deadline),
+    워커 CPU 시간(cpu_timeout_seconds), 취소 신호를 확인하고, 넘으면 그 워커만 종료한다.
+    종료한 자리는 다음 작업이 들어올 때 새 워커로 채운다.
+    """
+
+    # 결과를 기다리면서 제한/취소를 확인하는 간격(초)
+    POLL_SECONDS = 0.2
+
+    def __init__(self, max_workers: int, initializer: Optional[Callable[[], None]] = None,
+                 mp_context=None, cpu_timeout_seconds: float = 0):
+        self.max_workers = max_workers
+        self.initializer = initializer
+        self.cpu_timeout_seconds = cpu_timeout_seconds  # 작업 하나가 쓸 수 있는 워커 CPU 시간 (0이면 제한 없음)
+        self._mp_context = mp_context or multiprocessing.get_context('spawn')
+        self._condition = threading.Condition()
+        self._idle: List[_Worker] = []
+        self._worker_count = 0
+        self._closed = False
+        self._killed = 0
+        self._crashed = 0
+        self._supervisors = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='conversion-supervisor')
+
+    def submit(self, func: Callable[..., Any], *args: Any, control: Optional[TaskControl] = None) -> Future:
+        """워커에서 func(*args)를 실행하는 Future 반환 (as_completed/wait와 함께 사용)"""
+        return self._supervisors.submit(self.run, func, *args, control=control)
+
+    def run(self, func: Callable[..., Any], *args: Any, control: Optional[TaskControl] = None) -> Any:
+        """워커에서 func(*args)를 실행하고 결과 반환 - 제한을 넘기거나 취소되면 워커를 종료하고 예외 발생"""
+        worker = self._acquire()
+        try:
+            return self._run_on(worker, func, args, control)
+        finally:
+            self._release(worker)
+
+    def _run_on(self, worker: _Worker, func: Callable[..., Any], args: tuple,
+                control: Optional[TaskControl]) -> Any:
+        try:
+            worker.conn.send((func, args))
+        except (OSError, EOFError) as e:
+            self._discard(worker, crashed=True)
+            raise WorkerCrashed(f"변환 워커에 작업을 보낼 수 없습니다: {str(e)}")
+        cpu_started = process_cpu_seconds(worker.pid) if self.cpu_timeout_seconds > 0 else None
+
+        while True:
+            if worker.conn.poll(self.POLL_SECONDS):
+                try:
+                    status, value = worker.conn.recv()
+                except (EOFError, OSError):
+                    self._discard(worker, crashed=True)
+                    raise WorkerCrashed(f"변환 워커가 비정상 종료되었습니다 (exit code {worker.process.exitcode})")
+                if status == 'ok':
+                    return value
+                raise value
+
+            if not worker.process.is_alive():
+                self._discard(worker, crashed=True)
+                raise WorkerCrashed(f"변환 워커가 비정상 종료되었습니다 (exit code {worker.process.exitcode})")
+            if control is not None:
+                if control.cancelled.is_set():
+                    self._discard(worker)
+                    raise ConversionCancelled("취소 요청으로 변환 워커를 종료했습니다")
+                if control.deadline is not None and time.time() > control.deadline:
+                    self._discard(worker)
+                    raise ConversionTimeout("변환 제한 시간을 넘어 변환 워커를 종료했습니다")
+            if cpu_started is not None:
+                cpu_now = process_cpu_seconds(worker.pid)
+                if cpu_now is not None and cpu_now - cpu_started > self.cpu_timeout_seconds:
+                    self._discard(worker)
+                    raise ConversionTimeout(
+                        f"변환 CPU 시간 제한({self.cpu_timeout_seconds:g}초)을 넘어 변환 워커를 종료했습니다"
+                    )
+
+    def prestart(self) -> None:
+        """워커를 max_workers개까지 미리 띄움 - 워커 초기화(모델 로드)를 첫 작업 전에 끝내 둠"""
+        while True:
+            with self._condition:
+                if self._closed or self._worker_count >= self.max_workers:
+                    return
+                self._worker_count += 1
+            try:
+                worker = _Worker(self._mp_context, self.initializer)
+            except BaseException:
+                with self._condition:
+                    self._worker_count -= 1
+                    self._condition.notify()
+                raise
+            self._release(worker)
+
+    def _acquire(self) -> _Worker:
+        """쉬는 워커를 가져오거나, 자리가 있으면 새로 띄움"""
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("변환 프로세스 풀이 종료되었습니다")
+                if self._idle:
+                    return self._idle.pop()
+                if self._worker_count < self.max_workers:
+                    self._worker_count += 1
+                    break
+                self._condition.wait()
+        try:
+            return _Worker(self._mp_context, self.initializer)
+        except BaseException:
+            with self._condition:
+                self._worker_count -= 1
+                self._condition.notify()
+            raise
+
+    def _release(self, worker: _Worker) -> None:
+        with self._condition:
+            if worker.dead:
+                return  # _discard에서 자리 반환
+            if self._closed:
+                worker.stop()
+                return
+            self._idle.append(worker)
+            self._condition.notify()
+
+    def _discard(self, worker: _Worker, crashed: bool = False) -> None:
+        """워커를 종료하고 자리를 비움 (다음 작업에서 새 워커를 띄움)"""
+        if crashed:
+            logger.error(f"변환 워커 비정상 종료 (pid={worker.pid})")
+        else:
+            logger.warning(f"변환 워커 강제 종료 (pid={worker.pid}) - 다음 작업에서 새 워커로 대체")
+        worker.kill()
+        with self._condition:
+            self._worker_count -= 1
+            if crashed:
+                self._crashed += 1
+            else:
+                self._killed += 1
+            self._condition.notify()
+
+    def stats(self) -> Dict[str, int]:
+        """워커 수, 쉬는 워커 수, 강제 종료/비정상 종료 횟수"""
+        with self._condition:
+            return {
+                'max_workers': self.max_workers,
+                'workers': self._worker_count,
+                'idle': len(self._idle),
+                'killed': self._killed,
+                'crashed': self._crashed,
+            }
+
+    def shutdown(self) -> None:
+        """쉬는 워커를 종료하고, 실행 중인 워커는 작업이 끝나면 종료"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._condition.notify_all()
+        for worker in idle:
+            worker.stop()
+        self._supervisors.shutdown(wait=False)
@@ -0,0 +1,161 @@
+import random
+import struct
+import zlib
+
+import pytest
+
+pytest.importorskip('olefile')
+
+from services.hwp_converter_service import (
+    HWPTAG_CTRL_HEADER, HWPTAG_LIST_HEADER, HWPTAG_PARA_TEXT, HWPTAG_TABLE,
+    _decompress_chunks, _iter_record_batches, _SectionParser,
+)
+
+
+def _record(tag, level, payload):
+    """HWP 레코드 - 내용이 0xfff바이트 이상이면 길이 필드를 0xfff로 두고 뒤에 4바이트 길이를 붙임"""
+    if len(payload) >= 0xfff:
+        return struct.pack('<II', tag | (level << 10) | (0xfff << 20), len(payload)) + payload
+    return struct.pack('<I', tag | (level << 10) | (len(payload) << 20)) + payload
+
+
+def _reference_records(data):
+    """스트림 전체를 한 번에 읽어 해석한 (태그, 레벨, 내용) 목록 - 끝의 불완전한 레코드는 버림"""
+    records = []
+    i = 0
+    while i + 4 <= len(data):
+        header = struct.unpack_from('<I', data, i)[0]
+        size = header >> 20
+        start = i + 4
+        if size == 0xfff:
+            if start + 4 > len(data):
+                break
+            size = struct.unpack_from('<I', data, start)[0]
+            start += 4
+        if start + size > len(data):
+            break
+        records.append((header & 0x3ff, (header >> 10) & 0x3ff, data[start:start + size]))
+        i = start + size
+    return records
+
+
+def _split(data, sizes):
+    chunks = []
+    i = 0
+    for size in sizes:
+        if i >= len(data):
+            break
+        chunks.append(data[i:i + size])
+        i += size
+    if i < len(data):
+        chunks.append(data[i:])
+    return chunks
+
+
+def _parse(chunks):
+    # memoryview는 다음 목록을 받기 전까지만 유효하므로 받는 즉시 복사
+    return [(tag, level, bytes(payload)) for batch in _iter_record_batches(iter(chunks), None)
+            for tag, level, payload in batch]
+
+
+def _para_text(text):
+    return text.encode('utf-16-le')
+
+
+def test_records_within_one_chunk():
+    data = _record(HWPTAG_PARA_TEXT, 0, b'abcd') + _record(HWPTAG_TABLE, 1, b'') + _record(3, 2, b'xy')
+
+    assert _parse([data]) == [(HWPTAG_PARA_TEXT, 0, b'abcd'), (HWPTAG_TABLE, 1, b''), (3, 2, b'xy')]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 4, 5, 7, 8, 4096])
+def test_records_across_chunk_boundaries(chunk_size):
+    """헤더, 확장 길이 필드, 내용 어디에서 청크가 나뉘어도 한 번에 읽은 것과 같은 레코드"""
+    data = b''.join(_record(tag, tag % 4, bytes([tag]) * size)
+                    for tag, size in enumerate([0, 1, 5, 0xffe, 0xfff, 0x1000, 3, 70000]))
+
+    records = _parse(_split(data, [chunk_size] * len(data)))
+
+    assert records == _reference_records(data)
+    assert [len(payload) for _, _, payload in records] == [0, 1, 5, 0xffe, 0xfff, 0x1000, 3, 70000]
+
+
+def test_extended_size_header():
+    payload = bytes(range(256)) * 20
+
+    data = _record(HWPTAG_PARA_TEXT, 1, payload)
+
+    assert struct.unpack_from('<I', data)[0] >> 20 == 0xfff
+    assert _parse([data]) == [(HWPTAG_PARA_TEXT, 1, payload)]
+    # 확장 길이 필드가 두 청크에 나뉜 경우
+    assert _parse([data[:6], data[6:]]) == [(HWPTAG_PARA_TEXT, 1, payload)]
+
+
+def test_record_spanning_many_chunks():
+    data = _record(1, 0, b'a' * 200000) + _record(2, 0, b'b')
+
+    batches = [[(tag, len(payload)) for tag, _, payload in batch]
+               for batch in _iter_record_batches(iter(_split(data, [65536] * 4)), None)]
+
+    assert batches == [[(1, 200000), (2, 1)]]
+
+
+def test_truncated_record_at_end_is_dropped():
+    data = _record(1, 0, b'abc') + _record(2, 0, b'x' * 10)[:-3]
+
+    assert _parse(_split(data, [5] * 10)) == [(1, 0, b'abc')]
+    assert _parse([b'\x01\x00']) == []
+
+
+def test_random_chunk_splits_match_reference():
+    rnd = random.Random(23)
+    for _ in range(300):
+        data = b''.join(_record(rnd.randrange(1024), rnd.randrange(1024),
+                                rnd.randbytes(rnd.choice([0, 1, 3, 100, 0xfff, 5000])))
+                        for _ in range(rnd.randrange(20)))
+        data += rnd.randbytes(rnd.randrange(6))
+        sizes = [rnd.choice([1, 2, 3, 7, 64, 4096]) for _ in range(len(data))]
+
+        assert _parse(_split(data, sizes)) == _reference_records(data)
+
+
+def test_compressed_stream_records():
+    data = b''.join(_record(HWPTAG_PARA_TEXT, 0, _para_text(f'문단 {i}')) for i in range(2000))
+    compressor = zlib.compressobj(wbits=-15)
+    compressed = compressor.compress(data) + compressor.flush()
+
+    records = [(tag, level, bytes(payload)) for batch in
+               _iter_record_batches(_decompress_chunks(iter(_split(compressed, [1000] * len(compressed))), None), None)
+               for tag, level, payload in batch]
+
+    assert records == _reference_records(data)
+
+
+def test_truncated_compressed_stream_raises():
+    compressed = zlib.compress(_record(1, 0, b'x' * 1000))[2:-4]
+
+    with pytest.raises(zlib.error):
+        list(_decompress_chunks(iter([compressed[:len(compressed) // 2]]), None))
+
+
+def _table_records():
+    """2x2 표 - 셀 LIST_HEADER는 문단 수, 속성 뒤에 열, 행 주소"""
+    records = [_record(HWPTAG_PARA_TEXT, 0, _para_text('앞 문단\r')),
+               _record(HWPTAG_CTRL_HEADER, 1, b' lbt' + b'\x00' * 4),
+               _record(HWPTAG_TABLE, 2, struct.pack('<IHH', 0, 2, 2))]
+    for row, col, text in [(0, 0, '이름'), (0, 1, '값'), (1, 0, 'a|b'), (1, 1, '1')]:
+        records.append(_record(HWPTAG_LIST_HEADER, 2, struct.pack('<HHIHH', 1, 0, 0, col, row) + b'\x00' * 2))
+        records.append(_record(HWPTAG_PARA_TEXT, 3, _para_text(text + '\r')))
+    records.append(_record(HWPTAG_PARA_TEXT, 0, _para_text('뒤 문단\r')))
+    return b''.join(records)
+
+
+@pytest.mark.parametrize('chunk_size', [3, 17, 4096])
+def test_table_records_become_markdown_table(chunk_size):
+    parser = _SectionParser()
+    lines = []
+    for batch in _iter_record_batches(iter(_split(_table_records(), [chunk_size] * 1000)), None):
+        lines.extend(parser.feed(batch))
+    lines.extend(parser.finish())
+
+    assert lines == ['앞 문단', '', '| 이름 | 값 |', '| --- | --- |', '| a\\|b | 1 |', '', '뒤 문단']
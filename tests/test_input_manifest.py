@@ -0,0 +1,173 @@
+import os
+
+import pytest
+
+from services.conversion_cache import hash_file
+from services.input_manifest import InputManifest
+
+
+class CountingHash:
+    """content_hash 호출 수를 세는 해시 함수"""
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, file_path):
+        self.calls.append(os.path.basename(file_path))
+        return hash_file(file_path)
+
+
+@pytest.fixture
+def folders(tmp_path):
+    input_folder = tmp_path / 'input'
+    output_folder = tmp_path / 'output'
+    input_folder.mkdir()
+    output_folder.mkdir()
+    return input_folder, output_folder
+
+
+@pytest.fixture
+def content_hash():
+    return CountingHash()
+
+
+@pytest.fixture
+def manifest(folders, tmp_path, content_hash):
+    input_folder, _ = folders
+    return InputManifest(str(tmp_path / 'manifest.sqlite3'), str(input_folder), content_hash=content_hash)
+
+
+def _convert(manifest, folders, filename, text, output_name=None):
+    """입력 파일을 쓰고 변환에 성공한 것처럼 출력 파일과 기록을 남김"""
+    input_folder, output_folder = folders
+    file_path = input_folder / filename
+    file_path.write_text(text, encoding='utf-8')
+    output_path = output_folder / (output_name or os.path.splitext(filename)[0] + '.md')
+    output_path.write_text(text, encoding='utf-8')
+    manifest.record(str(file_path), str(output_path), os.stat(file_path), hash_file(str(file_path)))
+    return output_path
+
+
+def _bump_mtime(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_plan_without_records(manifest, folders):
+    input_folder, _ = folders
+    (input_folder / 'a.pdf').write_text('a', encoding='utf-8')
+
+    plan = manifest.plan(['a.pdf'])
+
+    assert plan == {'new': ['a.pdf'], 'changed': [], 'unchanged': [], 'deleted': [], 'orphaned_outputs': []}
+
+
+def test_plan_unchanged_by_stat_without_hashing(manifest, folders, content_hash):
+    _convert(manifest, folders, 'a.pdf', 'a')
+
+    plan = manifest.plan(['a.pdf'])
+
+    assert plan['unchanged'] == ['a.pdf']
+    assert content_hash.calls == []
+
+
+def test_plan_changed_content(manifest, folders):
+    input_folder, _ = folders
+    _convert(manifest, folders, 'a.pdf', 'a')
+    (input_folder / 'a.pdf').write_text('changed', encoding='utf-8')
+
+    assert manifest.plan(['a.pdf'])['changed'] == ['a.pdf']
+
+
+def test_plan_changed_content_with_same_size(manifest, folders, content_hash):
+    input_folder, _ = folders
+    _convert(manifest, folders, 'a.pdf', 'aaaa')
+    (input_folder / 'a.pdf').write_text('bbbb', encoding='utf-8')
+    _bump_mtime(input_folder / 'a.pdf')
+
+    assert manifest.plan(['a.pdf'])['changed'] == ['a.pdf']
+    assert content_hash.calls == ['a.pdf']
+
+
+def test_plan_changed_when_output_is_missing(manifest, folders):
+    output_path = _convert(manifest, folders, 'a.pdf', 'a')
+    output_path.unlink()
+
+    assert manifest.plan(['a.pdf'])['changed'] == ['a.pdf']
+
+
+def test_plan_touched_file_is_unchanged_and_updated(manifest, folders, content_hash):
+    """mtime만 바뀐 파일은 해시로 확인하고, update이면 기록을 갱신해 다음에는 해시를 건너뜀"""
+    input_folder, _ = folders
+    _convert(manifest, folders, 'a.pdf', 'a')
+    _bump_mtime(input_folder / 'a.pdf')
+
+    assert manifest.plan(['a.pdf'])['unchanged'] == ['a.pdf']
+    assert manifest.plan(['a.pdf'], update=True)['unchanged'] == ['a.pdf']
+    assert content_hash.calls == ['a.pdf', 'a.pdf']
+
+    assert manifest.plan(['a.pdf'])['unchanged'] == ['a.pdf']
+    assert content_hash.calls == ['a.pdf', 'a.pdf']
+    assert manifest.entries()['a.pdf']['mtime_ns'] == os.stat(input_folder / 'a.pdf').st_mtime_ns
+
+
+def test_plan_deleted_inputs_and_orphaned_outputs(manifest, folders):
+    input_folder, _ = folders
+    _convert(manifest, folders, 'a.pdf', 'a')
+    b_output = _convert(manifest, folders, 'b.docx', 'b')
+    (input_folder / 'a.pdf').unlink()
+    (input_folder / 'b.docx').unlink()
+    # a.docx가 a.pdf와 같은 a.md를 만들므로 a.md는 지우지 않음
+    (input_folder / 'a.docx').write_text('a', encoding='utf-8')
+
+    plan = manifest.plan(['a.docx'])
+
+    assert plan['new'] == ['a.docx']
+    assert plan['deleted'] == ['a.pdf', 'b.docx']
+    assert plan['orphaned_outputs'] == [os.path.abspath(b_output)]
+
+
+def test_plan_keeps_output_shared_with_remaining_input(manifest, folders):
+    input_folder, _ = folders
+    shared = _convert(manifest, folders, 'a.pdf', 'a', output_name='shared.md')
+    _convert(manifest, folders, 'b.pdf', 'b', output_name='shared.md')
+    (input_folder / 'a.pdf').unlink()
+
+    plan = manifest.plan(['b.pdf'])
+
+    assert plan['deleted'] == ['a.pdf']
+    assert plan['orphaned_outputs'] == []
+    assert shared.exists()
+
+
+def test_plan_skips_already_removed_outputs(manifest, folders):
+    input_folder, _ = folders
+    output_path = _convert(manifest, folders, 'a.pdf', 'a')
+    (input_folder / 'a.pdf').unlink()
+    output_path.unlink()
+
+    plan = manifest.plan([])
+
+    assert plan['deleted'] == ['a.pdf']
+    assert plan['orphaned_outputs'] == []
+
+
+def test_plan_without_deleted_check(manifest, folders):
+    _convert(manifest, folders, 'a.pdf', 'a')
+    _convert(manifest, folders, 'b.pdf', 'b')
+
+    plan = manifest.plan(['b.pdf'], check_deleted=False)
+
+    assert plan['unchanged'] == ['b.pdf']
+    assert plan['deleted'] == []
+    assert plan['orphaned_outputs'] == []
+
+
+def test_record_ignores_files_outside_input_folder(manifest, folders, tmp_path):
+    _, output_folder = folders
+    upload = tmp_path / 'upload.pdf'
+    upload.write_text('u', encoding='utf-8')
+
+    manifest.record(str(upload), str(output_folder / 'upload.md'), os.stat(upload), hash_file(str(upload)))
+
+    assert manifest.entries() == {}
@@ -0,0 +1,209 @@
+import time
+
+import pytest
+
+from services.job_queue import JobQueue, STATUS_PENDING, STATUS_PROCESSING, STATUS_COMPLETED, STATUS_FAILED, \
+    STATUS_CANCELLED
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / 'jobs.sqlite3'))
+
+
+def _set(queue, task_id, **columns):
+    """테스트용으로 작업 행의 열을 직접 바꿈 (생성/heartbeat 시각 등)"""
+    assignments = ', '.join(f'{column} = ?' for column in columns)
+    queue._connect().execute(f'UPDATE jobs SET {assignments} WHERE id = ?', (*columns.values(), task_id))
+
+
+def _claim_all(queue, worker='w'):
+    claimed = []
+    while True:
+        job = queue.claim(worker)
+        if job is None:
+            return claimed
+        claimed.append(job['id'])
+
+
+def test_claim_takes_lowest_priority_first(queue):
+    low = queue.enqueue('low.pdf', priority=5)
+    high = queue.enqueue('high.pdf', priority=1)
+    middle = queue.enqueue('middle.pdf', priority=3)
+
+    assert _claim_all(queue) == [high, middle, low]
+
+
+def test_claim_keeps_insertion_order_for_equal_priority(queue):
+    task_ids = queue.enqueue_batch([f'{i}.pdf' for i in range(5)], 'batch')
+
+    assert _claim_all(queue) == task_ids
+
+
+def test_claim_ages_long_waiting_jobs(tmp_path):
+    """오래 기다린 작업은 우선순위가 낮아도(값이 커도) 새로 들어온 작업보다 먼저 처리"""
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), aging_seconds=10.0)
+    old = queue.enqueue('old.pdf', priority=5)
+    _set(queue, old, created_at=time.time() - 100)
+    new = queue.enqueue('new.pdf', priority=1)
+
+    assert _claim_all(queue) == [old, new]
+
+
+def test_claim_interleaves_batches(queue):
+    """같은 배치의 처리 중 작업 수만큼 밀려 여러 배치가 번갈아 처리됨"""
+    first = queue.enqueue_batch(['a1.pdf', 'a2.pdf', 'a3.pdf'], 'A')
+    second = queue.enqueue_batch(['b1.pdf', 'b2.pdf', 'b3.pdf'], 'B')
+
+    assert _claim_all(queue) == [first[0], second[0], first[1], second[1], first[2], second[2]]
+
+
+def test_claim_skips_excluded_jobs(queue):
+    first = queue.enqueue('first.pdf')
+    second = queue.enqueue('second.pdf')
+
+    job = queue.claim('w', exclude=[first])
+    assert job['id'] == second
+    assert queue.claim('w', exclude=[first]) is None
+    assert queue.claim('w')['id'] == first
+
+
+def test_claim_records_worker_and_attempt(queue):
+    task_id = queue.enqueue('a.pdf')
+
+    job = queue.claim('w1')
+
+    assert job['id'] == task_id
+    assert job['status'] == STATUS_PROCESSING
+    assert job['worker'] == 'w1'
+    assert job['attempts'] == 1
+    assert queue.claim('w2') is None
+
+
+def test_release_returns_job_without_counting_attempt(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+
+    queue.release(task_id)
+
+    job = queue.get(task_id)
+    assert job['status'] == STATUS_PENDING
+    assert job['worker'] is None
+    assert job['attempts'] == 0
+    assert queue.claim('w2')['id'] == task_id
+
+
+def test_release_ignores_finished_job(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+    assert queue.complete(task_id, 'w1', 'a.md')
+
+    queue.release(task_id)
+
+    assert queue.get(task_id)['status'] == STATUS_COMPLETED
+
+
+def test_requeue_stale_returns_job_to_pending(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+    _set(queue, task_id, heartbeat_at=time.time() - 100)
+
+    assert queue.requeue_stale(10) == 1
+
+    job = queue.get(task_id)
+    assert job['status'] == STATUS_PENDING
+    assert job['worker'] is None
+    assert queue.claim('w2')['attempts'] == 2
+
+
+def test_requeue_stale_keeps_live_jobs(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+
+    assert queue.requeue_stale(10) == 0
+    assert queue.get(task_id)['status'] == STATUS_PROCESSING
+
+
+def test_requeue_stale_fails_job_after_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / 'jobs.sqlite3'), max_attempts=2)
+    task_id = queue.enqueue('crash.pdf')
+    for attempt in range(2):
+        assert queue.claim(f'w{attempt}')['id'] == task_id
+        _set(queue, task_id, heartbeat_at=time.time() - 100)
+        queue.requeue_stale(10)
+
+    job = queue.get(task_id)
+    assert job['status'] == STATUS_FAILED
+    assert job['attempts'] == 2
+    assert '2번' in job['error']
+    assert queue.claim('w') is None
+
+
+def test_requeue_stale_cancels_job_with_cancel_request(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+    assert queue.cancel(task_id) == 'cancelling'
+    _set(queue, task_id, heartbeat_at=time.time() - 100)
+
+    assert queue.requeue_stale(10) == 0
+    assert queue.get(task_id)['status'] == STATUS_CANCELLED
+
+
+def test_cancel_pending_job(queue):
+    task_id = queue.enqueue('a.pdf')
+
+    assert queue.cancel(task_id) == STATUS_CANCELLED
+    assert queue.get(task_id)['finished_at'] is not None
+    assert queue.claim('w') is None
+
+
+def test_cancel_processing_job_requests_cancellation(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+
+    assert queue.cancel(task_id) == 'cancelling'
+    assert queue.get(task_id)['status'] == STATUS_PROCESSING
+    assert queue.cancel_requested([task_id]) == [task_id]
+    assert not queue.mark_cancelled(task_id, 'w2')
+    assert queue.mark_cancelled(task_id, 'w1')
+    assert queue.get(task_id)['status'] == STATUS_CANCELLED
+
+
+def test_cancel_finished_or_unknown_job(queue):
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+    queue.complete(task_id, 'w1', 'a.md')
+
+    assert queue.cancel(task_id) == STATUS_COMPLETED
+    assert queue.cancel('task_missing') is None
+
+
+def test_cancel_batch(queue):
+    task_ids = queue.enqueue_batch(['a.pdf', 'b.pdf', 'c.pdf'], 'batch')
+    queue.claim('w1')
+
+    assert queue.cancel_batch('batch') == {'cancelled': 2, 'cancelling': 1}
+    assert [job['status'] for job in queue.batch_jobs('batch')] == \
+        [STATUS_PROCESSING, STATUS_CANCELLED, STATUS_CANCELLED]
+    assert queue.cancel_requested(task_ids) == [task_ids[0]]
+
+
+def test_only_claiming_worker_can_finish_job(queue):
+    """중단으로 다시 대기열에 들어가 다른 워커가 가져간 작업은 이전 워커가 완료/실패로 기록하지 못함"""
+    task_id = queue.enqueue('a.pdf')
+    queue.claim('w1')
+    _set(queue, task_id, heartbeat_at=time.time() - 100)
+    queue.requeue_stale(10)
+    queue.claim('w2')
+
+    assert not queue.is_claimed_by(task_id, 'w1')
+    assert not queue.complete(task_id, 'w1', 'stale.md')
+    assert not queue.fail(task_id, 'w1', 'error')
+    assert queue.get(task_id)['status'] == STATUS_PROCESSING
+
+    assert queue.is_claimed_by(task_id, 'w2')
+    assert queue.complete(task_id, 'w2', 'a.md')
+    job = queue.get(task_id)
+    assert job['status'] == STATUS_COMPLETED
+    assert job['result_path'] == 'a.md'
+    assert not queue.fail(task_id, 'w2', 'late error')
@@ -0,0 +1,117 @@
+import math
+import os
+
+import pytest
+
+from services.search_index import SearchIndex, BM25_B, BM25_K1
+
+
+@pytest.fixture
+def output_folder(tmp_path):
+    folder = tmp_path / 'output'
+    folder.mkdir()
+    (folder / 'a.md').write_text('첫 줄\n계약서를 검토했다\n다른 줄 계약\n', encoding='utf-8')
+    (folder / 'b.md').write_text('계약 계약 계약\nhello World\n', encoding='utf-8')
+    (folder / 'notes.txt').write_text('계약\n', encoding='utf-8')
+    return folder
+
+
+@pytest.fixture
+def index(output_folder, tmp_path):
+    index = SearchIndex(str(output_folder), str(tmp_path / 'index' / 'search.sqlite3'))
+    assert index.sync() == 2
+    return index
+
+
+def _write(path, text):
+    """크기가 바뀌도록 내용을 바꿔 써서 sync가 변경으로 인식하게 함"""
+    path.write_text(text, encoding='utf-8')
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_sync_indexes_markdown_files_only(index):
+    assert index.is_ready()
+    assert index.lookup('계약') == {'a.md': [1, 2], 'b.md': [0]}
+
+
+def test_sync_skips_unchanged_files(index):
+    assert index.sync() == 0
+
+
+def test_lookup_finds_substrings(index):
+    """단어 중간, 공백을 포함한 부분 문자열도 후보 줄로 찾음"""
+    assert index.lookup('약서') == {'a.md': [1]}
+    assert index.lookup('계약서를 검') == {'a.md': [1]}
+    assert index.lookup('줄 계') == {'a.md': [2]}
+
+
+def test_lookup_short_keywords(index):
+    """3글자 미만 검색어는 그 글자로 시작하는 trigram 범위 조회"""
+    assert index.lookup('줄') == {'a.md': [0, 2]}
+    assert index.lookup('he') == {'b.md': [1]}
+
+
+def test_lookup_ignores_case(index):
+    assert index.lookup('WORLD') == {'b.md': [1]}
+    assert index.lookup('Hello w') == {'b.md': [1]}
+
+
+def test_lookup_without_match(index):
+    assert index.lookup('없는 단어') == {}
+    assert index.lookup('') is None
+
+
+def test_sync_updates_changed_added_and_deleted_files(index, output_folder):
+    _write(output_folder / 'a.md', '새 내용\n')
+    (output_folder / 'c.md').write_text('추가된 계약\n', encoding='utf-8')
+    (output_folder / 'b.md').unlink()
+
+    index.sync()
+
+    assert index.lookup('계약') == {'c.md': [0]}
+    assert index.lookup('새 내용') == {'a.md': [0]}
+    assert index.lookup('hello') == {}
+
+
+def test_removed_file_terms_leave_fuzzy_dictionary(index, output_folder):
+    assert 'hello' in index.fuzzy_terms('helo')
+
+    index.remove_file(str(output_folder / 'b.md'))
+
+    assert index.fuzzy_terms('helo') == {}
+    assert index.bm25_scores('hello') == {}
+
+
+def _bm25(tf, df, doc_count, length, avg_length):
+    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+    return idf * tf * (BM25_K1 + 1) / (tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length))
+
+
+def test_bm25_scores(index):
+    """문서 길이는 단어 수 (a.md 7개, b.md 5개), 검색어 단어는 그 단어로 시작하는 색인 단어로 확장"""
+    scores = index.bm25_scores('계약')
+
+    assert scores == pytest.approx({'a.md': _bm25(2, 2, 2, 7, 6), 'b.md': _bm25(3, 2, 2, 5, 6)})
+    assert scores['b.md'] > scores['a.md']
+
+
+def test_bm25_scores_sum_query_terms(index):
+    scores = index.bm25_scores('계약 hello')
+
+    assert scores == pytest.approx({
+        'a.md': _bm25(2, 2, 2, 7, 6),
+        'b.md': _bm25(3, 2, 2, 5, 6) + _bm25(1, 1, 2, 5, 6),
+    })
+
+
+def test_bm25_scores_filtered_by_filenames(index):
+    assert index.bm25_scores('계약', ['a.md']) == pytest.approx({'a.md': _bm25(2, 2, 2, 7, 6)})
+    assert index.bm25_scores('계약', []) == {}
+
+
+def test_bm25_scores_without_terms(index, tmp_path):
+    assert index.bm25_scores('!!') == {}
+    assert index.bm25_scores('없음') == {}
+    empty = SearchIndex(str(tmp_path / 'empty'), str(tmp_path / 'index' / 'empty.sqlite3'))
+    assert empty.bm25_scores('계약') == {}
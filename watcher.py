@@ -0,0 +1,23 @@
+"""입력 폴더 감시와 변환 작업 처리만 하는 독립 실행 프로세스 (웹 서버 없이 실행)
+
+    python watcher.py
+
+새 파일/바뀐 파일을 변환 작업 큐에 넣고 이 프로세스의 처리 스레드가 변환하여
+출력 폴더와 검색 색인에 반영한다. 웹 서버와 같은 data 폴더를 쓰므로 진행 상황은
+웹 화면/API에서도 확인할 수 있다.
+"""
+import os
+import threading
+
+os.environ['INPUT_WATCHER'] = '1'
+os.environ['DOCQUERY_PRELOAD'] = '0'  # 감시 스레드와 작업 큐 처리 스레드를 바로 시작
+
+from app import create_app
+
+if __name__ == "__main__":
+    app = create_app()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        app.extensions['input_watcher'].stop()
+        app.extensions['converter_service'].close()